@@ -0,0 +1,238 @@
+"""
+Evaluation of the alert rules as new spreads arrive.
+
+Rules are kept in memory, indexed by market, so each spread is only
+checked against the rules of its own market. A rule fires when the spread
+crosses its threshold, and it isn't fired again until the spread gets back
+within it. Fired alerts are posted to the webhook of the rule in the
+background, so slow receivers don't hold the spreads ingestion.
+
+Webhooks must be HTTPS URLs of public hosts, which is checked both when a
+rule is saved and right before each alert is sent, since the addresses of
+a host can change in the meantime. Redirects aren't followed.
+"""
+
+import ipaddress
+import logging
+import requests
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Max
+from django.utils import timezone
+from time import monotonic
+from urllib.parse import urlsplit
+from .models import AlertRule, Spread
+
+logger = logging.getLogger(__name__)
+
+
+def webhook_error(url: str) -> str:
+    """
+    Check if alerts can be posted to a webhook, so rules can't make the
+    server post to itself or to its internal network.
+
+    :param str url: URL of the webhook.
+    :returns: Why alerts can't be posted to it, or `None` if they can.
+    :rtype: str | None
+    """
+    url = urlsplit(url)
+    if url.scheme != "https":
+        return "The webhook must use HTTPS"
+    try:
+        addresses = socket.getaddrinfo(
+            url.hostname,
+            url.port or 443,
+            proto=socket.IPPROTO_TCP,
+        )
+    except (socket.gaierror, UnicodeError, ValueError):
+        return "The webhook host can't be resolved"
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            return "The webhook host must be a public address"
+    return None
+
+
+class AlertIndex:
+    """
+    Alert rules grouped by market.
+
+    USAGE
+    >>> index = AlertIndex(rules: list)
+    >>> rules = index.rules_for(market_id: str)
+    """
+
+    def __init__(self, rules: list = ()):
+        self.markets = {}
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule: AlertRule):
+        self.markets.setdefault(rule.market_id, {})[rule.pk] = rule
+
+    def rules_for(self, market_id: str) -> list:
+        return list(self.markets.get(market_id, {}).values())
+
+    def __len__(self) -> int:
+        return sum(len(rules) for rules in self.markets.values())
+
+
+class AlertEngine:
+    """
+    Checks each new spread against the rules of its market, posting an
+    alert to the webhook of every rule whose threshold was crossed.
+
+    Rules are reloaded from the database when they change, checking it
+    at most every `ALERT_RULES_REFRESH` seconds.
+
+    USAGE
+    >>> engine = AlertEngine()
+    >>> engine.refresh()
+    >>> futures = engine.process(spreads: list)
+    """
+
+    def __init__(self, refresh_interval: float = None):
+        self.refresh_interval = (
+            settings.ALERT_RULES_REFRESH
+            if refresh_interval is None
+            else refresh_interval
+        )
+        self.index = AlertIndex()
+        # rules whose threshold is crossed, not to fire them again
+        self.triggered = set()
+        self._version = None
+        self._checked_at = None
+        self._executor = None
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Reload the rules if they changed since the last time.
+
+        :param bool force: check for changes even if it was done recently.
+        :returns: If the rules were reloaded.
+        :rtype: bool
+        """
+        now = monotonic()
+        if (
+            not force
+            and self._checked_at is not None
+            and now - self._checked_at < self.refresh_interval
+        ):
+            return False
+        self._checked_at = now
+
+        # any creation, update or deletion changes one of them
+        version = AlertRule.objects.aggregate(
+            count=Count("id"),
+            updated_at=Max("updated_at"),
+        )
+        if version == self._version:
+            return False
+
+        rules = list(AlertRule.objects.all())
+        self.index = AlertIndex(rules)
+        self.triggered &= {rule.pk for rule in rules}
+        self._version = version
+        return True
+
+    def evaluate(self, spread: Spread) -> list:
+        """
+        Check a spread against the rules of its market.
+
+        :param Spread spread: new spread of a market.
+        :returns: The rules that fired.
+        :rtype: list[AlertRule]
+        """
+        fired = []
+        for rule in self.index.rules_for(spread.market_id):
+            if rule.is_exceeded(spread):
+                if rule.pk not in self.triggered:
+                    self.triggered.add(rule.pk)
+                    fired.append(rule)
+            else:
+                # back within the threshold, the rule can fire again
+                self.triggered.discard(rule.pk)
+        return fired
+
+    def process(self, spreads: list) -> list:
+        """
+        Check new spreads against the rules, sending the fired alerts.
+
+        :param list[Spread] spreads: new spreads of any market.
+        :returns: A future for each alert sent.
+        :rtype: list[Future]
+        """
+        futures = []
+        for spread in spreads:
+            for rule in self.evaluate(spread):
+                futures.append(
+                    self.executor.submit(self.notify, rule, spread)
+                )
+        return futures
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.ALERT_WEBHOOK_WORKERS,
+                thread_name_prefix="alerts",
+            )
+        return self._executor
+
+    def notify(self, rule: AlertRule, spread: Spread) -> bool:
+        """
+        Post an alert to the webhook of a rule.
+
+        :param AlertRule rule: rule that fired.
+        :param Spread spread: spread that fired it.
+        :returns: If the webhook accepted the alert.
+        :rtype: bool
+        """
+        triggered_at = timezone.now()
+        payload = {
+            "rule_id": rule.pk,
+            "market_id": spread.market_id,
+            "kind": rule.kind,
+            "direction": rule.direction,
+            "threshold": str(rule.threshold),
+            "baseline": str(rule.baseline),
+            "change": str(rule.change(spread)),
+            "spread": [str(spread.value), spread.currency],
+            "triggered_at": triggered_at.isoformat(),
+        }
+        error = webhook_error(rule.webhook_url)
+        if error is not None:
+            logger.error("Can't send the alert of rule %s: %s", rule.pk, error)
+            return False
+        try:
+            response = requests.post(
+                rule.webhook_url,
+                json=payload,
+                timeout=settings.ALERT_WEBHOOK_TIMEOUT,
+                allow_redirects=False,
+            )
+            response.raise_for_status()
+        except requests.RequestException:
+            logger.exception("Can't send the alert of rule %s", rule.pk)
+            return False
+        if response.is_redirect:
+            logger.error(
+                "Can't send the alert of rule %s: its webhook redirects",
+                rule.pk,
+            )
+            return False
+
+        try:
+            # `update()` keeps `updated_at`, so rules aren't reloaded for it
+            AlertRule.objects.filter(pk=rule.pk).update(
+                last_triggered=triggered_at,
+            )
+        finally:
+            # alerts are rare, don't keep a connection for each worker
+            connection.close()
+        return True
+
+
+alert_engine = AlertEngine()
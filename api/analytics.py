@@ -0,0 +1,222 @@
+"""
+Cross-market analytics, calculated on the best bid and ask of every market
+at once.
+
+The tickers of all markets are loaded into NumPy arrays, so the relative
+and fee-adjusted spreads of every market are calculated in a single
+vectorized pass, and so are the conversion rates between every pair of
+currencies: markets become a matrix of the amount of a currency received
+for each unit of another, and the rates through an intermediate currency,
+or around a cycle of three, are products of that matrix with itself.
+"""
+
+import numpy as np
+from .depth import taker_fee_rate
+from .models import Spread
+
+# basis points in a unit
+BPS = 10000
+
+
+def quote_from_ticker(ticker_data: dict) -> tuple:
+    """
+    Read the best bid and ask of a ticker, as returned by Buda.com API.
+
+    :param dict ticker_data: ticker of a market.
+    :returns: The market ID, best bid and best ask.
+    :rtype: tuple[str, float, float]
+    """
+    return (
+        ticker_data["market_id"].upper(),
+        float(ticker_data["max_bid"][0]),
+        float(ticker_data["min_ask"][0]),
+    )
+
+
+def to_list(values: np.ndarray) -> list:
+    """
+    Convert an array to a list, with `None` in place of `NaN`, which JSON
+    can't represent.
+
+    :param np.ndarray values: array of floats.
+    :rtype: list[float | None]
+    """
+    return [None if np.isnan(value) else value for value in values.tolist()]
+
+
+class MarketsSnapshot:
+    """
+    Best bid, ask and taker fee of every market, as arrays.
+
+    USAGE
+    >>> snapshot = MarketsSnapshot.fetch(markets: list)
+    >>> spreads = snapshot.spreads()
+    >>> triangles = snapshot.triangles(limit: int)
+    """
+
+    def __init__(self, quotes: list, markets: list = ()):
+        """
+        :param list quotes: market ID, best bid and best ask of each
+        market, as returned by :func:`quote_from_ticker`.
+        :param list[Market] markets: markets to take the currencies and
+        taker fees from. The currencies of the ones missing are read from
+        their IDs, and their fee is taken as zero.
+        """
+        markets = {market.id: market for market in markets}
+        self.market_ids = [market_id for market_id, _, _ in quotes]
+        self.bids = np.array([bid for _, bid, _ in quotes], dtype=float)
+        self.asks = np.array([ask for _, _, ask in quotes], dtype=float)
+
+        pairs = []
+        fees = []
+        for market_id in self.market_ids:
+            market = markets.get(market_id)
+            if market is None:
+                base, _, quote = market_id.partition("-")
+                pairs.append((base, quote))
+                fees.append(0.0)
+                continue
+            pairs.append(
+                (market.base_currency.upper(), market.quote_currency.upper())
+            )
+            fees.append(float(taker_fee_rate(market)))
+        self.fee_rates = np.array(fees, dtype=float)
+
+        # markets without bids or asks have no price on that side
+        self.bids[~(self.bids > 0)] = np.nan
+        self.asks[~(self.asks > 0)] = np.nan
+
+        self.currencies = sorted({c for pair in pairs for c in pair})
+        index = {currency: i for i, currency in enumerate(self.currencies)}
+        self.base_index = np.array(
+            [index[base] for base, _ in pairs],
+            dtype=np.intp,
+        )
+        self.quote_index = np.array(
+            [index[quote] for _, quote in pairs],
+            dtype=np.intp,
+        )
+
+    @classmethod
+    def fetch(cls, markets: list = ()):
+        """
+        Retrieve the tickers of all markets from Buda.com API.
+
+        :param list[Market] markets: markets to take the currencies and
+        taker fees from.
+        :rtype: MarketsSnapshot
+        """
+        quotes = Spread.get_each_markets_spread(build=quote_from_ticker)
+        return cls(quotes, markets)
+
+    def spreads(self) -> dict:
+        """
+        Spread of every market, absolute and in basis points of its mid
+        price, with and without the taker fee paid on both sides.
+
+        :returns: Arrays by name, in the same order as `market_ids`.
+        :rtype: dict[str, np.ndarray]
+        """
+        mid = (self.bids + self.asks) / 2
+        spread = self.asks - self.bids
+        with_fees = (
+            self.asks * (1 + self.fee_rates)
+            - self.bids * (1 - self.fee_rates)
+        )
+        return {
+            "bid": self.bids,
+            "ask": self.asks,
+            "mid": mid,
+            "fee_rate": self.fee_rates,
+            "spread": spread,
+            "spread_bps": spread / mid * BPS,
+            "spread_with_fees": with_fees,
+            "spread_with_fees_bps": with_fees / mid * BPS,
+        }
+
+    def rates(self, fees: bool = True) -> np.ndarray:
+        """
+        Amount of each currency received by trading one unit of another
+        at the best prices, i.e. `rates[i, j]` for currency `i` into `j`.
+
+        Selling the base currency of a market gets its bid, and buying it
+        costs its ask. If several markets trade the same pair, the best
+        rate is kept. Pairs without a market have a rate of zero.
+
+        :param bool fees: pay the taker fee of each market.
+        :rtype: np.ndarray
+        """
+        n = len(self.currencies)
+        rates = np.zeros((n, n))
+        kept = 1 - self.fee_rates if fees else np.ones(len(self.market_ids))
+        sell = np.nan_to_num(self.bids * kept)
+        buy = np.nan_to_num(kept / self.asks)
+        np.maximum.at(rates, (self.base_index, self.quote_index), sell)
+        np.maximum.at(rates, (self.quote_index, self.base_index), buy)
+        return rates
+
+    def cross_rates(self, fees: bool = True) -> list:
+        """
+        Best rate between every pair of currencies through a third one,
+        along with the rate of their own market, if any.
+
+        :param bool fees: pay the taker fee of each market.
+        :returns: The currency sold and bought, the intermediate one, and
+        both rates, for every pair with an implied rate.
+        :rtype: list[dict]
+        """
+        rates = self.rates(fees)
+        # legs[i, j, k] is the rate from `i` into `k` through `j`
+        legs = rates[:, :, None] * rates[None, :, :]
+        via = legs.argmax(axis=1)
+        implied = np.take_along_axis(legs, via[:, None, :], axis=1)[:, 0, :]
+        np.fill_diagonal(implied, 0)
+
+        sources, targets = np.nonzero(implied)
+        return [
+            {
+                "from": self.currencies[i],
+                "to": self.currencies[k],
+                "via": self.currencies[via[i, k]],
+                "rate": float(implied[i, k]),
+                "direct_rate": float(rates[i, k]) if rates[i, k] else None,
+            }
+            for i, k in zip(sources.tolist(), targets.tolist())
+        ]
+
+    def triangles(self, fees: bool = True, limit: int = None) -> list:
+        """
+        Round trips across three currencies, from the most profitable. A
+        positive edge means ending with more of the first currency than
+        what was started with.
+
+        :param bool fees: pay the taker fee of each market.
+        :param int limit: most round trips to return.
+        :returns: The currencies of each round trip, in the order traded,
+        and its edge in basis points.
+        :rtype: list[dict]
+        """
+        rates = self.rates(fees)
+        n = len(self.currencies)
+        # cycles[i, j, k] is the rate of `i` into `j`, `k` and back to `i`
+        cycles = rates[:, :, None] * rates[None, :, :] * rates.T[:, None, :]
+
+        # each cycle is counted once, starting from its first currency
+        i, j, k = np.indices((n, n, n))
+        valid = (i < j) & (i < k) & (j != k) & (cycles > 0)
+        starts, middles, ends = np.nonzero(valid)
+        edges = (cycles[valid] - 1) * BPS
+
+        order = np.argsort(-edges, kind="stable")[:limit]
+        return [
+            {
+                "path": [
+                    self.currencies[starts[m]],
+                    self.currencies[middles[m]],
+                    self.currencies[ends[m]],
+                    self.currencies[starts[m]],
+                ],
+                "edge_bps": float(edges[m]),
+            }
+            for m in order.tolist()
+        ]
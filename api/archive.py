@@ -0,0 +1,338 @@
+"""
+Columnar archive of the spreads history, partitioned by market and day.
+
+Each partition is a directory, e.g. `BTC-CLP/2024-02-14/`, with a NumPy
+file per column: `fetch_date`, as microseconds since the epoch, and
+`value`, as integers scaled by the decimal places of the partition, so
+they're stored exactly. A `meta.json` file keeps the currency, scale and
+number of rows. Stored this way, a spread takes 16 bytes, and the columns
+are memory-mapped when read, so scanning a range only touches the pages
+of the rows within it.
+
+Partitions written compressed keep both columns in a single `columns.npz`
+file instead, which is smaller but has to be read whole.
+"""
+
+import json
+import numpy as np
+import shutil
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+from uuid import uuid4
+
+COLUMNS = ("fetch_date", "value")
+COMPRESSED = "columns.npz"
+META = "meta.json"
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+# the decimal places of `Spread.value`
+MAX_SCALE = 10
+INT64_MAX = np.iinfo(np.int64).max
+
+
+class ArchiveError(Exception):
+    """
+    A partition can't be archived as is, e.g. it mixes currencies.
+    """
+
+
+def day_bounds(day: date) -> tuple:
+    """
+    First instant of a day, in UTC, and of the following one.
+
+    :param date day: the day.
+    :rtype: tuple[datetime, datetime]
+    """
+    start = datetime.combine(day, time(), tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def to_microseconds(moment: datetime) -> int:
+    return (moment - EPOCH) // MICROSECOND
+
+
+def scale_values(values: list) -> tuple:
+    """
+    Scale decimal values to integers, with the fewest decimal places that
+    keep all of them exact.
+
+    :param list[Decimal] values: values to scale.
+    :returns: The scaled values and the decimal places used.
+    :rtype: tuple[np.ndarray, int]
+    """
+    scale = 0
+    for value in values:
+        exponent = value.normalize().as_tuple().exponent
+        scale = max(scale, min(-exponent, MAX_SCALE))
+    scaled = [int(value.scaleb(scale)) for value in values]
+    if any(abs(value) > INT64_MAX for value in scaled):
+        raise ArchiveError("Values are too large to be archived")
+    return np.array(scaled, dtype=np.int64), scale
+
+
+class ArchivedSpreads:
+    """
+    Spreads of a market read from the archive, as arrays.
+
+    :param np.ndarray fetch_date: date of each spread, as `datetime64[us]`.
+    :param np.ndarray scaled: value of each spread, scaled by `scale`.
+    :param int scale: decimal places of the values.
+    :param str currency: currency of the values.
+    """
+
+    __slots__ = ("fetch_date", "scaled", "scale", "currency")
+
+    def __init__(
+        self,
+        fetch_date: np.ndarray,
+        scaled: np.ndarray,
+        scale: int,
+        currency: str,
+    ):
+        self.fetch_date = fetch_date
+        self.scaled = scaled
+        self.scale = scale
+        self.currency = currency
+
+    def __len__(self) -> int:
+        return len(self.fetch_date)
+
+    @property
+    def value(self) -> np.ndarray:
+        """
+        Values of the spreads, as floats.
+        """
+        return self.scaled / 10**self.scale
+
+    def decimals(self) -> list:
+        """
+        Exact values of the spreads.
+
+        :rtype: list[Decimal]
+        """
+        return [
+            Decimal(value).scaleb(-self.scale)
+            for value in self.scaled.tolist()
+        ]
+
+
+class SpreadArchive:
+    """
+    Spreads history kept on files, by market and day.
+
+    USAGE
+    >>> archive = SpreadArchive(root: Path)
+    >>> archive.write(market_id: str, day: date, rows: list)
+    >>> spreads = archive.read(market_id: str, start, end)
+    """
+
+    def __init__(self, root):
+        """
+        :param root: directory of the archive.
+        """
+        self.root = Path(root)
+
+    def path(self, market_id: str, day: date) -> Path:
+        return self.root / market_id.upper() / day.isoformat()
+
+    def markets(self) -> list:
+        """
+        Markets with any archived day.
+
+        :rtype: list[str]
+        """
+        if not self.root.is_dir():
+            return []
+        return sorted(
+            path.name for path in self.root.iterdir() if path.is_dir()
+        )
+
+    def days(self, market_id: str) -> list:
+        """
+        Days archived of a market.
+
+        :param str market_id: market identifier, e.g. `btc-clp`.
+        :rtype: list[date]
+        """
+        directory = self.root / market_id.upper()
+        if not directory.is_dir():
+            return []
+        return sorted(
+            date.fromisoformat(path.name)
+            for path in directory.iterdir()
+            # partitions being written start with a dot
+            if not path.name.startswith(".") and (path / META).exists()
+        )
+
+    def write(
+        self,
+        market_id: str,
+        day: date,
+        rows: list,
+        compress: bool = False,
+    ) -> int:
+        """
+        Archive the spreads of a market on a day, merging them with the ones
+        already archived for it, if any.
+
+        The partition is written on a new directory that then replaces the
+        previous one, so readers never see it half written.
+
+        :param str market_id: market identifier, e.g. `btc-clp`.
+        :param date day: day of the spreads, in UTC.
+        :param list rows: fetch date, value and currency of each spread.
+        :param bool compress: write the columns in a compressed file, which
+        can't be memory-mapped.
+        :returns: Rows in the partition.
+        :rtype: int
+        """
+        currencies = {currency for _, _, currency in rows}
+        fetch_date = np.array(
+            [to_microseconds(moment) for moment, _, _ in rows],
+            dtype=np.int64,
+        )
+        values = [value for _, value, _ in rows]
+
+        path = self.path(market_id, day)
+        if (path / META).exists():
+            archived = self.read_partition(path)
+            currencies.add(archived.currency)
+            fetch_date = np.concatenate(
+                [archived.fetch_date.view(np.int64), fetch_date]
+            )
+            values = archived.decimals() + values
+        if len(currencies) > 1:
+            raise ArchiveError(
+                f"Spreads of {market_id} on {day} have several currencies"
+            )
+        scaled, scale = scale_values(values)
+
+        # sorted by date, without the rows archived more than once
+        order = np.lexsort((scaled, fetch_date))
+        fetch_date, scaled = fetch_date[order], scaled[order]
+        unique = np.ones(len(order), dtype=bool)
+        unique[1:] = (fetch_date[1:] != fetch_date[:-1]) | (
+            scaled[1:] != scaled[:-1]
+        )
+        fetch_date, scaled = fetch_date[unique], scaled[unique]
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f".{path.name}.{uuid4().hex}")
+        temporary.mkdir()
+        columns = {
+            "fetch_date": fetch_date.view("datetime64[us]"),
+            "value": scaled,
+        }
+        if compress:
+            np.savez_compressed(temporary / COMPRESSED, **columns)
+        else:
+            for name, column in columns.items():
+                np.save(temporary / f"{name}.npy", column)
+        meta = {
+            "market_id": market_id.upper(),
+            "day": day.isoformat(),
+            "currency": currencies.pop(),
+            "scale": scale,
+            "rows": len(fetch_date),
+        }
+        (temporary / META).write_text(json.dumps(meta))
+
+        replaced = None
+        if path.exists():
+            replaced = path.with_name(f".{path.name}.{uuid4().hex}")
+            path.rename(replaced)
+        temporary.rename(path)
+        if replaced is not None:
+            shutil.rmtree(replaced)
+        return meta["rows"]
+
+    def read_partition(self, path: Path) -> ArchivedSpreads:
+        """
+        Read a partition, memory-mapping its columns unless compressed.
+
+        :param Path path: directory of the partition.
+        :rtype: ArchivedSpreads
+        """
+        meta = json.loads((path / META).read_text())
+        if (path / COMPRESSED).exists():
+            with np.load(path / COMPRESSED) as columns:
+                columns = {name: columns[name] for name in COLUMNS}
+        else:
+            columns = {
+                name: np.load(path / f"{name}.npy", mmap_mode="r")
+                for name in COLUMNS
+            }
+        return ArchivedSpreads(
+            columns["fetch_date"],
+            columns["value"],
+            meta["scale"],
+            meta["currency"],
+        )
+
+    def read(
+        self,
+        market_id: str,
+        start: datetime,
+        end: datetime,
+    ) -> ArchivedSpreads:
+        """
+        Read the archived spreads of a market within a range of dates.
+
+        Each day is located with a binary search on its dates, so only the
+        rows within the range are read from disk.
+
+        :param str market_id: market identifier, e.g. `btc-clp`.
+        :param datetime start: first date included.
+        :param datetime end: first date excluded.
+        :returns: The spreads, sorted by date. When a single day is read,
+        the arrays are views of its memory-mapped columns.
+        :rtype: ArchivedSpreads
+        """
+        low = np.datetime64(to_microseconds(start), "us")
+        high = np.datetime64(to_microseconds(end), "us")
+        first = start.astimezone(timezone.utc).date()
+        last = end.astimezone(timezone.utc).date()
+
+        parts = []
+        for day in self.days(market_id):
+            if day < first or day > last:
+                continue
+            part = self.read_partition(self.path(market_id, day))
+            begin, stop = np.searchsorted(part.fetch_date, [low, high])
+            if stop > begin:
+                parts.append((part, begin, stop))
+
+        if not parts:
+            return ArchivedSpreads(
+                np.array([], dtype="datetime64[us]"),
+                np.array([], dtype=np.int64),
+                0,
+                "",
+            )
+        if len(parts) == 1:
+            part, begin, stop = parts[0]
+            return ArchivedSpreads(
+                part.fetch_date[begin:stop],
+                part.scaled[begin:stop],
+                part.scale,
+                part.currency,
+            )
+
+        # partitions may have different scales
+        scale = max(part.scale for part, _, _ in parts)
+        return ArchivedSpreads(
+            np.concatenate(
+                [part.fetch_date[begin:stop] for part, begin, stop in parts]
+            ),
+            np.concatenate(
+                [
+                    part.scaled[begin:stop] * 10 ** (scale - part.scale)
+                    for part, begin, stop in parts
+                ]
+            ),
+            scale,
+            parts[-1][0].currency,
+        )
@@ -0,0 +1,206 @@
+"""
+Asynchronous versions of the `/spreads/*` endpoints.
+
+These views wait on Buda.com API without holding a worker thread, so they
+must be served through the ASGI application (`buda.asgi`). They return the
+same data as :class:`api.views.SpreadViewSet`.
+"""
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+from django.http import HttpResponse, StreamingHttpResponse
+from requests.exceptions import HTTPError, RequestException
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from .broadcast import spread_broadcaster
+from .catalogue import market_catalogue
+from .compact import CompactSpread, render_spreads
+from .models import Spread, Polling
+from .serializer import (
+    SpreadSerializer,
+    SpreadSerializerFull,
+    PollingSerializer,
+)
+
+
+# errors of requests to Buda.com API, from either client
+UPSTREAM_ERRORS = (RequestException, httpx.TransportError, TimeoutError)
+
+
+def json_response(data, status_code: int = status.HTTP_200_OK):
+    """
+    Render data the same way Django Rest Framework does.
+
+    :param data: serialized data to render.
+    :param int status_code: HTTP status code of the response.
+    :rtype: HttpResponse
+    """
+    return HttpResponse(
+        JSONRenderer().render(data),
+        content_type="application/json",
+        status=status_code,
+    )
+
+
+def upstream_error(e: Exception) -> HttpResponse:
+    """
+    Response for data that couldn't be retrieved from Buda.com API.
+
+    :param Exception e: error raised while retrieving the data.
+    :rtype: HttpResponse
+    """
+    response = getattr(e, "response", None)
+    if isinstance(e, HTTPError) and response is not None:
+        status_code = response.status_code
+    elif isinstance(e, (TimeoutError, httpx.TimeoutException)):
+        status_code = status.HTTP_504_GATEWAY_TIMEOUT
+    else:
+        status_code = status.HTTP_502_BAD_GATEWAY
+    error = json_response(
+        {"message": "Can't retrieve the data to calculate the spread"},
+        status_code,
+    )
+    if response is not None and "Retry-After" in response.headers:
+        error["Retry-After"] = response.headers["Retry-After"]
+    return error
+
+
+async def spread_list(request):
+    """
+    Calculate and return the current spread for all available markets.
+    """
+    try:
+        spreads = await Spread.aget_each_markets_spread(
+            build=CompactSpread.from_ticker_data,
+        )
+    except UPSTREAM_ERRORS as e:
+        return upstream_error(e)
+    return HttpResponse(
+        render_spreads(spreads),
+        content_type="application/json",
+    )
+
+
+async def check_market(market_id: str) -> HttpResponse:
+    """
+    Response for a market that isn't in the market catalogue.
+
+    :param str market_id: requested market.
+    :returns: The response, or `None` if the market exists.
+    :rtype: HttpResponse | None
+    """
+    if await sync_to_async(market_catalogue.is_known)(market_id):
+        return None
+    return json_response(
+        {"message": "No market was found with this ID"},
+        status.HTTP_404_NOT_FOUND,
+    )
+
+
+async def spread_detail(request, market_id: str = None):
+    """
+    Calculate and return the current spread for the specified market.
+    """
+    response = await check_market(market_id)
+    if response is not None:
+        return response
+    try:
+        spread = await Spread.acreate(market_id)
+    except UPSTREAM_ERRORS as e:
+        return upstream_error(e)
+    return json_response(SpreadSerializer(spread).data)
+
+
+async def spread_save(request, market_id: str = None):
+    """
+    Save the current spread for the specified market.
+    """
+    response = await check_market(market_id)
+    if response is not None:
+        return response
+    try:
+        spread = await Spread.acreate(market_id)
+        await spread.asave()
+    except UPSTREAM_ERRORS as e:
+        return upstream_error(e)
+    except DatabaseError:
+        return json_response(
+            {"message": "Can't save the spread on database"},
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+    return json_response(
+        SpreadSerializerFull(spread).data,
+        status.HTTP_201_CREATED,
+    )
+
+
+async def spread_polling(request, market_id: str = None):
+    """
+    Return a comparison between the current spread vs.
+    the latest stored one for the specified market.
+    """
+    try:
+        stored_spreads = Spread.objects.filter(market_id=market_id)
+        polling = await Polling.acreate(
+            await stored_spreads.alatest("fetch_date")
+        )
+    except Spread.DoesNotExist:
+        return json_response(
+            {"message": "No stored spread was found for this market"},
+            status.HTTP_404_NOT_FOUND,
+        )
+    except UPSTREAM_ERRORS as e:
+        return upstream_error(e)
+    return json_response(PollingSerializer(polling).data)
+
+
+async def spread_stream(request):
+    """
+    Stream the spread of the markets in `market_ids` query parameter (all
+    markets by default) as Server-Sent Events, every time it changes.
+    """
+    market_ids = request.GET.get("market_ids")
+    if market_ids is not None:
+        market_ids = sorted(
+            {
+                market_id.strip().upper()
+                for market_id in market_ids.split(",")
+                if market_id.strip()
+            }
+        )
+        if len(market_ids) > settings.SPREAD_STREAM_MAX_MARKETS:
+            return json_response(
+                {
+                    "message": "Up to %d markets can be streamed at once"
+                    % settings.SPREAD_STREAM_MAX_MARKETS
+                },
+                status.HTTP_400_BAD_REQUEST,
+            )
+        for market_id in market_ids:
+            response = await check_market(market_id)
+            if response is not None:
+                return response
+
+    async def events():
+        renderer = JSONRenderer()
+        async with spread_broadcaster.subscribe(market_ids) as subscription:
+            while True:
+                spread = await subscription.get(
+                    timeout=settings.SPREAD_STREAM_HEARTBEAT,
+                )
+                if spread is None:
+                    # keep idle connections open through proxies
+                    yield b": keep-alive\n\n"
+                    continue
+                data = renderer.render(SpreadSerializer(spread).data)
+                yield b"event: spread\ndata: " + data + b"\n\n"
+
+    response = StreamingHttpResponse(
+        events(),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,184 @@
+"""
+Backfill of the spreads history from recorded tickers.
+
+Recordings are JSON lines files, each line a ticker as returned by Buda.com
+API, e.g. `{"market_id": "BTC-CLP", "max_bid": [...], "min_ask": [...],
+"timestamp": "2024-02-14T12:00:00Z"}`, possibly nested in a `ticker` key.
+Only the fields needed for the spread are read from each line, without
+decoding the whole ticker, and spreads are written in batches with
+PostgreSQL `COPY`, which skips the parsing and planning of an `INSERT` for
+every row.
+"""
+
+import json
+import re
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from django.db import connection
+from io import StringIO
+from .models import Spread
+
+# columns written for each spread, in order
+COLUMNS = ("market_id", "value", "currency", "fetch_date")
+
+# limits of the columns, checked before writing so a single row can't fail
+# the `COPY` of a whole batch
+MARKET_ID_LENGTH = Spread._meta.get_field("market_id").max_length
+CURRENCY_LENGTH = Spread._meta.get_field("currency").max_length
+VALUE_DIGITS = Spread._meta.get_field("value").max_digits
+VALUE_PLACES = Spread._meta.get_field("value").decimal_places
+
+MARKET_ID = re.compile(rb'"market_id"\s*:\s*"([^"\\]*)"')
+MAX_BID = re.compile(rb'"max_bid"\s*:\s*\[\s*"([^"\\]*)"\s*,\s*"([^"\\]*)"')
+MIN_ASK = re.compile(rb'"min_ask"\s*:\s*\[\s*"([^"\\]*)"')
+
+
+def date_pattern(field: str) -> re.Pattern:
+    """
+    Pattern of the date of a ticker, as a string or a number.
+
+    :param str field: name of the field with the date.
+    :rtype: re.Pattern
+    """
+    name = re.escape(json.dumps(field).encode())
+    return re.compile(name + rb'\s*:\s*(?:"([^"\\]*)"|(-?[0-9.eE+-]+))')
+
+
+def parse_date(text: str = None, number: str = None) -> datetime:
+    """
+    Parse the date of a ticker, given in ISO 8601 format or as seconds
+    since the epoch. Dates without a time zone are taken as UTC.
+
+    :param str text: date in ISO 8601 format.
+    :param str number: seconds since the epoch.
+    :rtype: datetime
+    """
+    if text is not None:
+        moment = datetime.fromisoformat(text)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment
+    return datetime.fromtimestamp(float(number), timezone.utc)
+
+
+def find_fields(line: bytes, dates: re.Pattern) -> tuple:
+    """
+    Find the fields of the spread on a line, as they're written.
+
+    :returns: The market ID, best bid, currency, best ask, and date as
+    text or number, or `None` if any is missing.
+    :rtype: tuple | None
+    """
+    market_id = MARKET_ID.search(line)
+    max_bid = MAX_BID.search(line)
+    min_ask = MIN_ASK.search(line)
+    moment = dates.search(line)
+    if not (market_id and max_bid and min_ask and moment):
+        return None
+    return (
+        market_id.group(1).decode(),
+        max_bid.group(1).decode(),
+        max_bid.group(2).decode(),
+        min_ask.group(1).decode(),
+        *(group and group.decode() for group in moment.groups()),
+    )
+
+
+def decode_fields(line: bytes, date_field: str) -> tuple:
+    """
+    Decode a whole line to find the fields of the spread, for lines
+    written in any other way, e.g. with escaped characters.
+
+    :returns: The same as :func:`find_fields`.
+    :rtype: tuple | None
+    """
+    try:
+        data = json.loads(line)
+        ticker = data.get("ticker", data)
+        moment = ticker.get(date_field, data.get(date_field))
+        return (
+            ticker["market_id"],
+            ticker["max_bid"][0],
+            ticker["max_bid"][1],
+            ticker["min_ask"][0],
+            moment if isinstance(moment, str) else None,
+            None if isinstance(moment, str) else str(moment),
+        )
+    except (ValueError, AttributeError, KeyError, IndexError, TypeError):
+        return None
+
+
+def parse_line(line: bytes, dates: re.Pattern, date_field: str) -> tuple:
+    """
+    Calculate the spread of a recorded ticker.
+
+    :param bytes line: line of the recording.
+    :param re.Pattern dates: pattern of the date, from :func:`date_pattern`.
+    :param str date_field: name of the field with the date.
+    :returns: The market ID, value, currency and date of the spread, or
+    `None` if the line isn't a valid ticker or doesn't fit on database.
+    :rtype: tuple | None
+    """
+    fields = find_fields(line, dates) or decode_fields(line, date_field)
+    if fields is None:
+        return None
+    market_id, max_bid, currency, min_ask, text, number = fields
+    if len(market_id) > MARKET_ID_LENGTH or len(currency) > CURRENCY_LENGTH:
+        return None
+    try:
+        value = Decimal(min_ask) - Decimal(max_bid)
+        # rounded to the decimal places kept, as the database does
+        rounded = value.quantize(Decimal(1).scaleb(-VALUE_PLACES))
+        moment = parse_date(text, number)
+    except (InvalidOperation, ValueError, TypeError, OverflowError):
+        return None
+    if not value.is_finite() or rounded.adjusted() >= (
+        VALUE_DIGITS - VALUE_PLACES
+    ):
+        return None
+    return market_id.upper(), value, currency, moment
+
+
+def escape(value: str) -> str:
+    """
+    Escape a value for the text format of `COPY`.
+    """
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_spreads(rows: list):
+    """
+    Write spreads with a single `COPY`, or a single `INSERT` on database
+    engines other than PostgreSQL.
+
+    :param list rows: market ID, value, currency and date of each spread.
+    """
+    if connection.vendor != "postgresql":
+        spreads = [
+            Spread(market_id=market_id, value=value, currency=currency)
+            for market_id, value, currency, _ in rows
+        ]
+        Spread.objects.bulk_create(spreads)
+        # `fetch_date` is always set to the current time when created
+        for spread, (_, _, _, moment) in zip(spreads, rows):
+            Spread.objects.filter(pk=spread.pk).update(fetch_date=moment)
+        return
+
+    buffer = StringIO()
+    for market_id, value, currency, moment in rows:
+        buffer.write(
+            f"{escape(market_id)}\t{value}\t{escape(currency)}\t"
+            f"{moment.isoformat()}\n"
+        )
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {Spread._meta.db_table} ({', '.join(COLUMNS)}) "
+            "FROM STDIN",
+            buffer,
+        )
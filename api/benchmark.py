@@ -0,0 +1,284 @@
+"""
+Benchmark of the spreads endpoints against a local stand-in for Buda.com
+API.
+
+The stand-in answers the endpoints of Buda.com API used by the spreads
+endpoints with generated markets, after a configurable latency and failing
+a share of the requests, so their throughput and latency can be measured
+reproducibly, without depending on Buda.com API.
+"""
+
+import json
+import random
+import statistics
+import threading
+from buda.utils import VERSION, get_endpoint_class
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connections
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, sleep
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Answers requests with the data generated by :class:`BudaStandIn`.
+    """
+
+    # keep connections alive, like Buda.com API does
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        endpoint = self.path.removeprefix("/api").removeprefix(VERSION)
+        status_code, data = self.server.answer(endpoint)
+        body = json.dumps(data).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class BudaStandIn(ThreadingHTTPServer):
+    """
+    Local server that mimics the market and ticker endpoints of Buda.com
+    API, counting the requests it gets by endpoint class.
+
+    USAGE
+    >>> stand_in = BudaStandIn(markets: int, latency: float).start()
+    >>> with patch("buda.utils.BASE_URL", stand_in.base_url):
+    ...     spreads = Spread.get_each_markets_spread()
+    >>> stand_in.stop()
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        markets: int = 20,
+        latency: float = 0,
+        jitter: float = 0,
+        error_rate: float = 0,
+        bulk_tickers: bool = True,
+        seed: int = 0,
+    ):
+        """
+        :param int markets: number of markets available.
+        :param float latency: seconds taken to answer each request.
+        :param float jitter: maximum random seconds added to the latency.
+        :param float error_rate: share of requests answered with
+        `503 Service Unavailable`, between 0 and 1.
+        :param bool bulk_tickers: whether the `/tickers` endpoint is
+        available.
+        :param int seed: seed of the random latencies and errors.
+        """
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.market_ids = [f"C{i:03d}-CLP" for i in range(markets)]
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.bulk_tickers = bulk_tickers
+        self.calls = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._index = {
+            market_id: i for i, market_id in enumerate(self.market_ids)
+        }
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/api"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def market(self, market_id: str) -> dict:
+        base_currency = market_id.split("-")[0]
+        return {
+            "id": market_id,
+            "name": market_id.lower(),
+            "base_currency": base_currency,
+            "quote_currency": "CLP",
+            "minimum_order_amount": ["0.00000001", base_currency],
+            "taker_fee": "0.8",
+            "maker_fee": "0.4",
+            "max_orders_per_minute": 150,
+            "maker_discount_percentage": "0.1",
+            "taker_discount_percentage": "0.2",
+        }
+
+    def ticker(self, market_id: str) -> dict:
+        i = self._index[market_id]
+        bid = 1000000 + 1000 * i
+        return {
+            "market_id": market_id,
+            "price_variation_24h": "0.012",
+            "price_variation_7d": "-0.034",
+            "last_price": [f"{bid + 50}.0", "CLP"],
+            "max_bid": [f"{bid}.0", "CLP"],
+            "min_ask": [f"{bid + 100 + i}.0", "CLP"],
+            "volume": ["12.34567891", market_id.split("-")[0]],
+        }
+
+    def answer(self, endpoint: str) -> tuple:
+        """
+        Answer a request to an endpoint of Buda.com API.
+
+        :param str endpoint: requested endpoint, e.g. `/markets`.
+        :returns: The status code and data of the response.
+        :rtype: tuple[int, dict]
+        """
+        with self._lock:
+            self.calls[get_endpoint_class(endpoint)] += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.error_rate
+        sleep(delay)
+        if failed:
+            return 503, {"message": "Service Unavailable"}
+
+        path = endpoint.split("?")[0].strip("/").split("/")
+        if path == ["markets"]:
+            return 200, {
+                "markets": [self.market(m) for m in self.market_ids],
+            }
+        if path == ["tickers"] and self.bulk_tickers:
+            return 200, {
+                "tickers": [self.ticker(m) for m in self.market_ids],
+            }
+        if len(path) in (2, 3) and path[0] == "markets":
+            market_id = path[1].upper()
+            if market_id in self._index and len(path) == 2:
+                return 200, {"market": self.market(market_id)}
+            if market_id in self._index and path[2] == "ticker":
+                return 200, {"ticker": self.ticker(market_id)}
+        return 404, {"message": "Not found", "code": "not_found"}
+
+
+def percentile(ordered: list, rank: float) -> float:
+    """
+    Nearest-rank percentile of sorted values.
+
+    :param list ordered: values in ascending order.
+    :param float rank: percentile to get, between 0 and 100.
+    :rtype: float
+    """
+    if not ordered:
+        return 0
+    index = max(round(rank / 100 * len(ordered)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def run_load(
+    make_client,
+    paths: list,
+    concurrency: int,
+    requests: int,
+) -> dict:
+    """
+    Send GET requests from several threads at once, and summarize their
+    latency and throughput.
+
+    :param callable make_client: creates the client of each thread, e.g.
+    :class:`django.test.Client`.
+    :param list[str] paths: paths requested in turn.
+    :param int concurrency: requests sent at the same time.
+    :param int requests: total requests to send.
+    :returns: The latency percentiles in milliseconds, requests per second,
+    and the responses by status code.
+    :rtype: dict
+    """
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        client = make_client()
+        try:
+            for i in counter:
+                started = monotonic()
+                response = client.get(paths[i % len(paths)])
+                elapsed = monotonic() - started
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[response.status_code] += 1
+        finally:
+            # leave no connection open on the benchmark database
+            connections.close_all()
+
+    started = monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    elapsed = monotonic() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": sum(
+            count for code, count in statuses.items() if code >= 400
+        ),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50": round(percentile(latencies, 50) * 1000, 2),
+        "p95": round(percentile(latencies, 95) * 1000, 2),
+        "p99": round(percentile(latencies, 99) * 1000, 2),
+        "statuses": {str(code): count for code, count in statuses.items()},
+    }
+
+
+def merge_rounds(rounds: list) -> dict:
+    """
+    Merge the summaries of several rounds of the same scenario, keeping
+    the median of each measure, so a single noisy round doesn't skew them.
+
+    :param list[dict] rounds: summaries of each round.
+    :rtype: dict
+    """
+    merged = {
+        key: statistics.median(result[key] for result in rounds)
+        for key in ("rps", "p50", "p95", "p99", "upstream_per_request")
+    }
+    for key in ("requests", "errors"):
+        merged[key] = sum(result[key] for result in rounds)
+    for key in ("statuses", "upstream"):
+        merged[key] = dict(
+            sum((Counter(result[key]) for result in rounds), Counter())
+        )
+    return merged
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Find regressions of a benchmark result versus its baseline.
+
+    :param dict result: summary of a scenario, from :func:`run_load` plus
+    its `upstream_per_request` calls.
+    :param dict baseline: summary of the same scenario stored before.
+    :param float tolerance: relative change allowed, e.g. `0.25` for 25%.
+    :returns: A description of each regression found.
+    :rtype: list[str]
+    """
+    regressions = []
+    # the median depends on how many requests hit the cache, and the tail
+    # on very few of them, so they are too noisy to compare
+    for key in ("p95", "upstream_per_request"):
+        allowed = baseline[key] * (1 + tolerance)
+        if result[key] > allowed and result[key] - baseline[key] > 0.01:
+            regressions.append(
+                f"{key} {result[key]} > {baseline[key]} (baseline)"
+            )
+    if result["rps"] < baseline["rps"] * (1 - tolerance):
+        regressions.append(f"rps {result['rps']} < {baseline['rps']}")
+    if result["errors"] > baseline["errors"]:
+        regressions.append(
+            f"errors {result['errors']} > {baseline['errors']}"
+        )
+    return regressions
@@ -0,0 +1,183 @@
+"""Fan-out of live spread updates to many subscribers."""
+
+import asyncio
+import logging
+from buda.ratelimit import BACKGROUND, priority
+from django.conf import settings
+from .models import BULK_TICKERS_ERRORS, Spread
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    Spread updates received by a single subscriber.
+
+    USAGE
+    >>> async with broadcaster.subscribe(market_ids: list) as subscription:
+    ...     async for spread in subscription:
+    ...         pass
+    """
+
+    def __init__(self, broadcaster, market_ids: set = None):
+        self.broadcaster = broadcaster
+        # `None` means all markets
+        self.market_ids = market_ids
+        self.queue = asyncio.Queue(maxsize=settings.SPREAD_STREAM_QUEUE_SIZE)
+
+    def wants(self, market_id: str) -> bool:
+        return self.market_ids is None or market_id in self.market_ids
+
+    def push(self, spread: Spread):
+        """
+        Queue a spread without waiting, dropping the oldest one if the
+        subscriber is too slow to keep up.
+        """
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(spread)
+
+    async def get(self, timeout: float = None) -> Spread:
+        """
+        Wait for the next spread.
+
+        :param float timeout: seconds to wait before giving up.
+        :returns: The next spread, or `None` if the timeout expired.
+        :rtype: Spread | None
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Spread:
+        return await self.queue.get()
+
+    async def __aenter__(self):
+        self.broadcaster.add(self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.broadcaster.remove(self)
+
+
+class SpreadBroadcaster:
+    """
+    Refreshes the spreads of all markets with a single upstream request
+    per interval, pushing the ones that changed to each subscriber that
+    wants them. Neither the amount of subscribers nor the markets they want
+    affect the requests to Buda.com API.
+
+    The refresh loop runs on the event loop of the first subscriber, only
+    while there are subscribers.
+
+    USAGE
+    >>> broadcaster = SpreadBroadcaster(interval: float)
+    >>> subscription = broadcaster.subscribe(market_ids: list)
+    """
+
+    def __init__(self, interval: float = None):
+        self.interval = interval or settings.SPREAD_STREAM_INTERVAL
+        self.subscriptions = set()
+        self.latest = {}
+        self._task = None
+
+    def subscribe(self, market_ids: list = None) -> Subscription:
+        """
+        Create a subscription to the spreads of some markets.
+
+        :param list market_ids: markets to receive the spread from.
+        If not provided, all available markets are received.
+        :rtype: Subscription
+        """
+        if market_ids is not None:
+            market_ids = {market_id.upper() for market_id in market_ids}
+        return Subscription(self, market_ids)
+
+    def add(self, subscription: Subscription):
+        self.subscriptions.add(subscription)
+
+        # start with the latest spreads already known
+        for market_id, spread in self.latest.items():
+            if subscription.wants(market_id):
+                subscription.push(spread)
+
+        # a task of another event loop, e.g. of a finished one, won't run
+        if (
+            self._task is None
+            or self._task.done()
+            or self._task.get_loop() is not asyncio.get_running_loop()
+        ):
+            self._task = asyncio.ensure_future(self.run())
+
+    def remove(self, subscription: Subscription):
+        self.subscriptions.discard(subscription)
+        if not self.subscriptions and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def wanted_markets(self) -> list:
+        """
+        Markets wanted by any subscriber.
+
+        :returns: The market IDs, or `None` if any subscriber wants all.
+        :rtype: list | None
+        """
+        market_ids = set()
+        for subscription in self.subscriptions:
+            if subscription.market_ids is None:
+                return None
+            market_ids |= subscription.market_ids
+        return sorted(market_ids)
+
+    def publish(self, spreads: list):
+        """
+        Push the spreads that changed to every subscriber that wants them.
+
+        :param list[Spread] spreads: latest spreads.
+        """
+        for spread in spreads:
+            previous = self.latest.get(spread.market_id)
+            if previous is not None and previous.value == spread.value:
+                continue
+            self.latest[spread.market_id] = spread
+            for subscription in self.subscriptions:
+                if subscription.wants(spread.market_id):
+                    subscription.push(spread)
+
+    async def refresh(self):
+        """
+        Retrieve the spreads of all markets at once and publish them. If
+        the bulk tickers endpoint isn't available, only the markets wanted
+        by any subscriber are retrieved, one by one.
+        """
+        with priority(BACKGROUND):
+            try:
+                spreads = await Spread.aget_spreads_in_bulk()
+            except BULK_TICKERS_ERRORS:
+                spreads, _ = await Spread.afetch_each_markets_spread(
+                    self.wanted_markets()
+                )
+        self.publish(spreads)
+
+    async def run(self):
+        """
+        Refresh the spreads periodically until there are no subscribers.
+        """
+        loop = asyncio.get_running_loop()
+        while self.subscriptions:
+            started = loop.time()
+            try:
+                await self.refresh()
+            except Exception:
+                # keep serving the latest spreads until Buda.com recovers
+                logger.exception("Can't refresh the spreads")
+            await asyncio.sleep(
+                max(self.interval - (loop.time() - started), 0)
+            )
+
+
+spread_broadcaster = SpreadBroadcaster()
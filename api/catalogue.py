@@ -0,0 +1,221 @@
+"""
+Local catalogue of the markets available on Buda.com API.
+
+Markets are kept on database, along with a version that changes every time
+any of them is added, removed or changed, and every process keeps a copy in
+memory, so listing the markets or validating a market ID doesn't need any
+request to Buda.com API. The `refresh_markets` command refreshes the
+catalogue in the background, writing only the differences, and processes
+reload their copy when the version changes, checking it at most every
+`MARKET_CATALOGUE_CHECK` seconds.
+
+The API processes load the catalogue when they start, see :meth:`preload`,
+and if it was never filled it's refreshed from Buda.com API first.
+"""
+
+import logging
+import threading
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from requests.exceptions import RequestException
+from time import monotonic
+from .models import Market, MarketCatalogueVersion
+
+logger = logging.getLogger(__name__)
+
+# key of the PostgreSQL advisory lock held while refreshing the catalogue
+LOCK_KEY = 0x6D61726B
+
+
+class MarketCatalogue:
+    """
+    In-memory copy of the markets stored on database.
+
+    USAGE
+    >>> catalogue = MarketCatalogue()
+    >>> markets = catalogue.markets()
+    >>> market = catalogue.get(market_id: str)
+    >>> changes = catalogue.refresh()
+    >>> catalogue.preload()
+    """
+
+    def __init__(self, check_interval: float = None):
+        self.check_interval = (
+            settings.MARKET_CATALOGUE_CHECK
+            if check_interval is None
+            else check_interval
+        )
+        # zero when nothing was stored yet, `None` until loaded
+        self.version = None
+        self._markets = {}
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def load(self, force: bool = False) -> bool:
+        """
+        Reload the markets if the catalogue version changed since the last
+        time.
+
+        :param bool force: check for changes even if it was done recently.
+        :returns: If the markets were reloaded.
+        :rtype: bool
+        """
+        now = monotonic()
+        if (
+            not force
+            and self._checked_at is not None
+            and now - self._checked_at < self.check_interval
+        ):
+            return False
+        self._checked_at = now
+
+        version = MarketCatalogueVersion.objects.aggregate(
+            version=Max("id"),
+        )["version"]
+        version = version or 0
+        if version == self.version:
+            return False
+
+        markets = {market.id: market for market in Market.objects.all()}
+        with self._lock:
+            self._markets = markets
+            self.version = version
+        return True
+
+    def markets(self) -> list:
+        """
+        Get all markets of the catalogue. If it was never filled, it's
+        refreshed from Buda.com API first.
+
+        :returns: A list of markets, sorted by ID.
+        :rtype: list[Market]
+        """
+        self.fill()
+        return sorted(self._markets.values(), key=lambda market: market.id)
+
+    def fill(self):
+        """
+        Load the markets, refreshing them from Buda.com API first if the
+        catalogue was never filled.
+        """
+        self.load()
+        if not self.version:
+            with self._refresh_lock:
+                # another thread may have filled it in the meantime
+                self.load(force=True)
+                if not self.version:
+                    self.refresh()
+
+    def preload(self):
+        """
+        Fill the catalogue when a process starts, so it doesn't wait for the
+        first request. Failures are logged, and it's tried again on the
+        next request.
+        """
+        try:
+            self.fill()
+        except (DatabaseError, RequestException, TimeoutError):
+            logger.exception("Can't load the market catalogue")
+
+    def get(self, market_id: str) -> Market:
+        """
+        Get a market of the catalogue.
+
+        :param str market_id: market identifier, e.g. `btc-clp`.
+        :returns: The market, or `None` if it's not in the catalogue.
+        :rtype: Market | None
+        """
+        self.load()
+        return self._markets.get(market_id.upper())
+
+    def is_known(self, market_id: str) -> bool:
+        """
+        Check if a market exists, without asking Buda.com API unless the
+        catalogue was never filled. If it can't be loaded or filled, any
+        market is assumed to exist, leaving Buda.com API to tell otherwise.
+
+        :param str market_id: market identifier, e.g. `btc-clp`.
+        :rtype: bool
+        """
+        try:
+            self.fill()
+        except (DatabaseError, RequestException, TimeoutError):
+            pass
+        return not self._markets or market_id.upper() in self._markets
+
+    def refresh(self) -> dict:
+        """
+        Retrieve the markets from Buda.com API, and store the ones added,
+        removed or changed as a new version of the catalogue.
+
+        :returns: IDs of the markets `added`, `removed` and `changed`.
+        :rtype: dict[str, list[str]]
+        """
+        fetched = {market.id: market for market in Market.get_all_markets()}
+
+        with transaction.atomic():
+            # refreshes from other processes wait for this one to finish
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT pg_advisory_xact_lock(%s)",
+                        [LOCK_KEY],
+                    )
+            stored = {
+                market.id: market
+                for market in Market.objects.all()
+            }
+            added = [
+                market
+                for market_id, market in fetched.items()
+                if market_id not in stored
+            ]
+            removed = [
+                market_id for market_id in stored if market_id not in fetched
+            ]
+            changed = [
+                market
+                for market_id, market in fetched.items()
+                if market_id in stored
+                and market.data() != stored[market_id].data()
+            ]
+
+            if added or removed or changed:
+                version = MarketCatalogueVersion.objects.create(
+                    added=len(added),
+                    removed=len(removed),
+                    changed=len(changed),
+                )
+                now = timezone.now()
+                for market in added + changed:
+                    market.version = version.pk
+                    market.updated_at = now
+
+                Market.objects.bulk_create(added)
+                Market.objects.bulk_update(
+                    changed,
+                    Market.DATA_FIELDS + ["version", "updated_at"],
+                )
+                Market.objects.filter(id__in=removed).delete()
+
+        self.load(force=True)
+        return {
+            "added": sorted(market.id for market in added),
+            "removed": sorted(removed),
+            "changed": sorted(market.id for market in changed),
+        }
+
+    def clear(self):
+        """
+        Forget the copy in memory, e.g. between tests.
+        """
+        with self._lock:
+            self._markets = {}
+            self.version = None
+            self._checked_at = None
+
+
+market_catalogue = MarketCatalogue()
@@ -0,0 +1,140 @@
+"""
+Compact spreads, calculated and rendered without `Decimal` or models.
+
+Listing the spreads of all markets only needs the best bid and ask of each
+ticker, so they're read as integers scaled to the precision of the market,
+and the spread is rendered straight to the same JSON that
+:class:`api.serializer.SpreadSerializer` and DRF `JSONRenderer` produce.
+"""
+
+import json
+from decimal import Decimal
+from .models import Spread
+
+# decimal places of `Spread.value`, as rendered by its serializer
+PLACES = Spread._meta.get_field("value").decimal_places
+
+
+def parse_scaled(amount) -> tuple:
+    """
+    Parse a decimal amount as an integer scaled by a power of ten.
+
+    :param amount: amount as returned by Buda.com API, e.g. `"40319190.0"`.
+    :returns: The scaled integer and the number of decimal places, e.g.
+    `(403191900, 1)`.
+    :rtype: tuple[int, int]
+    """
+    if isinstance(amount, str):
+        integer, _, fraction = amount.partition(".")
+        if fraction.isdigit() or not fraction:
+            try:
+                return int(integer + fraction), len(fraction)
+            except ValueError:
+                pass
+
+    # exponents, floats and anything else `Decimal` accepts
+    sign, digits, exponent = Decimal(amount).as_tuple()
+    value = int("".join(map(str, digits))) * 10 ** max(exponent, 0)
+    return -value if sign else value, max(-exponent, 0)
+
+
+def format_scaled(value: int, scale: int, places: int = PLACES) -> str:
+    """
+    Format a scaled integer with a fixed number of decimal places, rounding
+    half to even like `Decimal.quantize` does with the default context.
+
+    :param int value: scaled integer.
+    :param int scale: decimal places of the scaled integer.
+    :param int places: decimal places of the result.
+    :rtype: str
+    """
+    sign = "-" if value < 0 else ""
+    value = abs(value)
+    if scale <= places:
+        value *= 10 ** (places - scale)
+    else:
+        divisor = 10 ** (scale - places)
+        value, remainder = divmod(value, divisor)
+        if remainder * 2 > divisor or (
+            remainder * 2 == divisor and value % 2
+        ):
+            value += 1
+
+    digits = str(value).rjust(places + 1, "0")
+    if not places:
+        return sign + digits
+    return f"{sign}{digits[:-places]}.{digits[-places:]}"
+
+
+class CompactSpread:
+    """
+    The spread of a market as a scaled integer, exact to the precision of
+    its best bid and ask.
+
+    USAGE
+    >>> spread = CompactSpread.from_ticker_data(ticker_data: dict)
+    >>> content = render_spreads(spreads: list[CompactSpread])
+    """
+
+    __slots__ = ("market_id", "currency", "value", "scale")
+
+    def __init__(self, market_id: str, currency: str, value: int, scale: int):
+        self.market_id = market_id
+        self.currency = currency
+        self.value = value
+        self.scale = scale
+
+    @classmethod
+    def from_ticker_data(cls, ticker_data: dict):
+        """
+        Calculate the spread from the ticker data returned by Buda.com API.
+
+        :param dict ticker_data: ticker of a market, as returned by
+        `/markets/{market_id}/ticker` or `/tickers` endpoints.
+        :rtype: CompactSpread
+        """
+        max_bid = ticker_data["max_bid"]
+        bid, bid_scale = parse_scaled(max_bid[0])
+        ask, ask_scale = parse_scaled(ticker_data["min_ask"][0])
+
+        scale = max(bid_scale, ask_scale)
+        value = ask * 10 ** (scale - ask_scale) - bid * 10 ** (
+            scale - bid_scale
+        )
+        return cls(ticker_data["market_id"], max_bid[1], value, scale)
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        Read a spread kept by :class:`api.store.SpreadStore`.
+
+        :param dict data: stored spread.
+        :rtype: CompactSpread
+        """
+        value, scale = parse_scaled(data["value"])
+        return cls(data["market_id"], data["currency"], value, scale)
+
+    def to_spread(self) -> Spread:
+        return Spread(
+            market_id=self.market_id,
+            value=Decimal(f"{self.value}E-{self.scale}"),
+            currency=self.currency,
+        )
+
+    def render(self) -> str:
+        return (
+            f'{{"market_id":{json.dumps(self.market_id, ensure_ascii=False)},'
+            f'"value":"{format_scaled(self.value, self.scale)}",'
+            f'"currency":{json.dumps(self.currency, ensure_ascii=False)}}}'
+        )
+
+
+def render_spreads(spreads: list) -> bytes:
+    """
+    Render spreads as a JSON list of :class:`SpreadSerializer` objects.
+
+    :param list[CompactSpread] spreads: spreads to render.
+    :rtype: bytes
+    """
+    content = ",".join(spread.render() for spread in spreads)
+    return f"[{content}]".encode()
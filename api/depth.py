@@ -0,0 +1,200 @@
+"""
+Effective spread of a market for given trade sizes, from its order book.
+
+The spread between the best bid and ask only holds for the smallest
+orders: larger ones walk the book, taking worse prices at each level. The
+effective spread for a size is the difference between the average price
+paid to buy that size, walking the asks, and the average price received to
+sell it, walking the bids.
+
+Each side of the book keeps the cumulative amounts and values of its price
+levels, so pricing a size is a binary search for the level where it ends,
+plus the partial fill of that level. Several sizes are priced in a single
+pass, in ascending order, each search starting where the previous one
+ended.
+"""
+
+from bisect import bisect_left
+from buda.utils import fetch_data
+from decimal import Decimal
+from itertools import accumulate
+
+# sizes given in the base currency (e.g. BTC) or the quote one (e.g. CLP)
+BASE = "base"
+QUOTE = "quote"
+
+
+class BookSide:
+    """
+    Price levels of one side of an order book, with their prefix sums.
+
+    USAGE
+    >>> asks = BookSide(levels: list)
+    >>> prices = asks.average_prices(sizes: list, unit: str)
+    """
+
+    __slots__ = ("prices", "amounts", "values")
+
+    def __init__(self, levels: list):
+        """
+        :param list levels: price and amount of each level, from the best
+        price to the worst, as returned by Buda.com API.
+        """
+        self.prices = [Decimal(price) for price, _ in levels]
+        amounts = [Decimal(amount) for _, amount in levels]
+        # amount and value available up to each level, included
+        self.amounts = list(accumulate(amounts))
+        self.values = list(
+            accumulate(
+                price * amount for price, amount in zip(self.prices, amounts)
+            )
+        )
+
+    def average_prices(self, sizes: list, unit: str = QUOTE) -> list:
+        """
+        Average price of filling each size against this side.
+
+        :param list[Decimal] sizes: sizes to fill, in ascending order.
+        :param str unit: `BASE` if sizes are amounts of the base currency,
+        or `QUOTE` if they are values in the quote currency.
+        :returns: The average price of each size, or `None` for the ones
+        larger than the whole side.
+        :rtype: list[Decimal | None]
+        """
+        totals = self.amounts if unit == BASE else self.values
+        prices = []
+        level = 0
+        for size in sizes:
+            # the first level where the cumulative total reaches the size
+            level = bisect_left(totals, size, level)
+            if level == len(totals) or size <= 0:
+                prices.append(None)
+                continue
+
+            amount = self.amounts[level - 1] if level else Decimal(0)
+            value = self.values[level - 1] if level else Decimal(0)
+            # the remainder is filled at the price of that level
+            if unit == BASE:
+                value += (size - amount) * self.prices[level]
+                amount = size
+            else:
+                amount += (size - value) / self.prices[level]
+                value = size
+            prices.append(value / amount)
+        return prices
+
+
+class EffectiveSpread:
+    """
+    Effective spread of a market for a trade size.
+
+    :param Decimal size: size of the trade.
+    :param Decimal ask: average price to buy the size.
+    :param Decimal bid: average price to sell the size.
+    :param Decimal fee_rate: taker fee, as a fraction of the value traded.
+    """
+
+    __slots__ = ("size", "ask", "bid", "fee_rate")
+
+    def __init__(
+        self,
+        size: Decimal,
+        ask: Decimal,
+        bid: Decimal,
+        fee_rate: Decimal = None,
+    ):
+        self.size = size
+        self.ask = ask
+        self.bid = bid
+        self.fee_rate = fee_rate
+
+    @property
+    def value(self) -> Decimal:
+        if self.ask is None or self.bid is None:
+            return None
+        return self.ask - self.bid
+
+    @property
+    def value_with_fees(self) -> Decimal:
+        """
+        Spread including the taker fee paid both when buying and selling.
+        """
+        if self.value is None or self.fee_rate is None:
+            return None
+        return self.ask * (1 + self.fee_rate) - self.bid * (1 - self.fee_rate)
+
+
+class OrderBook:
+    """
+    Order book of a market, from `/markets/{market_id}/order_book` Buda.com
+    API endpoint.
+
+    USAGE
+    >>> book = OrderBook.fetch(market_id: str)
+    >>> spreads = book.effective_spreads(sizes: list, unit: str)
+    """
+
+    __slots__ = ("market_id", "asks", "bids")
+
+    def __init__(self, market_id: str, asks: list, bids: list):
+        """
+        :param str market_id: market of the order book.
+        :param list asks: price and amount of each ask level, from the
+        lowest price.
+        :param list bids: price and amount of each bid level, from the
+        highest price.
+        """
+        self.market_id = market_id
+        self.asks = BookSide(asks)
+        self.bids = BookSide(bids)
+
+    @classmethod
+    def fetch(cls, market_id: str):
+        """
+        Retrieve the order book of a market from Buda.com API.
+
+        :param str market_id: valid market identifier, e.g. `btc-clp`.
+        :rtype: OrderBook
+        """
+        data = fetch_data(f"/markets/{market_id}/order_book")["order_book"]
+        market_id = data.get("market_id", market_id).upper()
+        return cls(market_id, data["asks"], data["bids"])
+
+    def effective_spreads(
+        self,
+        sizes: list,
+        unit: str = QUOTE,
+        fee_rate: Decimal = None,
+    ) -> list:
+        """
+        Effective spread for each trade size.
+
+        :param list[Decimal] sizes: sizes of the trades, in any order.
+        :param str unit: `BASE` if sizes are amounts of the base currency,
+        or `QUOTE` if they are values in the quote currency.
+        :param Decimal fee_rate: taker fee to include, as a fraction of the
+        value traded.
+        :returns: The spreads, in the same order as the sizes.
+        :rtype: list[EffectiveSpread]
+        """
+        ordered = sorted(set(sizes))
+        asks = dict(zip(ordered, self.asks.average_prices(ordered, unit)))
+        bids = dict(zip(ordered, self.bids.average_prices(ordered, unit)))
+        return [
+            EffectiveSpread(size, asks[size], bids[size], fee_rate)
+            for size in sizes
+        ]
+
+
+def taker_fee_rate(market) -> Decimal:
+    """
+    Taker fee of a market, as a fraction of the value traded.
+
+    Buda.com API gives the fee as a percentage, e.g. `0.8`, and its
+    discount as a percentage of the fee.
+
+    :param Market market: market to get the fee from.
+    :rtype: Decimal
+    """
+    discount = 1 - market.taker_discount_percentage / 100
+    return market.taker_fee / 100 * discount
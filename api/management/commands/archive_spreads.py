@@ -0,0 +1,124 @@
+from datetime import date, datetime, timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from itertools import groupby
+from pathlib import Path
+from time import monotonic
+from ...archive import ArchiveError, SpreadArchive, day_bounds
+from ...models import Spread, SpreadRollupState
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive the spreads history to columnar files by market and day, "
+        "optionally deleting the archived spreads from database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--before",
+            type=date.fromisoformat,
+            help="Archive the days before this one, in UTC. Defaults to "
+            "today, so only complete days are archived.",
+        )
+        parser.add_argument(
+            "--after",
+            type=date.fromisoformat,
+            help="Archive the days from this one on.",
+        )
+        parser.add_argument(
+            "--market-ids",
+            help="Comma separated IDs of the markets to archive. Defaults "
+            "to all of them.",
+        )
+        parser.add_argument(
+            "--directory",
+            type=Path,
+            default=settings.SPREAD_ARCHIVE_DIR,
+            help="Directory of the archive.",
+        )
+        parser.add_argument(
+            "--compress",
+            action="store_true",
+            help="Compress the partitions, which can't be memory-mapped "
+            "then.",
+        )
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="Delete the archived spreads from database, once they're "
+            "rolled up.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=settings.SPREAD_ARCHIVE_CHUNK,
+            help="Spreads read from database at a time.",
+        )
+
+    def handle(self, *args, **options):
+        archive = SpreadArchive(options["directory"])
+        before = options["before"] or datetime.now(timezone.utc).date()
+
+        spreads = Spread.objects.filter(fetch_date__lt=day_bounds(before)[0])
+        if options["after"]:
+            spreads = spreads.filter(
+                fetch_date__gte=day_bounds(options["after"])[0]
+            )
+        if options["market_ids"]:
+            spreads = spreads.filter(
+                market_id__in=[
+                    market_id.strip().upper()
+                    for market_id in options["market_ids"].split(",")
+                ]
+            )
+        # streamed through a server-side cursor, a partition at a time
+        rows = (
+            spreads.order_by("market_id", "fetch_date")
+            .values_list("id", "market_id", "fetch_date", "value", "currency")
+            .iterator(chunk_size=options["chunk_size"])
+        )
+
+        # spreads not rolled up yet are kept for `roll_up_spreads`
+        rolled_id = SpreadRollupState.load().rolled_id
+        started = monotonic()
+        archived = partitions = pruned = 0
+        for (market_id, day), partition in groupby(
+            rows,
+            key=lambda row: (row[1], row[2].astimezone(timezone.utc).date()),
+        ):
+            partition = list(partition)
+            try:
+                archive.write(
+                    market_id,
+                    day,
+                    [row[2:] for row in partition],
+                    compress=options["compress"],
+                )
+            except ArchiveError as e:
+                self.stderr.write(f"Can't archive {market_id} on {day}: {e}")
+                continue
+            archived += len(partition)
+            partitions += 1
+            if options["verbosity"] > 1:
+                self.stdout.write(
+                    f"Archived {len(partition)} spreads of {market_id} on "
+                    f"{day}"
+                )
+
+            if options["prune"]:
+                # spreads of the day saved after they were read are kept
+                start, end = day_bounds(day)
+                pruned += Spread.objects.filter(
+                    market_id=market_id,
+                    fetch_date__gte=start,
+                    fetch_date__lt=end,
+                    id__lte=min(max(row[0] for row in partition), rolled_id),
+                ).delete()[0]
+
+        elapsed = monotonic() - started
+        self.stdout.write(
+            f"Archived {archived} spreads in {partitions} partitions "
+            f"({archived / elapsed if elapsed else 0:.0f} spreads/s)"
+            + (f", {pruned} deleted from database" if options["prune"] else "")
+        )
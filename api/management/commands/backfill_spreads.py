@@ -0,0 +1,116 @@
+import gzip
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from pathlib import Path
+from time import monotonic
+from ...backfill import copy_spreads, date_pattern, parse_line
+from ...models import BackfillCheckpoint
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill the spreads history from a JSON lines file of recorded "
+        "tickers, resuming from the last batch saved if interrupted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            type=Path,
+            help="File of recorded tickers, optionally gzipped.",
+        )
+        parser.add_argument(
+            "--date-field",
+            default="timestamp",
+            help="Field of the tickers with the time they were recorded, "
+            "in ISO 8601 format or as seconds since the epoch.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.SPREAD_BACKFILL_BATCH,
+            help="Spreads written at a time.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the checkpoint, reading the file from the start.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"].resolve()
+        if not path.is_file():
+            raise CommandError(f"{path} doesn't exist")
+        dates = date_pattern(options["date_field"])
+
+        checkpoint, _ = BackfillCheckpoint.objects.get_or_create(
+            source=str(path)
+        )
+        if options["restart"]:
+            checkpoint.offset = checkpoint.rows = 0
+        elif checkpoint.offset:
+            self.stdout.write(
+                f"Resuming after {checkpoint.rows} spreads "
+                f"({checkpoint.offset} bytes)"
+            )
+
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rb") as source:
+            source.seek(checkpoint.offset)
+            # the offset of a gzipped file is on its uncompressed content
+            if source.tell() != checkpoint.offset:
+                raise CommandError(
+                    "The file is shorter than its checkpoint, use --restart "
+                    "if it was replaced"
+                )
+            self.backfill(source, checkpoint, dates, options)
+
+    def backfill(self, source, checkpoint, dates, options):
+        """
+        Read the file line by line, writing its spreads a batch at a time
+        along with the checkpoint after them.
+        """
+        started = reported = monotonic()
+        written = skipped = 0
+        offset = checkpoint.offset
+        batch = []
+
+        def flush():
+            nonlocal written, reported
+            with transaction.atomic():
+                if batch:
+                    copy_spreads(batch)
+                checkpoint.offset = offset
+                checkpoint.rows += len(batch)
+                checkpoint.save()
+            written += len(batch)
+            batch.clear()
+
+            now = monotonic()
+            if now - reported >= 5:
+                reported = now
+                self.stdout.write(
+                    f"{written} spreads written "
+                    f"({written / (now - started):.0f} spreads/s)"
+                )
+
+        for line in source:
+            offset += len(line)
+            if not line.strip():
+                continue
+            row = parse_line(line, dates, options["date_field"])
+            if row is None:
+                skipped += 1
+                continue
+            batch.append(row)
+            if len(batch) >= options["batch_size"]:
+                flush()
+        flush()
+
+        elapsed = monotonic() - started
+        self.stdout.write(
+            f"Backfilled {written} spreads in {elapsed:.1f}s "
+            f"({written / elapsed if elapsed else 0:.0f} spreads/s), "
+            f"{skipped} lines skipped"
+        )
@@ -0,0 +1,275 @@
+import json
+import tempfile
+from buda.breaker import reset_breakers
+from buda.utils import get_cache
+from django.db import connection
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+from pathlib import Path
+from unittest.mock import patch
+from ...benchmark import BudaStandIn, compare, merge_rounds, run_load
+from ...models import Spread
+from ...rendered import rendered_cache
+
+SCENARIOS = ["list", "retrieve", "save", "polling"]
+
+BASELINE = Path(__file__).resolve().parents[2] / "benchmark.json"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the latency and throughput of the spreads endpoints "
+        "against a local stand-in for Buda.com API, comparing them with a "
+        "stored baseline. Runs on a temporary database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "scenarios",
+            nargs="*",
+            help="Endpoints to benchmark, among "
+            f"{', '.join(SCENARIOS)}. Defaults to all of them.",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=500,
+            help="Requests sent to each endpoint on every round.",
+        )
+        parser.add_argument(
+            "--rounds",
+            type=int,
+            default=3,
+            help="Times each endpoint is benchmarked, keeping the median "
+            "of each measure.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=8,
+            help="Requests sent at the same time.",
+        )
+        parser.add_argument(
+            "--markets",
+            type=int,
+            default=20,
+            help="Markets available on the stand-in.",
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.02,
+            help="Seconds the stand-in takes to answer each request.",
+        )
+        parser.add_argument(
+            "--jitter",
+            type=float,
+            default=0,
+            help="Maximum random seconds added to the latency.",
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0,
+            help="Share of the stand-in responses that fail, from 0 to 1.",
+        )
+        parser.add_argument(
+            "--no-bulk",
+            action="store_true",
+            help="Make the `/tickers` endpoint unavailable on the stand-in.",
+        )
+        parser.add_argument(
+            "--rate-limit",
+            type=float,
+            default=0,
+            help="Requests per second allowed to the stand-in (zero "
+            "disables the limit).",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the random latencies and errors.",
+        )
+        parser.add_argument(
+            "--baseline",
+            type=Path,
+            default=BASELINE,
+            help="File with the results to compare against.",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Store the results as the new baseline.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.5,
+            help="Relative change versus the baseline considered a "
+            "regression.",
+        )
+
+    def handle(self, *args, **options):
+        scenarios = options["scenarios"] or SCENARIOS
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(unknown)}")
+
+        config = {
+            key: options[key]
+            for key in (
+                "requests",
+                "rounds",
+                "concurrency",
+                "markets",
+                "latency",
+                "jitter",
+                "error_rate",
+                "no_bulk",
+                "rate_limit",
+                "seed",
+            )
+        }
+        stand_in = BudaStandIn(
+            markets=options["markets"],
+            latency=options["latency"],
+            jitter=options["jitter"],
+            error_rate=options["error_rate"],
+            bulk_tickers=not options["no_bulk"],
+            seed=options["seed"],
+        ).start()
+
+        # the spreads saved by the benchmark don't belong to any database
+        # in use, and neither do the stored spreads or the request budget
+        database = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0,
+            autoclobber=True,
+            serialize=False,
+        )
+        try:
+            with tempfile.TemporaryDirectory() as directory, override_settings(
+                ALLOWED_HOSTS=["testserver"],
+                CACHES={
+                    "default": {
+                        "BACKEND": "django.core.cache.backends.locmem."
+                        "LocMemCache",
+                    },
+                    "spreads": {
+                        "BACKEND": "django.core.cache.backends.locmem."
+                        "LocMemCache",
+                        "LOCATION": "benchmark",
+                    },
+                },
+                BUDA_RATE_LIMIT=options["rate_limit"],
+                BUDA_RATE_LIMIT_FILE=f"{directory}/bucket",
+            ), patch("buda.utils.BASE_URL", stand_in.base_url):
+                results = {
+                    scenario: merge_rounds(
+                        [
+                            self.run_scenario(scenario, stand_in, options)
+                            for _ in range(options["rounds"])
+                        ]
+                    )
+                    for scenario in scenarios
+                }
+        finally:
+            # reconnects to the database in use
+            connection.creation.destroy_test_db(database, verbosity=0)
+            stand_in.stop()
+
+        self.report(results, config, options)
+
+    def run_scenario(
+        self,
+        scenario: str,
+        stand_in: BudaStandIn,
+        options: dict,
+    ) -> dict:
+        """
+        Benchmark an endpoint, starting from empty caches.
+
+        :param str scenario: endpoint to benchmark, one of `SCENARIOS`.
+        :param BudaStandIn stand_in: stand-in for Buda.com API in use.
+        :param dict options: options of the command.
+        :returns: The summary of :func:`api.benchmark.run_load`, with the
+        requests received by the stand-in.
+        :rtype: dict
+        """
+        get_cache().clear()
+        rendered_cache.clear()
+        reset_breakers()
+
+        if scenario == "list":
+            paths = [reverse("spread-list")]
+        else:
+            name = f"spread-{'detail' if scenario == 'retrieve' else scenario}"
+            paths = [
+                reverse(name, kwargs={"market_id": market_id})
+                for market_id in stand_in.market_ids
+            ]
+        if scenario == "polling" and not Spread.objects.exists():
+            # a stored spread to compare with for every market
+            Spread.objects.bulk_create(
+                Spread.fetch_each_markets_spread(stand_in.market_ids)[0]
+            )
+
+        calls = stand_in.calls.copy()
+        result = run_load(
+            Client,
+            paths,
+            options["concurrency"],
+            options["requests"],
+        )
+        upstream = stand_in.calls - calls
+        result["upstream"] = dict(upstream)
+        result["upstream_per_request"] = round(
+            upstream.total() / result["requests"],
+            3,
+        )
+        return result
+
+    def report(self, results: dict, config: dict, options: dict):
+        baseline = None
+        if options["baseline"].exists():
+            stored = json.loads(options["baseline"].read_text())
+            if stored["config"] == config:
+                baseline = stored["results"]
+            else:
+                self.stderr.write(
+                    "The baseline was measured with other options, "
+                    "so it's not compared"
+                )
+
+        regressions = []
+        for scenario, result in results.items():
+            self.stdout.write(
+                f"{scenario:<9} {result['rps']:>8} req/s  "
+                f"p50 {result['p50']:>7} ms  "
+                f"p95 {result['p95']:>7} ms  "
+                f"p99 {result['p99']:>7} ms  "
+                f"errors {result['errors']:>4}  "
+                f"upstream {result['upstream_per_request']}/req"
+            )
+            if baseline is not None and scenario in baseline:
+                regressions += [
+                    f"{scenario}: {regression}"
+                    for regression in compare(
+                        result,
+                        baseline[scenario],
+                        options["tolerance"],
+                    )
+                ]
+
+        if options["save_baseline"]:
+            options["baseline"].write_text(
+                json.dumps({"config": config, "results": results}, indent=2)
+                + "\n"
+            )
+            self.stdout.write(f"Saved the baseline to {options['baseline']}")
+        elif regressions:
+            raise CommandError(
+                "Regressions versus the baseline:\n" + "\n".join(regressions)
+            )
@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from ...partitions import create_partition, is_partitioned, month_bounds
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the monthly partitions of the spreads table ahead of time. "
+        "Meant to be run periodically, e.g. once a day."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months",
+            type=int,
+            default=3,
+            help="Number of months ahead to create partitions for.",
+        )
+
+    def handle(self, *args, **options):
+        if not is_partitioned(connection):
+            self.stdout.write("The spreads table isn't partitioned")
+            return
+
+        month = datetime.now(timezone.utc).date().replace(day=1)
+        for _ in range(options["months"] + 1):
+            with transaction.atomic():
+                if create_partition(connection, month):
+                    self.stdout.write(f"Created partition for {month:%Y-%m}")
+            month = month_bounds(month)[1].date()
@@ -0,0 +1,62 @@
+from buda.ratelimit import BACKGROUND, priority
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from requests.exceptions import RequestException
+from time import monotonic, sleep
+from ...alerts import alert_engine
+from ...models import Spread
+from ...store import spread_store
+
+
+class Command(BaseCommand):
+    help = (
+        "Periodically calculate the spread of all markets and keep the "
+        "latest ones stored, so the API can serve them without waiting "
+        "on Buda.com API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.SPREAD_INGEST_INTERVAL,
+            help="Seconds between each refresh of the spreads.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Refresh the spreads a single time and exit.",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+
+        while True:
+            started = monotonic()
+            self.ingest()
+            if options["once"]:
+                break
+
+            # keep a steady schedule, regardless of how long it took
+            sleep(max(interval - (monotonic() - started), 0))
+
+    def ingest(self):
+        """
+        Calculate and store the spread of all markets, checking them
+        against the alert rules.
+
+        Errors are reported but don't stop the worker, the stored spreads
+        are kept until the next successful refresh.
+        """
+        try:
+            with priority(BACKGROUND):
+                spreads = Spread.get_each_markets_spread()
+        except (RequestException, TimeoutError) as e:
+            self.stderr.write(f"Can't retrieve the spreads: {e}")
+            return
+
+        spread_store.set_many(spreads)
+        self.stdout.write(f"Stored the spread of {len(spreads)} markets")
+
+        alert_engine.refresh()
+        alert_engine.process(spreads)
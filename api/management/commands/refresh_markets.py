@@ -0,0 +1,59 @@
+from buda.ratelimit import BACKGROUND, priority
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from requests.exceptions import RequestException
+from time import monotonic, sleep
+from ...catalogue import market_catalogue
+
+
+class Command(BaseCommand):
+    help = (
+        "Periodically refresh the market catalogue from Buda.com API, "
+        "storing only the markets added, removed or changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.MARKET_CATALOGUE_REFRESH,
+            help="Seconds between each refresh of the catalogue.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Refresh the catalogue a single time and exit.",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+
+        while True:
+            started = monotonic()
+            self.refresh()
+            if options["once"]:
+                break
+
+            # keep a steady schedule, regardless of how long it took
+            sleep(max(interval - (monotonic() - started), 0))
+
+    def refresh(self):
+        """
+        Refresh the market catalogue.
+
+        Errors are reported but don't stop the worker, the stored markets
+        are kept until the next successful refresh.
+        """
+        try:
+            with priority(BACKGROUND):
+                changes = market_catalogue.refresh()
+        except (RequestException, TimeoutError) as e:
+            self.stderr.write(f"Can't retrieve the markets: {e}")
+            return
+
+        self.stdout.write(
+            f"Market catalogue version {market_catalogue.version}: "
+            f"{len(changes['added'])} added, "
+            f"{len(changes['removed'])} removed, "
+            f"{len(changes['changed'])} changed"
+        )
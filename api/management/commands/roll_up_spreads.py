@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from time import monotonic, sleep
+from ...retention import prune_rollups, prune_spreads, roll_up
+
+
+class Command(BaseCommand):
+    help = (
+        "Periodically roll up the new spreads by minute, hour and day, "
+        "and delete the spreads and rollups past their retention."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.SPREAD_ROLLUP_INTERVAL,
+            help="Seconds between each run.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run a single time and exit.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.SPREAD_RETENTION_BATCH,
+            help="Rows deleted by each statement.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=settings.SPREAD_RETENTION_PAUSE,
+            help="Seconds between each delete statement.",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+
+        while True:
+            started = monotonic()
+            self.run(options)
+            if options["once"]:
+                break
+
+            # keep a steady schedule, regardless of how long it took
+            sleep(max(interval - (monotonic() - started), 0))
+
+    def run(self, options: dict):
+        """
+        Roll up the new spreads, then delete the old ones.
+        """
+        delete = {"batch": options["batch_size"], "pause": options["pause"]}
+        rolled = roll_up()
+        deleted = prune_spreads(**delete)
+        rollups = prune_rollups(**delete)
+
+        deleted = [f"{deleted} spreads"] + [
+            f"{count} {resolution} rollups"
+            for resolution, count in rollups.items()
+        ]
+        self.stdout.write(
+            f"Rolled up {rolled} spreads, deleted {', '.join(deleted)}"
+        )
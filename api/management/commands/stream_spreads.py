@@ -0,0 +1,106 @@
+import asyncio
+from asgiref.sync import sync_to_async
+from buda.ratelimit import BACKGROUND, priority
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from requests.exceptions import RequestException
+from time import time
+from ...alerts import alert_engine
+from ...models import Spread
+from ...store import spread_store
+from ...streaming import BookFeed
+
+
+class Command(BaseCommand):
+    help = (
+        "Follow the order books of all markets through Buda.com websocket "
+        "feed, keeping the latest spreads stored as they change."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "market_ids",
+            nargs="*",
+            help="Markets to follow. Defaults to all available markets.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.SPREAD_INGEST_INTERVAL,
+            help=(
+                "Seconds between each refresh of the age of the stored "
+                "spreads whose books were updated without changing them."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        # start from the current spreads, until the feed syncs each book
+        try:
+            with priority(BACKGROUND):
+                spreads = Spread.get_each_markets_spread()
+        except (RequestException, TimeoutError) as e:
+            raise CommandError(f"Can't retrieve the spreads: {e}")
+
+        market_ids = options["market_ids"] or [
+            spread.market_id for spread in spreads
+        ]
+        spread_store.set_many(spreads)
+        alert_engine.refresh(force=True)
+        alert_engine.process(spreads)
+
+        # latest spread of each market changed since the last write
+        self.pending = {}
+        self.writer = None
+        feed = BookFeed(market_ids, on_spread=self.store)
+        self.stdout.write(f"Following {len(market_ids)} markets")
+        asyncio.run(self.stream(feed, options["interval"]))
+
+    def store(self, spread: Spread):
+        """
+        Queue a changed spread to be stored, off the event loop. Changes
+        received while the previous ones are written are stored together,
+        keeping only the latest spread of each market.
+        """
+        self.pending[spread.market_id] = spread
+        if self.writer is None or self.writer.done():
+            self.writer = asyncio.ensure_future(self.write())
+
+    async def write(self):
+        """
+        Store the queued spreads and check the alert rules on them, a
+        batch at a time, until none is left.
+        """
+        while self.pending:
+            spreads = list(self.pending.values())
+            self.pending.clear()
+            await sync_to_async(self.save)(spreads)
+
+    def save(self, spreads: list):
+        spread_store.update(spreads)
+        alert_engine.process(spreads)
+
+    async def stream(self, feed: BookFeed, interval: float):
+        """
+        Run the feed, periodically storing again the spreads of the books
+        updated since the previous time, since an update away from the top
+        of the book still confirms its spread, and reloading the alert
+        rules if they changed.
+
+        Spreads are stored dated when their books were last updated, so
+        the ones of disconnected books age until they're no longer served.
+        """
+        task = asyncio.ensure_future(feed.run())
+        flushed = time()
+        try:
+            while not task.done():
+                await asyncio.sleep(interval)
+                now = time()
+                spreads = feed.spreads(since=flushed)
+                flushed = now
+                if spreads:
+                    await sync_to_async(spread_store.update)(spreads)
+                await sync_to_async(alert_engine.refresh)()
+        finally:
+            task.cancel()
+            if self.writer is not None:
+                self.writer.cancel()
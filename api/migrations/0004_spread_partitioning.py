@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2024-02-20 22:14
+
+import api.models
+from django.db import migrations, models
+from django.db.models.functions import Upper
+
+
+def normalize_market_ids(apps, schema_editor):
+    Spread = apps.get_model("api", "Spread")
+    Spread.objects.using(schema_editor.connection.alias).update(
+        market_id=Upper("market_id"),
+    )
+
+
+def partition_spreads(apps, schema_editor):
+    from api.partitions import is_partitioned, partition_table
+
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql" and not is_partitioned(connection):
+        partition_table(connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_polling'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_market_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='spread',
+            name='market_id',
+            field=api.models.MarketIdField(max_length=30),
+        ),
+        migrations.RunPython(partition_spreads, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='spread',
+            index=models.Index(fields=['market_id', '-fetch_date'], name='spread_market_latest_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2024-02-21 19:32
+
+import api.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_spread_partitioning'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('market_id', api.models.MarketIdField(max_length=30)),
+                ('kind', models.CharField(choices=[('absolute', 'Absolute'), ('percentage', 'Percentage')], default='absolute', max_length=10)),
+                ('direction', models.CharField(choices=[('any', 'Any'), ('up', 'Up'), ('down', 'Down')], default='any', max_length=4)),
+                ('threshold', models.DecimalField(decimal_places=10, max_digits=22)),
+                ('baseline', models.DecimalField(decimal_places=10, max_digits=22)),
+                ('webhook_url', models.URLField()),
+                ('last_triggered', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['market_id'], name='alert_rule_market_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.1 on 2024-02-28 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_alert_rule'),
+    ]
+
+    operations = [
+        # markets were never stored, so the unmanaged model is replaced by
+        # one with a table
+        migrations.DeleteModel(
+            name='Market',
+        ),
+        migrations.CreateModel(
+            name='Market',
+            fields=[
+                ('id', models.CharField(max_length=30, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=30)),
+                ('base_currency', models.CharField(max_length=15)),
+                ('quote_currency', models.CharField(max_length=15)),
+                ('max_orders_per_minute', models.PositiveSmallIntegerField()),
+                ('min_order_amount_currency', models.CharField(max_length=15)),
+                ('min_order_amount_value', models.DecimalField(decimal_places=10, max_digits=22)),
+                ('taker_fee', models.DecimalField(decimal_places=10, max_digits=22)),
+                ('taker_discount_percentage', models.DecimalField(decimal_places=10, max_digits=22)),
+                ('maker_fee', models.DecimalField(decimal_places=10, max_digits=22)),
+                ('maker_discount_percentage', models.DecimalField(decimal_places=10, max_digits=22)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MarketCatalogueVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('added', models.PositiveIntegerField(default=0)),
+                ('removed', models.PositiveIntegerField(default=0)),
+                ('changed', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
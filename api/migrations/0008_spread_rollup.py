@@ -0,0 +1,45 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:47
+
+import api.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_backfill_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpreadRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rolled_id', models.BigIntegerField(default=0)),
+                ('pending_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SpreadRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('market_id', api.models.MarketIdField(max_length=30)),
+                ('resolution', models.CharField(choices=[('day', 'day'), ('hour', 'hour'), ('minute', 'minute')], max_length=10)),
+                ('bucket', models.DateTimeField()),
+                ('count', models.PositiveIntegerField()),
+                ('total', models.DecimalField(decimal_places=10, max_digits=32)),
+                ('min_value', models.DecimalField(decimal_places=10, max_digits=22)),
+                ('max_value', models.DecimalField(decimal_places=10, max_digits=22)),
+                ('last_value', models.DecimalField(decimal_places=10, max_digits=22)),
+                ('last_fetch_date', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['resolution', 'bucket'], name='spread_rollup_age_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='spreadrollup',
+            constraint=models.UniqueConstraint(fields=('market_id', 'resolution', 'bucket'), name='spread_rollup_bucket_unique'),
+        ),
+    ]
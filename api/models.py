@@ -1,6 +1,201 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
 from django.db import models
-from buda.utils import fetch_data
+from django.db.models.functions import Trunc
+from buda.aio import afetch_data, afetch_concurrently
+from buda.metrics import timed
+from buda.utils import fetch_data, fetch_concurrently
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
+from requests.exceptions import HTTPError
+
+# Errors meaning the bulk tickers endpoint can't be used to get the spreads.
+BULK_TICKERS_ERRORS = (HTTPError, KeyError, IndexError, TypeError)
+
+# Sizes of the time buckets to aggregate the spreads history.
+HISTORY_BUCKETS = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+    "month": None,
+}
+
+# Aggregations available for the spread values of each bucket.
+HISTORY_AGGREGATIONS = ["min", "max", "avg", "last"]
+
+# Resolutions of the rollups of the spreads history, from the coarsest.
+ROLLUP_RESOLUTIONS = {
+    "day": timedelta(days=1),
+    "hour": timedelta(hours=1),
+    "minute": timedelta(minutes=1),
+}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class Last(models.Func):
+    """
+    Last value of an aggregated group, ordered by `fetch_date`, or by the
+    given field. Only available on PostgreSQL.
+    """
+
+    template = "(%(expressions)s)[1]"
+
+    def __init__(self, expression: str, by: str = "fetch_date", **extra):
+        super().__init__(
+            ArrayAgg(expression, ordering=f"-{by}"),
+            output_field=models.DecimalField(max_digits=22, decimal_places=10),
+            **extra,
+        )
+
+
+def bucket_end(start: datetime, bucket: str) -> datetime:
+    """
+    First instant after a time bucket.
+
+    :param datetime start: first instant of the bucket, in UTC.
+    :param str bucket: size of the bucket, one of :data:`HISTORY_BUCKETS`.
+    :rtype: datetime
+    """
+    if bucket != "month":
+        return start + HISTORY_BUCKETS[bucket]
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def floor_to(moment: datetime, resolution: str) -> datetime:
+    """
+    Start of the rollup bucket of a moment.
+
+    :param datetime moment: any moment.
+    :param str resolution: one of :data:`ROLLUP_RESOLUTIONS`.
+    :rtype: datetime
+    """
+    return moment - (moment - EPOCH) % ROLLUP_RESOLUTIONS[resolution]
+
+
+def ceil_to(moment: datetime, resolution: str) -> datetime:
+    """
+    Start of the first rollup bucket from a moment on.
+
+    :param datetime moment: any moment.
+    :param str resolution: one of :data:`ROLLUP_RESOLUTIONS`.
+    :rtype: datetime
+    """
+    floor = floor_to(moment, resolution)
+    if floor == moment:
+        return moment
+    return floor + ROLLUP_RESOLUTIONS[resolution]
+
+
+def spreads_kept_since() -> datetime:
+    """
+    Earliest fetch date from which all spreads are still stored, since only
+    the older ones are deleted once rolled up (see :mod:`api.retention`).
+
+    :rtype: datetime
+    """
+    return datetime.now(timezone.utc) - timedelta(
+        days=settings.SPREAD_RETENTION_DAYS
+    )
+
+
+def rollup_resolution(bucket: str, start: datetime, end: datetime) -> str:
+    """
+    Resolution of the rollups to aggregate the spreads history from.
+
+    The coarsest resolution that fits in the buckets is used if each bound
+    of the range is at its bucket bounds, or the spreads around it are
+    still stored, so the rollups can be clipped with them. Otherwise, the
+    finest one still kept for the start of the range is used, and the
+    rollups at the bounds of the range are counted whole.
+
+    :param str bucket: size of the buckets, one of :data:`HISTORY_BUCKETS`.
+    :param datetime start: earliest fetch date included.
+    :param datetime end: fetch date from which spreads are excluded.
+    :rtype: str
+    """
+    size = HISTORY_BUCKETS[bucket] or HISTORY_BUCKETS["day"]
+    fitting = [
+        resolution
+        for resolution, length in ROLLUP_RESOLUTIONS.items()
+        if length <= size
+    ]
+    kept_since = spreads_kept_since()
+    for resolution in fitting:
+        if (floor_to(start, resolution) == start or start >= kept_since) and (
+            floor_to(end, resolution) >= kept_since
+            or floor_to(end, resolution) == end
+        ):
+            return resolution
+
+    now = datetime.now(timezone.utc)
+    for resolution in reversed(fitting):
+        kept = settings.SPREAD_ROLLUP_RETENTION[resolution]
+        if kept is None or start >= now - timedelta(days=kept):
+            return resolution
+    return fitting[0]
+
+
+def merge_buckets(groups: list, aggregations: list, limit: int) -> list:
+    """
+    Merge the aggregations of the same buckets calculated separately, e.g.
+    from the rollups and from the spreads not rolled up yet.
+
+    :param list groups: rows of each source, with the `bucket`, `count`,
+    `sum`, `min`, `max` and `last` values, and the `latest` fetch date.
+    :param list aggregations: aggregations to return.
+    :param int limit: maximum number of buckets returned.
+    :rtype: list[dict]
+    """
+    buckets = {}
+    for rows in groups:
+        for row in rows:
+            merged = buckets.get(row["bucket"])
+            if merged is None:
+                buckets[row["bucket"]] = dict(row)
+                continue
+            merged["count"] += row["count"]
+            merged["sum"] += row["sum"]
+            merged["min"] = min(merged["min"], row["min"])
+            merged["max"] = max(merged["max"], row["max"])
+            if row["latest"] > merged["latest"]:
+                merged["last"] = row["last"]
+                merged["latest"] = row["latest"]
+
+    history = []
+    for bucket in sorted(buckets)[:limit]:
+        row = buckets[bucket]
+        row["avg"] = row["sum"] / row["count"]
+        history.append(
+            {
+                "bucket": bucket,
+                "count": row["count"],
+                **{name: row[name] for name in aggregations},
+            }
+        )
+    return history
+
+
+class MarketIdField(models.CharField):
+    """
+    A market identifier, always saved and looked up in upper case, e.g.
+    `BTC-CLP`, so queries can match it exactly and make use of indexes.
+    """
+
+    def pre_save(self, model_instance, add):
+        value = super().pre_save(model_instance, add)
+        if isinstance(value, str):
+            value = value.upper()
+            setattr(model_instance, self.attname, value)
+        return value
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        return value.upper() if isinstance(value, str) else value
 
 
 class Market(models.Model):
@@ -8,6 +203,10 @@ class Market(models.Model):
     A class that stores all data returned from `/markets/{market_id}`
     Buda.com API endpoint.
 
+    The markets available are kept on database by the market catalogue
+    (see :mod:`api.catalogue`), so they don't need to be retrieved from
+    Buda.com API every time.
+
     To initialize you must provide one of these arguments: a `market_id` to
     retrieve the data directly from Buda.com API, or a dictionary already
     populated with the required data. If you provide both, the dictionary
@@ -51,6 +250,24 @@ class Market(models.Model):
         decimal_places=10,
     )
 
+    # catalogue version in which the market was added or last changed
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # data of the market that Buda.com API may change
+    DATA_FIELDS = [
+        "name",
+        "base_currency",
+        "quote_currency",
+        "max_orders_per_minute",
+        "min_order_amount_currency",
+        "min_order_amount_value",
+        "taker_fee",
+        "taker_discount_percentage",
+        "maker_fee",
+        "maker_discount_percentage",
+    ]
+
     @classmethod
     def create(cls, market_id: str = "", market_data: dict = {}):
         """
@@ -110,8 +327,37 @@ class Market(models.Model):
 
         return markets
 
-    class Meta:
-        managed = False
+    @classmethod
+    async def aget_all_markets(cls) -> list:
+        """
+        Asynchronous version of :meth:`get_all_markets`.
+
+        :returns: A list of markets.
+        :rtype: list[Market]
+        """
+        markets_data = (await afetch_data("/markets"))["markets"]
+        return [cls.create("", market_data) for market_data in markets_data]
+
+    def data(self) -> tuple:
+        """
+        Values of the data of the market that Buda.com API may change, to
+        find out if it did.
+
+        :rtype: tuple
+        """
+        return tuple(getattr(self, field) for field in self.DATA_FIELDS)
+
+
+class MarketCatalogueVersion(models.Model):
+    """
+    A change of the markets available on Buda.com API, or of their data,
+    e.g. their fees. The latest one is the current catalogue version.
+    """
+
+    added = models.PositiveIntegerField(default=0)
+    removed = models.PositiveIntegerField(default=0)
+    changed = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
 
 
 class Ticker(models.Model):
@@ -121,6 +367,7 @@ class Ticker(models.Model):
 
     USAGE
     >>> ticker = Ticker.create(market_id: str)
+    >>> ticker = Ticker.create("", ticker_data: dict)
     """
 
     market_id = models.CharField(max_length=30)
@@ -147,36 +394,54 @@ class Ticker(models.Model):
     fetch_date = models.DateTimeField(auto_now_add=True)
 
     @classmethod
-    def create(cls, market_id: str):
+    def create(cls, market_id: str = "", ticker_data: dict = {}):
         """
         Custom method to initialize a :class:`Ticker` instance.
 
         :param str market_id: valid market identifier, e.g. `btc-clp`.
+        :param dict ticker_data: already populated with all required
+        data to initialize the object.
         :rtype: Ticker
         """
-        # retrieve the ticket for the specific market
-        endpoint = f"/markets/{market_id}/ticker"
-        ticker_data = fetch_data(endpoint)["ticker"]  # TODO: ?
+        if not ticker_data:
+            # retrieve the ticket for the specific market
+            endpoint = f"/markets/{market_id}/ticker"
+            ticker_data = fetch_data(endpoint)["ticker"]  # TODO: ?
 
-        # create the instance
-        ticker = cls(
-            market_id=ticker_data["market_id"],
-            price_variation_24h=Decimal(ticker_data["price_variation_24h"]),
-            price_variation_7d=Decimal(ticker_data["price_variation_7d"]),
-            # The API return all figures as an array, where the first
-            # element is the amount and the second is the currency code.
-            # We save each value separately for easy managment.
-            last_price_value=Decimal(ticker_data["last_price"][0]),
-            last_price_currency=ticker_data["last_price"][1],
-            max_bid_value=Decimal(ticker_data["max_bid"][0]),
-            max_bid_currency=ticker_data["max_bid"][1],
-            min_ask_value=Decimal(ticker_data["min_ask"][0]),
-            min_ask_currency=ticker_data["min_ask"][1],
-            volume_value=Decimal(ticker_data["volume"][0]),
-            volume_currency=ticker_data["volume"][1],
-        )
+        # create the instance, timing how long parsing its figures takes
+        with timed("parse", ticker_data["market_id"]):
+            ticker = cls(
+                market_id=ticker_data["market_id"],
+                price_variation_24h=Decimal(
+                    ticker_data["price_variation_24h"]
+                ),
+                price_variation_7d=Decimal(ticker_data["price_variation_7d"]),
+                # The API return all figures as an array, where the first
+                # element is the amount and the second is the currency
+                # code. We save each value separately for easy managment.
+                last_price_value=Decimal(ticker_data["last_price"][0]),
+                last_price_currency=ticker_data["last_price"][1],
+                max_bid_value=Decimal(ticker_data["max_bid"][0]),
+                max_bid_currency=ticker_data["max_bid"][1],
+                min_ask_value=Decimal(ticker_data["min_ask"][0]),
+                min_ask_currency=ticker_data["min_ask"][1],
+                volume_value=Decimal(ticker_data["volume"][0]),
+                volume_currency=ticker_data["volume"][1],
+            )
         return ticker
 
+    @classmethod
+    async def acreate(cls, market_id: str):
+        """
+        Asynchronous version of :meth:`create`.
+
+        :param str market_id: valid market identifier, e.g. `btc-clp`.
+        :rtype: Ticker
+        """
+        endpoint = f"/markets/{market_id}/ticker"
+        ticker_data = (await afetch_data(endpoint))["ticker"]
+        return cls.create("", ticker_data)
+
     class Meta:
         managed = False
 
@@ -187,46 +452,467 @@ class Spread(models.Model):
 
     USAGE
     >>> spread = Spread.create(market_id: str)
+    >>> spread = Spread.create("", ticker_data: dict)
     """
 
-    market_id = models.CharField(max_length=30)
+    market_id = MarketIdField(max_length=30)
     value = models.DecimalField(max_digits=22, decimal_places=10)
     currency = models.CharField(max_length=15)
     fetch_date = models.DateTimeField(auto_now_add=True)
 
     @classmethod
-    def create(cls, market_id: str):
+    def create(cls, market_id: str = "", ticker_data: dict = {}):
         """
         Custom method to initialize a :class:`Spread` instance.
 
         :param str market_id: valid market identifier, e.g. `btc-clp`.
+        :param dict ticker_data: ticker already retrieved for the market,
+        to avoid fetching it again.
         :rtype: Spread
         """
         # get the ticker for the given market
-        ticker = Ticker.create(market_id)
+        ticker = Ticker.create(market_id, ticker_data)
+        return cls.from_ticker(ticker)
 
-        # create the instance
-        spread = cls(
+    @classmethod
+    async def acreate(cls, market_id: str):
+        """
+        Asynchronous version of :meth:`create`.
+
+        :param str market_id: valid market identifier, e.g. `btc-clp`.
+        :rtype: Spread
+        """
+        ticker = await Ticker.acreate(market_id)
+        return cls.from_ticker(ticker)
+
+    @classmethod
+    def from_ticker(cls, ticker: Ticker):
+        """
+        Initialize a :class:`Spread` instance from the ticker of a market.
+
+        :param Ticker ticker: ticker of the market.
+        :rtype: Spread
+        """
+        return cls(
             market_id=ticker.market_id,
             value=ticker.min_ask_value - ticker.max_bid_value,
             currency=ticker.max_bid_currency,
         )
-        return spread
 
     @classmethod
-    def get_each_markets_spread(cls) -> list:
+    def from_ticker_data(cls, ticker_data: dict):
         """
-        Calculates the spread for all markets available on Buda.com API.
+        Initialize a :class:`Spread` instance straight from the ticker data
+        returned by Buda.com API, reading only its best bid and ask.
 
+        :param dict ticker_data: ticker of a market, as returned by
+        `/markets/{market_id}/ticker` or `/tickers` endpoints.
+        :rtype: Spread
+        """
+        max_bid = ticker_data["max_bid"]
+        min_ask = ticker_data["min_ask"]
+        return cls(
+            market_id=ticker_data["market_id"],
+            value=Decimal(min_ask[0]) - Decimal(max_bid[0]),
+            currency=max_bid[1],
+        )
+
+    @classmethod
+    def get_spreads_in_bulk(cls, build=None) -> list:
+        """
+        Calculates the spread for all markets with a single request to
+        the `/tickers` endpoint of Buda.com API.
+
+        :param callable build: builds each spread from its ticker data.
+        Defaults to :meth:`from_ticker_data`.
+        :returns: A list of spreads.
+        :rtype: list[Spread]
+        """
+        build = build or cls.from_ticker_data
+        tickers_data = fetch_data("/tickers")["tickers"]
+        return [build(data) for data in tickers_data]
+
+    @classmethod
+    async def aget_spreads_in_bulk(cls, build=None) -> list:
+        """
+        Asynchronous version of :meth:`get_spreads_in_bulk`.
+
+        :param callable build: builds each spread from its ticker data.
+        Defaults to :meth:`from_ticker_data`.
         :returns: A list of spreads.
         :rtype: list[Spread]
         """
+        build = build or cls.from_ticker_data
+        tickers_data = (await afetch_data("/tickers"))["tickers"]
+        return [build(data) for data in tickers_data]
+
+    @classmethod
+    def fetch_each_markets_spread(
+        cls,
+        market_ids: list = None,
+        build=None,
+    ) -> tuple:
+        """
+        Calculates the spread for several markets, fetching all their
+        tickers concurrently.
+
+        A market that can't be retrieved doesn't discard the others: its
+        error is returned alongside the spreads that were calculated.
+
+        :param list market_ids: markets to calculate the spread from.
+        If not provided, all markets available on Buda.com API are used,
+        retrieving their tickers at once from the `/tickers` endpoint
+        when it's available, or else from the market catalogue.
+        :param callable build: builds each spread from its ticker data.
+        Defaults to :meth:`from_ticker_data`.
+        :returns: The spreads calculated, and the errors by market ID.
+        :rtype: tuple[list[Spread], dict[str, Exception]]
+        """
+        build = build or cls.from_ticker_data
+        if market_ids is None:
+            try:
+                return cls.get_spreads_in_bulk(build), {}
+            except BULK_TICKERS_ERRORS:
+                # imported here, since the catalogue depends on the models
+                from .catalogue import market_catalogue
+
+                markets = market_catalogue.markets()
+                market_ids = [market.id for market in markets]
+
+        endpoints = {
+            f"/markets/{market_id}/ticker": market_id
+            for market_id in market_ids
+        }
+        results = fetch_concurrently(
+            list(endpoints),
+            max_workers=settings.BUDA_FETCH_MAX_WORKERS,
+            deadline=settings.BUDA_FETCH_DEADLINE,
+        )
+
+        spreads = []
+        errors = {}
+        # keep the same order in which markets were requested
+        for endpoint, market_id in endpoints.items():
+            result = results[endpoint]
+            if result.ok:
+                spreads.append(build(result.data["ticker"]))
+            else:
+                errors[market_id] = result.error
+        return spreads, errors
+
+    @classmethod
+    async def afetch_each_markets_spread(
+        cls,
+        market_ids: list = None,
+        build=None,
+    ) -> tuple:
+        """
+        Asynchronous version of :meth:`fetch_each_markets_spread`.
+
+        :param list market_ids: markets to calculate the spread from.
+        If not provided, all markets available on Buda.com API are used.
+        :param callable build: builds each spread from its ticker data.
+        Defaults to :meth:`from_ticker_data`.
+        :returns: The spreads calculated, and the errors by market ID.
+        :rtype: tuple[list[Spread], dict[str, Exception]]
+        """
+        build = build or cls.from_ticker_data
+        if market_ids is None:
+            try:
+                return await cls.aget_spreads_in_bulk(build), {}
+            except BULK_TICKERS_ERRORS:
+                from .catalogue import market_catalogue
+
+                markets = await sync_to_async(market_catalogue.markets)()
+                market_ids = [market.id for market in markets]
+
+        endpoints = {
+            f"/markets/{market_id}/ticker": market_id
+            for market_id in market_ids
+        }
+        results = await afetch_concurrently(
+            list(endpoints),
+            max_workers=settings.BUDA_FETCH_MAX_WORKERS,
+            deadline=settings.BUDA_FETCH_DEADLINE,
+        )
+
         spreads = []
-        markets = Market.get_all_markets()
-        for market in markets:
-            spreads.append(Spread.create(market.id))
+        errors = {}
+        for endpoint, market_id in endpoints.items():
+            result = results[endpoint]
+            if result.ok:
+                spreads.append(build(result.data["ticker"]))
+            else:
+                errors[market_id] = result.error
+        return spreads, errors
+
+    @classmethod
+    def get_latest_stored(cls, market_ids: list = None) -> dict:
+        """
+        Retrieves the latest stored spread of several markets with a single
+        query. Only available on PostgreSQL.
+
+        :param list market_ids: markets to retrieve the spread from. If not
+        provided, all markets with stored spreads are used.
+        :returns: The latest spread stored by market ID.
+        :rtype: dict[str, Spread]
+        """
+        spreads = cls.objects.order_by("market_id", "-fetch_date")
+        if market_ids is not None:
+            spreads = spreads.filter(market_id__in=market_ids)
+        # DISTINCT ON keeps the first row of each market
+        return {
+            spread.market_id: spread
+            for spread in spreads.distinct("market_id")
+        }
+
+    @classmethod
+    def get_history(
+        cls,
+        market_id: str,
+        start: datetime,
+        end: datetime,
+        bucket: str = "hour",
+        aggregations: list = HISTORY_AGGREGATIONS,
+        after: datetime = None,
+        limit: int = 100,
+    ) -> list:
+        """
+        Aggregates the stored spreads of a market by time buckets. All the
+        bucketing and aggregation happens on the database.
+
+        Buckets are returned in chronological order, and pages after the
+        first one are retrieved by passing the last bucket received as
+        `after`, which doesn't require counting or skipping rows.
+
+        Spreads already rolled up (see :mod:`api.retention`) are read from
+        the rollups of the resolution given by :func:`rollup_resolution`,
+        and only the ones not rolled up yet from the spreads table, so the
+        history is available after the spreads are deleted. Rollups across
+        a bound of the range are left out, and the spreads within the range
+        read instead while they're stored, so the history is the same as
+        from the spreads alone.
+
+        :param str market_id: valid market identifier, e.g. `btc-clp`.
+        :param datetime start: earliest fetch date included.
+        :param datetime end: fetch date from which spreads are excluded.
+        :param str bucket: size of the buckets, one of `minute`, `hour`,
+        `day`, `week` or `month`.
+        :param list aggregations: aggregations of the spread value to
+        calculate, from `min`, `max`, `avg` and `last`.
+        :param datetime after: start of the last bucket already retrieved.
+        :param int limit: maximum number of buckets returned.
+        :returns: A dictionary for each bucket, with its start as `bucket`,
+        the number of spreads as `count`, and the aggregations requested.
+        :rtype: list[dict]
+        """
+        if after is not None:
+            # the next bucket starts where the last one retrieved ends, so
+            # the range is narrowed instead of filtering the buckets
+            after = after.astimezone(timezone.utc)
+            start = max(start, bucket_end(after, bucket))
+
+        spreads = cls.objects.filter(
+            market_id=market_id,
+            fetch_date__gte=start,
+            fetch_date__lt=end,
+        )
+        rolled_id = SpreadRollupState.objects.values_list(
+            "rolled_id",
+            flat=True,
+        ).first()
+        if not rolled_id:
+            functions = {
+                "min": models.Min("value"),
+                "max": models.Max("value"),
+                "avg": models.Avg("value"),
+                "last": Last("value"),
+            }
+            history = (
+                spreads.annotate(
+                    bucket=Trunc("fetch_date", bucket, tzinfo=timezone.utc),
+                )
+                .values("bucket")
+                .annotate(
+                    count=models.Count("id"),
+                    **{name: functions[name] for name in aggregations},
+                )
+                .order_by("bucket")
+            )
+            return list(history[:limit])
+
+        # rollups within the range, unless the spreads across its bounds
+        # were deleted, in which case the rollups around them are counted
+        resolution = rollup_resolution(bucket, start, end)
+        kept_since = spreads_kept_since()
+        low = ceil_to(start, resolution)
+        if start < kept_since:
+            low = floor_to(start, resolution)
+        high = floor_to(end, resolution)
+        if high < kept_since:
+            high = ceil_to(end, resolution)
+
+        # spreads not rolled up yet, or out of the rollups read
+        recent = (
+            spreads.filter(
+                models.Q(id__gt=rolled_id)
+                | models.Q(fetch_date__lt=low)
+                | models.Q(fetch_date__gte=high)
+            )
+            .annotate(
+                bucket=Trunc("fetch_date", bucket, tzinfo=timezone.utc),
+            )
+            .values("bucket")
+            .annotate(
+                count=models.Count("id"),
+                sum=models.Sum("value"),
+                min=models.Min("value"),
+                max=models.Max("value"),
+                last=Last("value"),
+                latest=models.Max("fetch_date"),
+            )
+            .order_by("bucket")
+        )
+        rolled = (
+            SpreadRollup.objects.filter(
+                market_id=market_id,
+                resolution=resolution,
+                bucket__gte=low,
+                bucket__lt=high,
+            )
+            .annotate(
+                period=Trunc("bucket", bucket, tzinfo=timezone.utc),
+            )
+            .values("period")
+            .annotate(
+                spreads=models.Sum("count"),
+                sum=models.Sum("total"),
+                min=models.Min("min_value"),
+                max=models.Max("max_value"),
+                last=Last("last_value", by="last_fetch_date"),
+                latest=models.Max("last_fetch_date"),
+            )
+            .order_by("period")
+        )
+        rolled = [
+            {
+                "bucket": row["period"],
+                "count": row["spreads"],
+                **{key: row[key] for key in ("sum", "min", "max", "last")},
+                "latest": row["latest"],
+            }
+            for row in rolled[:limit]
+        ]
+        return merge_buckets(
+            [rolled, list(recent[:limit])],
+            aggregations,
+            limit,
+        )
+
+    @classmethod
+    def get_each_markets_spread(cls, build=None) -> list:
+        """
+        Calculates the spread for all markets available on Buda.com API.
+
+        All tickers are retrieved at once from the `/tickers` endpoint. If
+        it's not available, they're retrieved market by market instead, and
+        markets that fail are left out of the list, unless all of them
+        fail, in which case the first error is raised.
+
+        :param callable build: builds each spread from its ticker data.
+        Defaults to :meth:`from_ticker_data`.
+        :returns: A list of spreads.
+        :rtype: list[Spread]
+        """
+        spreads, errors = cls.fetch_each_markets_spread(build=build)
+        if errors and not spreads:
+            raise next(iter(errors.values()))
+        return spreads
+
+    @classmethod
+    async def aget_each_markets_spread(cls, build=None) -> list:
+        """
+        Asynchronous version of :meth:`get_each_markets_spread`.
+
+        :param callable build: builds each spread from its ticker data.
+        Defaults to :meth:`from_ticker_data`.
+        :returns: A list of spreads.
+        :rtype: list[Spread]
+        """
+        spreads, errors = await cls.afetch_each_markets_spread(build=build)
+        if errors and not spreads:
+            raise next(iter(errors.values()))
         return spreads
 
+    class Meta:
+        indexes = [
+            # latest spreads of a market, without sorting the whole history
+            models.Index(
+                fields=["market_id", "-fetch_date"],
+                name="spread_market_latest_idx",
+            ),
+        ]
+
+
+class SpreadRollup(models.Model):
+    """
+    Aggregations of the spreads of a market within a time bucket, kept
+    after the spreads are deleted. Updated incrementally by
+    :func:`api.retention.roll_up` as new spreads are stored.
+    """
+
+    market_id = MarketIdField(max_length=30)
+    resolution = models.CharField(
+        max_length=10,
+        choices=[(name, name) for name in ROLLUP_RESOLUTIONS],
+    )
+    bucket = models.DateTimeField()
+
+    count = models.PositiveIntegerField()
+    total = models.DecimalField(max_digits=32, decimal_places=10)
+    min_value = models.DecimalField(max_digits=22, decimal_places=10)
+    max_value = models.DecimalField(max_digits=22, decimal_places=10)
+    last_value = models.DecimalField(max_digits=22, decimal_places=10)
+    last_fetch_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["market_id", "resolution", "bucket"],
+                name="spread_rollup_bucket_unique",
+            ),
+        ]
+        indexes = [
+            # rollups of a resolution past their retention
+            models.Index(
+                fields=["resolution", "bucket"],
+                name="spread_rollup_age_idx",
+            ),
+        ]
+
+
+class SpreadRollupState(models.Model):
+    """
+    Progress of the rollups of the spreads, as the IDs of the spreads
+    rolled up. A single row is kept.
+    """
+
+    # spreads up to this ID are rolled up
+    rolled_id = models.BigIntegerField(default=0)
+    # highest ID seen on the last run, rolled up on the next one
+    pending_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def load(cls):
+        """
+        Get the state of the rollups, creating it if missing.
+
+        :rtype: SpreadRollupState
+        """
+        state, _ = cls.objects.get_or_create(pk=1)
+        return state
+
 
 class Polling(models.Model):
     """
@@ -263,16 +949,19 @@ class Polling(models.Model):
     fetch_date = models.DateTimeField(auto_now_add=True)
 
     @classmethod
-    def create(cls, stored: Spread):
+    def create(cls, stored: Spread, current: Spread = None):
         """
         Custom method to initialize a :class:`Polling` instance.
 
         :param Spread stored: a spread already calculated
         to compare with the current one.
+        :param Spread current: the current spread of the same market.
+        If not provided, it's retrieved from Buda.com API.
         :rtype: Polling
         """
-        # retrieve the current spread for the same market of the given one
-        current = Spread.create(stored.market_id)
+        if current is None:
+            # retrieve the current spread for the same market of the given one
+            current = Spread.create(stored.market_id)
 
         # create the instance
         polling = cls(
@@ -288,5 +977,109 @@ class Polling(models.Model):
         )
         return polling
 
+    @classmethod
+    async def acreate(cls, stored: Spread):
+        """
+        Asynchronous version of :meth:`create`.
+
+        :param Spread stored: a spread already calculated
+        to compare with the current one.
+        :rtype: Polling
+        """
+        current = await Spread.acreate(stored.market_id)
+        return cls.create(stored, current)
+
     class Meta:
         managed = False
+
+
+class AlertRule(models.Model):
+    """
+    A threshold on the change of a market spread versus a stored baseline.
+
+    The change is measured as an absolute amount in the quote currency,
+    or as a percentage of the baseline, and may be restricted to the
+    spread going up or down.
+
+    USAGE
+    >>> rule = AlertRule(market_id: str, kind: str, threshold: Decimal,
+    ...                  baseline: Decimal, webhook_url: str)
+    >>> rule.is_exceeded(spread: Spread)
+    """
+
+    ABSOLUTE = "absolute"
+    PERCENTAGE = "percentage"
+    KINDS = [
+        (ABSOLUTE, "Absolute"),
+        (PERCENTAGE, "Percentage"),
+    ]
+
+    ANY = "any"
+    UP = "up"
+    DOWN = "down"
+    DIRECTIONS = [
+        (ANY, "Any"),
+        (UP, "Up"),
+        (DOWN, "Down"),
+    ]
+
+    market_id = MarketIdField(max_length=30)
+    kind = models.CharField(max_length=10, choices=KINDS, default=ABSOLUTE)
+    direction = models.CharField(max_length=4, choices=DIRECTIONS, default=ANY)
+    threshold = models.DecimalField(
+        max_digits=22,
+        decimal_places=10,
+    )
+    baseline = models.DecimalField(
+        max_digits=22,
+        decimal_places=10,
+    )
+    webhook_url = models.URLField()
+    last_triggered = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def change(self, spread: Spread) -> Decimal:
+        """
+        Change of a spread versus the baseline, in the unit of the rule.
+
+        :param Spread spread: current spread of the market.
+        :rtype: Decimal
+        """
+        change = spread.value - self.baseline
+        if self.kind == self.PERCENTAGE:
+            change = change * 100 / self.baseline
+        return change
+
+    def is_exceeded(self, spread: Spread) -> bool:
+        """
+        Check if a spread changed beyond the threshold.
+
+        :param Spread spread: current spread of the market.
+        :rtype: bool
+        """
+        change = self.change(spread)
+        if self.direction == self.UP:
+            return change >= self.threshold
+        if self.direction == self.DOWN:
+            return -change >= self.threshold
+        return abs(change) >= self.threshold
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["market_id"], name="alert_rule_market_idx"),
+        ]
+
+
+class BackfillCheckpoint(models.Model):
+    """
+    Progress of a backfill of the spreads history from a file, updated in
+    the same transaction as each batch of spreads written, so an
+    interrupted backfill resumes right after the last batch saved.
+    """
+
+    source = models.CharField(max_length=255, primary_key=True)
+    # bytes of the file already read
+    offset = models.PositiveBigIntegerField(default=0)
+    rows = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
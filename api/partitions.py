@@ -0,0 +1,158 @@
+"""
+Monthly partitioning of the spreads history table on PostgreSQL.
+
+Spreads are stored in a table partitioned by range of `fetch_date`, with
+one partition per month, e.g. `api_spread_y2024m02`, plus a default one
+for rows outside of them. Other database engines use a plain table.
+"""
+
+from datetime import date, datetime, timezone
+
+TABLE = "api_spread"
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+
+def is_partitioned(connection) -> bool:
+    """
+    Check if the spreads table is partitioned.
+
+    :param connection: database connection.
+    :rtype: bool
+    """
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass(%s)",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def month_bounds(month: date) -> tuple:
+    """
+    First instant of a month and of the following one.
+
+    :param date month: any day of the month.
+    :rtype: tuple[datetime, datetime]
+    """
+    start = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+    if month.month == 12:
+        end = start.replace(year=month.year + 1, month=1)
+    else:
+        end = start.replace(month=month.month + 1)
+    return start, end
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_y{month.year}m{month.month:02d}"
+
+
+def create_partition(connection, month: date) -> bool:
+    """
+    Create the partition of the spreads table for a month, if missing.
+
+    Rows of that month already kept in the default partition are moved
+    into the new one before attaching it.
+
+    :param connection: database connection.
+    :param date month: any day of the month.
+    :returns: If the partition was created.
+    :rtype: bool
+    """
+    name = partition_name(month)
+    start, end = month_bounds(month)
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [name])
+        if cursor.fetchone()[0] is not None:
+            return False
+
+        cursor.execute(
+            f"CREATE TABLE {name} "
+            f"(LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(
+            f"WITH moved AS ("
+            f"DELETE FROM {DEFAULT_PARTITION} "
+            f"WHERE fetch_date >= %s AND fetch_date < %s RETURNING *"
+            f") INSERT INTO {name} SELECT * FROM moved",
+            [start, end],
+        )
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM (%s) TO (%s)",
+            [start, end],
+        )
+    return True
+
+
+def partition_table(connection):
+    """
+    Turn the plain spreads table into a partitioned one, keeping its rows.
+
+    A partition is created for each month with rows, and for the current
+    and next months.
+
+    :param connection: database connection.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_plain")
+        cursor.execute(
+            f"ALTER INDEX {TABLE}_pkey RENAME TO {TABLE}_plain_pkey"
+        )
+        # release the sequence name, ids are copied as they are
+        cursor.execute(
+            f"ALTER TABLE {TABLE}_plain "
+            f"ALTER COLUMN id DROP IDENTITY IF EXISTS"
+        )
+        cursor.execute(
+            f"ALTER TABLE {TABLE}_plain ALTER COLUMN id DROP DEFAULT"
+        )
+        cursor.execute(f"DROP SEQUENCE IF EXISTS {TABLE}_id_seq")
+        cursor.execute(
+            f"CREATE TABLE {TABLE} ("
+            f"id bigint NOT NULL, "
+            f"market_id varchar(30) NOT NULL, "
+            f"value numeric(22, 10) NOT NULL, "
+            f"currency varchar(15) NOT NULL, "
+            f"fetch_date timestamp with time zone NOT NULL, "
+            # the partition key must be part of the primary key
+            f"PRIMARY KEY (id, fetch_date)"
+            f") PARTITION BY RANGE (fetch_date)"
+        )
+        cursor.execute(
+            f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"
+        )
+
+        # partitions don't inherit identity columns before PostgreSQL 17
+        cursor.execute(f"CREATE SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id")
+        cursor.execute(
+            f"ALTER TABLE {TABLE} "
+            f"ALTER COLUMN id SET DEFAULT nextval('{TABLE}_id_seq')"
+        )
+        cursor.execute(
+            f"SELECT setval('{TABLE}_id_seq', COALESCE(MAX(id), 0) + 1, "
+            f"false) FROM {TABLE}_plain"
+        )
+
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', fetch_date AT TIME ZONE "
+            f"'UTC')::date FROM {TABLE}_plain"
+        )
+        months = {row[0] for row in cursor.fetchall()}
+
+    today = datetime.now(timezone.utc).date()
+    next_month = month_bounds(today)[1].date()
+    for month in sorted(months | {today.replace(day=1), next_month}):
+        create_partition(connection, month)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {TABLE} "
+            f"(id, market_id, value, currency, fetch_date) "
+            f"SELECT id, market_id, value, currency, fetch_date "
+            f"FROM {TABLE}_plain"
+        )
+        cursor.execute(f"DROP TABLE {TABLE}_plain")
@@ -0,0 +1,254 @@
+"""
+Cache of rendered responses, served with conditional requests support.
+
+Responses are kept already rendered, and compressed with gzip, or brotli
+when the `brotli` package is installed, so clients polling for data that
+didn't change get the same bytes without rendering or compressing them
+again, or no bytes at all if they send the `ETag` they already have.
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from time import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# preferred first, when several are accepted by the client
+ENCODINGS = ["br", "gzip"]
+
+
+def compress(content: bytes) -> dict:
+    """
+    Compress content with every encoding available.
+
+    :param bytes content: content to compress.
+    :returns: The content by encoding, including the `identity` one.
+    :rtype: dict[str, bytes]
+    """
+    encoded = {"identity": content}
+    if len(content) < settings.RENDERED_COMPRESS_MIN_SIZE:
+        return encoded
+
+    # done once for every client, so the best compression is worth it
+    encoded["gzip"] = gzip.compress(content, compresslevel=9, mtime=0)
+    if brotli is not None:
+        encoded["br"] = brotli.compress(content)
+    return encoded
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """
+    Content encodings accepted by a client.
+
+    :param str accept_encoding: value of the `Accept-Encoding` header.
+    :rtype: set[str]
+    """
+    accepted = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class Rendered:
+    """
+    A rendered response body, with its compressed versions.
+
+    USAGE
+    >>> rendered = Rendered(content: bytes, fetched_at: float)
+    >>> encoding = rendered.negotiate(accept_encoding: str)
+    >>> body = rendered.encoded[encoding]
+    """
+
+    __slots__ = ("digest", "encoded", "last_modified", "fetched_at")
+
+    def __init__(
+        self,
+        content: bytes,
+        fetched_at: float = None,
+        previous=None,
+    ):
+        """
+        :param bytes content: rendered body.
+        :param float fetched_at: UNIX time when its data was retrieved.
+        Defaults to the current time.
+        :param Rendered previous: body rendered before for the same
+        resource. If it's the same, its compressed versions and
+        modification date are kept.
+        """
+        self.fetched_at = time() if fetched_at is None else fetched_at
+        self.digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+        if previous is not None and previous.digest == self.digest:
+            self.encoded = previous.encoded
+            self.last_modified = previous.last_modified
+        else:
+            self.encoded = compress(content)
+            self.last_modified = self.fetched_at
+
+    @property
+    def content(self) -> bytes:
+        return self.encoded["identity"]
+
+    def etag(self, encoding: str = "identity") -> str:
+        # each encoding is a different representation of the resource
+        if encoding == "identity":
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{encoding}"'
+
+    def negotiate(self, accept_encoding: str) -> str:
+        """
+        Choose the encoding of the body to send to a client.
+
+        :param str accept_encoding: value of the `Accept-Encoding` header.
+        :rtype: str
+        """
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ENCODINGS:
+            if encoding in accepted and encoding in self.encoded:
+                return encoding
+        return "identity"
+
+
+class RenderedCache:
+    """
+    Keeps the latest body rendered for each resource, along with the
+    version of the data it was rendered from.
+
+    USAGE
+    >>> cache = RenderedCache(maxsize: int)
+    >>> rendered = cache.get(key: str, version: str)
+    >>> rendered = cache.put(key: str, content: bytes, version: str)
+    >>> rendered = cache.latest(*keys: str)
+    """
+
+    def __init__(self, maxsize: int = None):
+        self.maxsize = maxsize or settings.RENDERED_CACHE_SIZE
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, version: str) -> Rendered:
+        """
+        Get the body rendered for a resource from a version of its data.
+
+        :param str key: identifier of the resource.
+        :param str version: version of the data of the resource.
+        :returns: The rendered body, or `None` if it was rendered from
+        another version, or not rendered yet.
+        :rtype: Rendered | None
+        """
+        if version is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(
+        self,
+        key: str,
+        content: bytes,
+        version: str = None,
+        fetched_at: float = None,
+    ) -> Rendered:
+        """
+        Keep the body rendered for a resource.
+
+        :param str key: identifier of the resource.
+        :param bytes content: rendered body.
+        :param str version: version of the data it was rendered from.
+        :param float fetched_at: UNIX time when its data was retrieved.
+        :rtype: Rendered
+        """
+        with self._lock:
+            previous = self._entries.get(key, (None, None))[1]
+
+        rendered = Rendered(content, fetched_at, previous)
+
+        with self._lock:
+            self._entries[key] = (version, rendered)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return rendered
+
+    def latest(self, *keys: str) -> Rendered:
+        """
+        Get the most recent body rendered for any of several resources,
+        whatever the version of its data, e.g. to serve it while the data
+        can't be retrieved.
+
+        :param str keys: identifiers of the resources.
+        :returns: The rendered body with the newest data, or `None` if none
+        of them was rendered yet.
+        :rtype: Rendered | None
+        """
+        with self._lock:
+            found = [
+                self._entries[key][1] for key in keys if key in self._entries
+            ]
+        return max(
+            found,
+            key=lambda rendered: rendered.fetched_at,
+            default=None,
+        )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def rendered_response(
+    request,
+    rendered: Rendered,
+    headers: dict = None,
+    content_type: str = "application/json",
+) -> HttpResponse:
+    """
+    Respond with a rendered body, in the best encoding accepted by the
+    client, or with `304 Not Modified` if the client already has it.
+
+    :param request: request to respond to.
+    :param Rendered rendered: rendered body.
+    :param dict headers: additional response headers.
+    :param str content_type: media type of the body.
+    :rtype: HttpResponse
+    """
+    encoding = rendered.negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    response = HttpResponse(
+        rendered.encoded[encoding],
+        content_type=content_type,
+        headers=headers,
+    )
+    if encoding != "identity":
+        response["Content-Encoding"] = encoding
+    response["ETag"] = rendered.etag(encoding)
+    response["Last-Modified"] = http_date(rendered.last_modified)
+    patch_vary_headers(response, ["Accept-Encoding"])
+
+    return get_conditional_response(
+        request,
+        etag=response["ETag"],
+        last_modified=int(rendered.last_modified),
+        response=response,
+    )
+
+
+rendered_cache = RenderedCache()
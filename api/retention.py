@@ -0,0 +1,212 @@
+"""
+Retention of the spreads history, keeping rollups of the deleted spreads.
+
+Spreads are rolled up incrementally into aggregations by minute, hour and
+day (see :class:`api.models.SpreadRollup`): each run only reads the spreads
+stored since the previous one, by ID, and merges them into the rollups of
+their buckets. Once rolled up, spreads older than `SPREAD_RETENTION_DAYS`
+are deleted, and so are the rollups older than the days set for their
+resolution in `SPREAD_ROLLUP_RETENTION`. Rows are deleted a batch at a
+time, each batch in its own short transaction, so the tables are never
+locked for long.
+
+Spreads are rolled up one run after their IDs are first seen, so the ones
+saved by transactions still running at that time aren't skipped. Only
+available on PostgreSQL.
+"""
+
+from datetime import datetime, timedelta, timezone
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from time import sleep
+from .models import (
+    ROLLUP_RESOLUTIONS,
+    Spread,
+    SpreadRollup,
+    SpreadRollupState,
+)
+
+SPREADS = Spread._meta.db_table
+ROLLUPS = SpreadRollup._meta.db_table
+
+# merges the spreads within a range of IDs into the rollups of a resolution
+ROLL_UP = f"""
+INSERT INTO {ROLLUPS} AS rollup (
+    market_id, resolution, bucket, count, total,
+    min_value, max_value, last_value, last_fetch_date
+)
+SELECT
+    market_id,
+    %(resolution)s,
+    date_trunc(%(resolution)s, fetch_date AT TIME ZONE 'UTC')
+        AT TIME ZONE 'UTC',
+    count(*),
+    sum(value),
+    min(value),
+    max(value),
+    (array_agg(value ORDER BY fetch_date DESC))[1],
+    max(fetch_date)
+FROM {SPREADS}
+WHERE id > %(low)s AND id <= %(high)s
+GROUP BY 1, 3
+ON CONFLICT (market_id, resolution, bucket) DO UPDATE SET
+    count = rollup.count + EXCLUDED.count,
+    total = rollup.total + EXCLUDED.total,
+    min_value = LEAST(rollup.min_value, EXCLUDED.min_value),
+    max_value = GREATEST(rollup.max_value, EXCLUDED.max_value),
+    last_value = CASE
+        WHEN EXCLUDED.last_fetch_date >= rollup.last_fetch_date
+        THEN EXCLUDED.last_value
+        ELSE rollup.last_value
+    END,
+    last_fetch_date = GREATEST(
+        rollup.last_fetch_date,
+        EXCLUDED.last_fetch_date
+    )
+"""
+
+
+def roll_up_chunk(chunk: int) -> int:
+    """
+    Roll up the next spreads pending, up to a number of IDs, in a single
+    transaction.
+
+    :param int chunk: IDs of the spreads to roll up.
+    :returns: Spreads rolled up, or `None` if none was pending.
+    :rtype: int | None
+    """
+    with transaction.atomic():
+        state = SpreadRollupState.objects.select_for_update().get(pk=1)
+        if state.rolled_id >= state.pending_id:
+            return None
+
+        low = state.rolled_id
+        high = min(state.pending_id, low + chunk)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM {SPREADS} WHERE id > %s AND id <= %s",
+                [low, high],
+            )
+            rolled = cursor.fetchone()[0]
+            for resolution in ROLLUP_RESOLUTIONS:
+                cursor.execute(
+                    ROLL_UP,
+                    {"resolution": resolution, "low": low, "high": high},
+                )
+        state.rolled_id = high
+        state.save()
+    return rolled
+
+
+def roll_up(chunk: int = None) -> int:
+    """
+    Roll up the spreads stored up to the previous run, and mark the ones
+    stored since then to be rolled up on the next one.
+
+    :param int chunk: IDs of the spreads rolled up by each transaction.
+    Defaults to `SPREAD_ROLLUP_CHUNK`.
+    :returns: Spreads rolled up.
+    :rtype: int
+    """
+    chunk = chunk or settings.SPREAD_ROLLUP_CHUNK
+    SpreadRollupState.load()
+
+    rolled = 0
+    while (count := roll_up_chunk(chunk)) is not None:
+        rolled += count
+
+    highest = Spread.objects.aggregate(id=Max("id"))["id"] or 0
+    SpreadRollupState.objects.filter(pk=1, pending_id__lt=highest).update(
+        pending_id=highest
+    )
+    return rolled
+
+
+def delete_in_batches(
+    table: str,
+    keys: str,
+    condition: str,
+    params: list,
+    batch: int = None,
+    pause: float = None,
+) -> int:
+    """
+    Delete the rows of a table matching a condition, a batch at a time.
+
+    :param str table: name of the table.
+    :param str keys: columns identifying each row, e.g. its primary key.
+    :param str condition: SQL condition of the rows to delete.
+    :param list params: parameters of the condition.
+    :param int batch: rows deleted by each statement. Defaults to
+    `SPREAD_RETENTION_BATCH`.
+    :param float pause: seconds between statements, to let other queries
+    through. Defaults to `SPREAD_RETENTION_PAUSE`.
+    :returns: Rows deleted.
+    :rtype: int
+    """
+    batch = batch or settings.SPREAD_RETENTION_BATCH
+    pause = settings.SPREAD_RETENTION_PAUSE if pause is None else pause
+
+    deleted = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE ({keys}) IN ("
+                f"SELECT {keys} FROM {table} WHERE {condition} LIMIT %s"
+                f")",
+                [*params, batch],
+            )
+            count = cursor.rowcount
+        deleted += count
+        if count < batch:
+            return deleted
+        sleep(pause)
+
+
+def prune_spreads(before: datetime = None, **options) -> int:
+    """
+    Delete the spreads already rolled up, stored before a date.
+
+    :param datetime before: date from which spreads are kept. Defaults to
+    `SPREAD_RETENTION_DAYS` ago.
+    :param options: options of :func:`delete_in_batches`.
+    :returns: Spreads deleted.
+    :rtype: int
+    """
+    if before is None:
+        before = datetime.now(timezone.utc) - timedelta(
+            days=settings.SPREAD_RETENTION_DAYS
+        )
+    rolled_id = SpreadRollupState.load().rolled_id
+    # the partition key is part of the primary key of partitioned tables
+    return delete_in_batches(
+        SPREADS,
+        "id, fetch_date",
+        "fetch_date < %s AND id <= %s",
+        [before, rolled_id],
+        **options,
+    )
+
+
+def prune_rollups(**options) -> dict:
+    """
+    Delete the rollups older than the days kept for their resolution.
+
+    :param options: options of :func:`delete_in_batches`.
+    :returns: Rollups deleted by resolution.
+    :rtype: dict[str, int]
+    """
+    now = datetime.now(timezone.utc)
+    deleted = {}
+    for resolution, days in settings.SPREAD_ROLLUP_RETENTION.items():
+        if days is None:
+            continue
+        deleted[resolution] = delete_in_batches(
+            ROLLUPS,
+            "id",
+            "resolution = %s AND bucket < %s",
+            [resolution, now - timedelta(days=days)],
+            **options,
+        )
+    return deleted
@@ -1,7 +1,19 @@
 from rest_framework import serializers
-from .models import Spread, Polling
+from .alerts import webhook_error
+from .catalogue import market_catalogue
+from .depth import BASE, QUOTE
+from .models import (
+    AlertRule,
+    Spread,
+    Polling,
+    HISTORY_AGGREGATIONS,
+    HISTORY_BUCKETS,
+)
 from decimal import Decimal
 
+# most trade sizes priced by a single request of effective spreads
+MAX_DEPTH_SIZES = 50
+
 
 class SpreadSerializer(serializers.ModelSerializer):
     """Serializer for `Spread` model"""
@@ -47,3 +59,233 @@ class PollingSerializer(serializers.ModelSerializer):
             "stored_spread",
             "stored_spread_date",
         ]
+
+
+class SpreadHistoryQuerySerializer(serializers.Serializer):
+    """Serializer for the query parameters of `Spread` history"""
+
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    bucket = serializers.ChoiceField(
+        choices=list(HISTORY_BUCKETS),
+        default="hour",
+    )
+    aggregations = serializers.CharField(
+        default=",".join(HISTORY_AGGREGATIONS),
+    )
+    after = serializers.DateTimeField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=100)
+
+    def validate_aggregations(self, value) -> list:
+        aggregations = [name.strip() for name in value.split(",")]
+        invalid = set(aggregations) - set(HISTORY_AGGREGATIONS)
+        if invalid:
+            raise serializers.ValidationError(
+                f"Invalid aggregations: {', '.join(sorted(invalid))}"
+            )
+        return aggregations
+
+
+class SpreadHistorySerializer(serializers.Serializer):
+    """Serializer for `Spread` history aggregated by time buckets"""
+
+    bucket = serializers.DateTimeField()
+    count = serializers.IntegerField()
+
+    # only the requested aggregations are present
+    min = serializers.DecimalField(
+        max_digits=22,
+        decimal_places=10,
+        required=False,
+    )
+    max = serializers.DecimalField(
+        max_digits=22,
+        decimal_places=10,
+        required=False,
+    )
+    avg = serializers.DecimalField(
+        max_digits=22,
+        decimal_places=10,
+        required=False,
+    )
+    last = serializers.DecimalField(
+        max_digits=22,
+        decimal_places=10,
+        required=False,
+    )
+
+
+class AlertRuleSerializer(serializers.ModelSerializer):
+    """Serializer for `AlertRule` model"""
+
+    threshold = serializers.DecimalField(
+        max_digits=22,
+        decimal_places=10,
+        min_value=Decimal(0),
+    )
+    # the latest stored spread of the market is used if not provided
+    baseline = serializers.DecimalField(
+        max_digits=22,
+        decimal_places=10,
+        required=False,
+    )
+
+    def validate_market_id(self, value: str) -> str:
+        if not market_catalogue.is_known(value):
+            raise serializers.ValidationError(
+                "No market was found with this ID"
+            )
+        return value
+
+    def validate_webhook_url(self, value: str) -> str:
+        error = webhook_error(value)
+        if error is not None:
+            raise serializers.ValidationError(error)
+        return value
+
+    def validate(self, data):
+        market_id = data.get(
+            "market_id",
+            getattr(self.instance, "market_id", ""),
+        ).upper()
+        if "baseline" not in data and self.instance is None:
+            try:
+                stored = Spread.objects.filter(market_id=market_id).latest(
+                    "fetch_date"
+                )
+            except Spread.DoesNotExist:
+                raise serializers.ValidationError(
+                    {"baseline": "No stored spread was found for this market"}
+                )
+            data["baseline"] = stored.value
+
+        kind = data.get("kind", getattr(self.instance, "kind", None))
+        baseline = data.get("baseline", getattr(self.instance, "baseline", 0))
+        if kind == AlertRule.PERCENTAGE and not baseline:
+            raise serializers.ValidationError(
+                {"baseline": "Percentage rules need a non-zero baseline"}
+            )
+        return data
+
+    class Meta:
+        model = AlertRule
+        fields = [
+            "id",
+            "market_id",
+            "kind",
+            "direction",
+            "threshold",
+            "baseline",
+            "webhook_url",
+            "last_triggered",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = ["last_triggered", "created_at", "updated_at"]
+
+
+class DepthQuerySerializer(serializers.Serializer):
+    """Serializer for the query parameters of the effective spreads"""
+
+    sizes = serializers.CharField()
+    unit = serializers.ChoiceField(choices=[QUOTE, BASE], default=QUOTE)
+    fees = serializers.BooleanField(default=False)
+
+    def validate_sizes(self, value) -> list:
+        # sizes are rendered back, so they have the limits of the response
+        size_field = serializers.DecimalField(
+            max_digits=22,
+            decimal_places=10,
+        )
+        sizes = [
+            size_field.run_validation(size.strip())
+            for size in value.split(",")
+        ]
+        if any(size <= 0 for size in sizes):
+            raise serializers.ValidationError("Sizes must be positive")
+        if len(sizes) > MAX_DEPTH_SIZES:
+            raise serializers.ValidationError(
+                f"At most {MAX_DEPTH_SIZES} sizes can be priced at once"
+            )
+        return sizes
+
+
+class EffectiveSpreadSerializer(serializers.Serializer):
+    """Serializer for `EffectiveSpread` of a trade size"""
+
+    size = serializers.DecimalField(max_digits=22, decimal_places=10)
+
+    # missing when the order book isn't deep enough for the size
+    ask = serializers.DecimalField(
+        max_digits=22,
+        decimal_places=10,
+        allow_null=True,
+    )
+    bid = serializers.DecimalField(
+        max_digits=22,
+        decimal_places=10,
+        allow_null=True,
+    )
+    value = serializers.DecimalField(
+        max_digits=22,
+        decimal_places=10,
+        allow_null=True,
+    )
+    value_with_fees = serializers.DecimalField(
+        max_digits=22,
+        decimal_places=10,
+        allow_null=True,
+    )
+
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    """Serializer for the query parameters of the markets analytics"""
+
+    # pay the taker fee of each market on cross rates and round trips
+    fees = serializers.BooleanField(default=True)
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=20)
+
+
+class MarketAnalyticsSerializer(serializers.Serializer):
+    """Serializer for the spreads of a market in the analytics"""
+
+    market_id = serializers.CharField()
+
+    # missing when the market has no bids or no asks
+    bid = serializers.FloatField(allow_null=True)
+    ask = serializers.FloatField(allow_null=True)
+    mid = serializers.FloatField(allow_null=True)
+    fee_rate = serializers.FloatField()
+    spread = serializers.FloatField(allow_null=True)
+    spread_bps = serializers.FloatField(allow_null=True)
+    spread_with_fees = serializers.FloatField(allow_null=True)
+    spread_with_fees_bps = serializers.FloatField(allow_null=True)
+
+
+class CrossRateSerializer(serializers.Serializer):
+    """Serializer for the rate between two currencies through a third one"""
+
+    def get_fields(self):
+        # `from` is a reserved word, so it can't be declared as an attribute
+        return {
+            "from": serializers.CharField(),
+            "to": serializers.CharField(),
+            "via": serializers.CharField(),
+            "rate": serializers.FloatField(),
+            "direct_rate": serializers.FloatField(allow_null=True),
+        }
+
+
+class TriangleSerializer(serializers.Serializer):
+    """Serializer for a round trip across three currencies"""
+
+    path = serializers.ListField(child=serializers.CharField())
+    edge_bps = serializers.FloatField()
+
+
+class AnalyticsSerializer(serializers.Serializer):
+    """Serializer for the analytics of all markets"""
+
+    markets = MarketAnalyticsSerializer(many=True)
+    cross_rates = CrossRateSerializer(many=True)
+    triangles = TriangleSerializer(many=True)
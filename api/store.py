@@ -0,0 +1,177 @@
+"""
+Store for the latest spread of each market.
+
+Besides a key for each market, all spreads are kept together in a single
+snapshot key, so listing them is a single read from the cache, whatever
+its backend.
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+from django.core.cache import caches
+from time import time
+from uuid import uuid4
+from .models import Spread
+
+# spreads of all markets
+SNAPSHOT_KEY = "spreads:snapshot"
+# changes every time any spread is saved
+VERSION_KEY = "spreads:version"
+
+
+class SpreadStore:
+    """
+    Keeps the latest spread calculated for each market on a Django cache,
+    so it can be filled by a background worker and read by the API.
+
+    USAGE
+    >>> store = SpreadStore(alias: str)
+    >>> store.set_many(spreads: list[Spread])
+    >>> spread, age = store.get(market_id: str)
+    """
+
+    def __init__(self, alias: str = "spreads"):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def market_key(market_id: str) -> str:
+        return f"spread:{market_id.upper()}"
+
+    @staticmethod
+    def to_dict(spread: Spread, fetched_at: float) -> dict:
+        return {
+            "market_id": spread.market_id,
+            "value": str(spread.value),
+            "currency": spread.currency,
+            "fetched_at": fetched_at,
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> Spread:
+        return Spread(
+            market_id=data["market_id"],
+            value=Decimal(data["value"]),
+            currency=data["currency"],
+            fetch_date=datetime.fromtimestamp(
+                data["fetched_at"],
+                timezone.utc,
+            ),
+        )
+
+    def set_many(self, spreads: list, fetched_at: float = None):
+        """
+        Save the latest spreads, replacing the previous ones.
+
+        :param list[Spread] spreads: spreads to save, one per market.
+        :param float fetched_at: UNIX time when the spreads were calculated.
+        Defaults to the current time.
+        """
+        fetched_at = time() if fetched_at is None else fetched_at
+        changed = {
+            spread.market_id: self.to_dict(spread, fetched_at)
+            for spread in spreads
+        }
+        self.save(changed, {"spreads": changed, "fetched_at": fetched_at})
+
+    def update(self, spreads: list, fetched_at: float = None):
+        """
+        Save the latest spreads of some markets, keeping the other ones.
+
+        :param list[Spread] spreads: spreads to save, one per market.
+        :param float fetched_at: UNIX time when the spreads were calculated.
+        Defaults to the fetch date of each spread, or the current time for
+        the ones without it.
+        """
+        now = time()
+        changed = {
+            spread.market_id: self.to_dict(
+                spread,
+                fetched_at if fetched_at is not None
+                else spread.fetch_date.timestamp() if spread.fetch_date
+                else now,
+            )
+            for spread in spreads
+        }
+        # markets are only listed once all of them were stored
+        snapshot = self.cache.get(SNAPSHOT_KEY)
+        if snapshot is not None:
+            snapshot = {
+                **snapshot,
+                "spreads": {**snapshot["spreads"], **changed},
+            }
+        self.save(changed, snapshot)
+
+    def save(self, changed: dict, snapshot: dict = None):
+        """
+        Write the spreads of some markets, along with a new version.
+
+        :param dict changed: stored data of the spreads, by market ID.
+        :param dict snapshot: stored data of the spreads of all markets, by
+        market ID in `spreads`, and when they were first stored together in
+        `fetched_at`, if it changed.
+        """
+        entries = {
+            self.market_key(market_id): data
+            for market_id, data in changed.items()
+        }
+        if snapshot is not None:
+            entries[SNAPSHOT_KEY] = snapshot
+        entries[VERSION_KEY] = uuid4().hex
+        self.cache.set_many(entries, timeout=None)
+
+    def version(self) -> str:
+        """
+        Identifier of the current state of the store, which changes every
+        time any spread is saved.
+
+        :returns: The version, or `None` if nothing was stored yet.
+        :rtype: str | None
+        """
+        return self.cache.get(VERSION_KEY)
+
+    def get(self, market_id: str, build=None) -> tuple:
+        """
+        Get the latest spread stored for a market.
+
+        :param str market_id: valid market identifier, e.g. `btc-clp`.
+        :param callable build: builds the spread from its stored data.
+        Defaults to :meth:`from_dict`.
+        :returns: The spread and its age in seconds, or `None` if there's
+        no spread stored for the market.
+        :rtype: tuple[Spread, float] | None
+        """
+        data = self.cache.get(self.market_key(market_id))
+        if data is None:
+            return None
+        build = build or self.from_dict
+        return build(data), max(time() - data["fetched_at"], 0)
+
+    def get_all(self, build=None) -> tuple:
+        """
+        Get the latest spreads stored for all markets.
+
+        :param callable build: builds each spread from its stored data.
+        Defaults to :meth:`from_dict`.
+        :returns: The spreads and the age in seconds of the oldest one, or
+        `None` if the spreads weren't stored yet.
+        :rtype: tuple[list[Spread], float] | None
+        """
+        snapshot = self.cache.get(SNAPSHOT_KEY)
+        if snapshot is None:
+            return None
+
+        entries = snapshot["spreads"].values()
+        build = build or self.from_dict
+        spreads = [build(data) for data in entries]
+        oldest = min(
+            (data["fetched_at"] for data in entries),
+            default=snapshot["fetched_at"],
+        )
+        return spreads, max(time() - oldest, 0)
+
+
+spread_store = SpreadStore()
@@ -0,0 +1,231 @@
+"""
+Streaming of order book updates from Buda.com websocket feed.
+
+Each market has its own channel, `book@{market}` (e.g. `book@btcclp`),
+that sends two kinds of messages:
+
+- `book-sync`: the whole order book, as `bids` and `asks` lists of
+  `[price, amount]` levels, sent on subscription.
+- `book-changed`: a single level update, as `change: [side, price,
+  amount]`, where an amount of zero removes the level.
+"""
+
+import asyncio
+import json
+import websockets
+from datetime import datetime, timezone
+from decimal import Decimal
+from django.conf import settings
+from time import time
+from .models import Spread
+
+
+class BookTop:
+    """
+    Keeps the best bid and ask of a market order book up to date, so its
+    spread can be calculated after each update without walking the book.
+
+    The time of the last message applied is kept, so its spread is only as
+    fresh as the book it comes from.
+
+    USAGE
+    >>> top = BookTop(market_id: str)
+    >>> changed = top.apply(message: dict)
+    >>> spread = top.spread()
+    """
+
+    __slots__ = (
+        "market_id",
+        "currency",
+        "bids",
+        "asks",
+        "max_bid",
+        "min_ask",
+        "updated_at",
+    )
+
+    def __init__(self, market_id: str):
+        self.market_id = market_id.upper()
+        # spreads are expressed in the quote currency of the market
+        self.currency = self.market_id.split("-")[-1]
+        self.bids = {}
+        self.asks = {}
+        self.max_bid = None
+        self.min_ask = None
+        # UNIX time of the last message applied
+        self.updated_at = None
+
+    def clear(self):
+        """
+        Forget the order book, e.g. once its feed is disconnected.
+        """
+        self.sync([], [])
+        self.updated_at = None
+
+    def sync(self, bids: list, asks: list):
+        """
+        Replace the whole order book.
+
+        :param list bids: `[price, amount]` levels of the buy side.
+        :param list asks: `[price, amount]` levels of the sell side.
+        """
+        self.bids = {Decimal(price): Decimal(amount) for price, amount in bids}
+        self.asks = {Decimal(price): Decimal(amount) for price, amount in asks}
+        self.max_bid = max(self.bids, default=None)
+        self.min_ask = min(self.asks, default=None)
+
+    def change(self, side: str, price: str, amount: str):
+        """
+        Update a single level of the order book.
+
+        :param str side: `bids` or `asks`.
+        :param str price: price of the level.
+        :param str amount: new amount of the level, zero to remove it.
+        """
+        price = Decimal(price)
+        amount = Decimal(amount)
+        is_bid = side == "bids"
+        levels = self.bids if is_bid else self.asks
+        best = self.max_bid if is_bid else self.min_ask
+
+        if amount:
+            levels[price] = amount
+            if best is None or (price > best if is_bid else price < best):
+                best = price
+        else:
+            levels.pop(price, None)
+            # only look for a new best price when the current one is gone
+            if price == best:
+                best = (max if is_bid else min)(levels, default=None)
+
+        if is_bid:
+            self.max_bid = best
+        else:
+            self.min_ask = best
+
+    def apply(self, message: dict) -> bool:
+        """
+        Update the order book with a message from the feed.
+
+        :param dict message: decoded message from the feed.
+        :returns: If the best bid or ask changed.
+        :rtype: bool
+        """
+        top = (self.max_bid, self.min_ask)
+        if message.get("type") == "book-sync":
+            self.sync(message["bids"], message["asks"])
+        elif message.get("type") == "book-changed":
+            self.change(*message["change"])
+        else:
+            return False
+        self.updated_at = time()
+        return top != (self.max_bid, self.min_ask)
+
+    def spread(self) -> Spread:
+        """
+        Current spread of the market.
+
+        :returns: The spread, dated when the book was last updated, or
+        `None` if one side of the book is empty.
+        :rtype: Spread | None
+        """
+        if self.max_bid is None or self.min_ask is None:
+            return None
+        return Spread(
+            market_id=self.market_id,
+            value=self.min_ask - self.max_bid,
+            currency=self.currency,
+            fetch_date=datetime.fromtimestamp(self.updated_at, timezone.utc),
+        )
+
+
+class BookFeed:
+    """
+    Follows the order book channel of several markets, calling `on_spread`
+    with the new spread of a market every time its best bid or ask changes.
+
+    USAGE
+    >>> feed = BookFeed(market_ids: list, on_spread: callable)
+    >>> await feed.run()
+    """
+
+    def __init__(
+        self,
+        market_ids: list,
+        on_spread,
+        url: str = None,
+        reconnect: bool = True,
+    ):
+        self.tops = {
+            market_id.upper(): BookTop(market_id) for market_id in market_ids
+        }
+        self.on_spread = on_spread
+        self.url = url or settings.BUDA_REALTIME_URL
+        self.reconnect = reconnect
+
+    def channel_url(self, market_id: str) -> str:
+        channel = market_id.replace("-", "").lower()
+        return f"{self.url}?channel=book%40{channel}"
+
+    def spreads(self, since: float = None) -> list:
+        """
+        Current spread of every market with both sides of its book.
+
+        :param float since: UNIX time after which the books must have been
+        updated. Defaults to any time.
+        :rtype: list[Spread]
+        """
+        spreads = [
+            top.spread()
+            for top in self.tops.values()
+            if top.updated_at is not None
+            and (since is None or top.updated_at > since)
+        ]
+        return [spread for spread in spreads if spread is not None]
+
+    def handle(self, market_id: str, raw: str):
+        """
+        Apply a raw message from the feed to the order book of a market.
+
+        :param str market_id: market whose channel sent the message.
+        :param str raw: JSON encoded message.
+        """
+        top = self.tops[market_id]
+        if top.apply(json.loads(raw)):
+            spread = top.spread()
+            if spread is not None:
+                self.on_spread(spread)
+
+    async def follow(self, market_id: str):
+        """
+        Consume the channel of a market, reconnecting if it's closed.
+
+        :param str market_id: valid market identifier, e.g. `btc-clp`.
+        """
+        backoff = settings.BUDA_RETRY_BACKOFF
+        while True:
+            try:
+                async with websockets.connect(
+                    self.channel_url(market_id)
+                ) as websocket:
+                    backoff = settings.BUDA_RETRY_BACKOFF
+                    async for raw in websocket:
+                        self.handle(market_id, raw)
+            except (OSError, websockets.WebSocketException):
+                pass
+            # the book isn't followed anymore, so it can't be trusted
+            self.tops[market_id].clear()
+
+            if not self.reconnect:
+                return
+            # a `book-sync` is sent again after reconnecting
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    async def run(self):
+        """
+        Consume the channels of all markets until cancelled.
+        """
+        await asyncio.gather(
+            *(self.follow(market_id) for market_id in self.tops)
+        )
@@ -0,0 +1,306 @@
+import json
+import socket
+import threading
+from .test_setup import TestSetUp
+from django.contrib.auth.models import Permission, User
+from django.test import TransactionTestCase
+from django.urls import reverse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from rest_framework import status
+from decimal import Decimal
+from unittest.mock import patch
+from ..alerts import AlertEngine, webhook_error
+from ..models import AlertRule, Spread
+
+
+class Receiver(BaseHTTPRequestHandler):
+    """
+    Webhook receiver that keeps the alerts posted to it.
+    """
+
+    def do_POST(self):
+        if self.path == "/redirect":
+            self.send_response(307)
+            self.send_header("Location", "/alerts")
+            self.end_headers()
+            return
+        length = int(self.headers["Content-Length"])
+        self.server.alerts.append(json.loads(self.rfile.read(length)))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class AlertsSetUp:
+    """
+    Local webhook receiver, and helpers to create rules and spreads.
+    """
+
+    market_id = "BTC-CLP"
+
+    def set_up_receiver(self):
+        self.receiver = ThreadingHTTPServer(("127.0.0.1", 0), Receiver)
+        self.receiver.alerts = []
+        threading.Thread(target=self.receiver.serve_forever).start()
+        self.addCleanup(self.receiver.server_close)
+        self.addCleanup(self.receiver.shutdown)
+        self.webhook_url = "http://127.0.0.1:%d/alerts" % (
+            self.receiver.server_port
+        )
+        # only the local receiver is allowed besides public HTTPS webhooks
+        patcher = patch(
+            "api.alerts.webhook_error",
+            side_effect=lambda url: (
+                None
+                if url.startswith(self.webhook_url.rsplit("/", 1)[0])
+                else webhook_error(url)
+            ),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.engine = AlertEngine(refresh_interval=0)
+
+    def create_rule(self, **kwargs) -> AlertRule:
+        return AlertRule.objects.create(
+            **{
+                "market_id": self.market_id,
+                "threshold": Decimal(100),
+                "baseline": Decimal(1000),
+                "webhook_url": self.webhook_url,
+                **kwargs,
+            }
+        )
+
+    def spread(self, value, market_id: str = None) -> Spread:
+        return Spread(
+            market_id=market_id or self.market_id,
+            value=Decimal(value),
+            currency="CLP",
+        )
+
+
+class TestAlerts(AlertsSetUp, TestSetUp):
+    """
+    Tests for spread alert rules.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.set_up_receiver()
+
+    def test_thresholds(self):
+        """
+        Validate absolute and percentage changes, in each direction
+        """
+        absolute = self.create_rule()
+        up = self.create_rule(direction=AlertRule.UP)
+        percentage = self.create_rule(
+            kind=AlertRule.PERCENTAGE,
+            direction=AlertRule.DOWN,
+            threshold=Decimal(20),
+        )
+
+        self.assertTrue(absolute.is_exceeded(self.spread(900)))
+        self.assertFalse(absolute.is_exceeded(self.spread(950)))
+        self.assertFalse(up.is_exceeded(self.spread(900)))
+        self.assertTrue(up.is_exceeded(self.spread(1100)))
+        self.assertEqual(percentage.change(self.spread(750)), Decimal(-25))
+        self.assertTrue(percentage.is_exceeded(self.spread(750)))
+        self.assertFalse(percentage.is_exceeded(self.spread(1500)))
+
+    def test_only_market_rules_are_evaluated(self):
+        """
+        Validate a spread is only checked against its market rules
+        """
+        self.create_rule()
+        for _ in range(1000):
+            self.create_rule(market_id="ETH-CLP")
+        self.engine.refresh()
+
+        self.assertEqual(len(self.engine.index), 1001)
+        self.assertEqual(len(self.engine.index.rules_for("BTC-CLP")), 1)
+        self.assertEqual(self.engine.evaluate(self.spread(0, "LTC-CLP")), [])
+
+    def test_rules_fire_once_when_crossed(self):
+        """
+        Validate a rule fires when crossing its threshold, and again only
+        after getting back within it
+        """
+        rule = self.create_rule()
+        self.engine.refresh()
+
+        fired = [
+            len(self.engine.evaluate(self.spread(value)))
+            for value in (1050, 1200, 1300, 1000, 1250)
+        ]
+        self.assertEqual(fired, [0, 1, 0, 0, 1])
+
+        rule.delete()
+        self.assertTrue(self.engine.refresh())
+        self.assertEqual(self.engine.evaluate(self.spread(0)), [])
+
+    def authenticate(self, *permissions: str):
+        user = User.objects.create_user("-".join(permissions))
+        user.user_permissions.set(
+            Permission.objects.filter(codename__in=permissions)
+        )
+        self.client.force_authenticate(user)
+
+    def resolve(self, address: str):
+        """
+        Resolve every webhook host to an address, without DNS requests.
+        """
+        patcher = patch(
+            "api.alerts.socket.getaddrinfo",
+            return_value=[
+                (socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, 443))
+            ],
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_create_rule(self):
+        """
+        Validate rule creation, with the latest stored spread as baseline
+        """
+        self.authenticate("add_alertrule")
+        self.resolve("93.184.216.34")
+        Spread.from_ticker_data(self.valid_ticker_data).save()
+        url = reverse("alert-list")
+
+        response = self.client.post(
+            url,
+            {
+                "market_id": "btc-clp",
+                "kind": "percentage",
+                "threshold": "5",
+                "webhook_url": "https://example.com/alerts",
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["market_id"], "BTC-CLP")
+        self.assertEqual(Decimal(response.data["baseline"]), Decimal(481795))
+
+        response = self.client.post(
+            url,
+            {
+                "market_id": "eth-clp",
+                "threshold": "5",
+                "webhook_url": "https://example.com/alerts",
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("baseline", response.data)
+
+    def test_rules_need_permissions(self):
+        """
+        Validate rules can't be read nor changed without permissions
+        """
+        self.create_rule()
+        url = reverse("alert-list")
+        self.assertEqual(
+            self.client.get(url).status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+
+        self.authenticate("add_alertrule")
+        self.assertEqual(
+            self.client.get(url).status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+        self.authenticate("view_alertrule")
+        self.assertEqual(len(self.client.get(url).data), 1)
+        response = self.client.post(url, {"market_id": "btc-clp"})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_webhook_url(self):
+        """
+        Validate webhooks must be HTTPS URLs of public hosts
+        """
+        self.authenticate("add_alertrule")
+        url = reverse("alert-list")
+        data = {"market_id": "btc-clp", "threshold": "5", "baseline": "1"}
+
+        self.resolve("93.184.216.34")
+        response = self.client.post(
+            url,
+            {**data, "webhook_url": "http://example.com/alerts"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("webhook_url", response.data)
+
+        for address in ("127.0.0.1", "10.0.0.1", "169.254.169.254", "::1"):
+            self.resolve(address)
+            response = self.client.post(
+                url,
+                {**data, "webhook_url": "https://example.com/alerts"},
+            )
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_400_BAD_REQUEST,
+                address,
+            )
+            self.assertIn("webhook_url", response.data)
+
+
+class TestAlertWebhook(AlertsSetUp, TransactionTestCase):
+    """
+    Tests for alerts sent from the webhook workers, which need the rules
+    to be committed to be seen from their database connection.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.set_up_receiver()
+
+    def test_webhook(self):
+        """
+        Validate fired alerts are posted to the rule webhook
+        """
+        rule = self.create_rule()
+        self.engine.refresh()
+
+        futures = self.engine.process(
+            [self.spread(1200), self.spread(5000, "ETH-CLP")]
+        )
+        self.assertEqual([future.result() for future in futures], [True])
+
+        self.assertEqual(len(self.receiver.alerts), 1)
+        alert = self.receiver.alerts[0]
+        self.assertEqual(alert["rule_id"], rule.pk)
+        self.assertEqual(alert["market_id"], "BTC-CLP")
+        self.assertEqual(alert["spread"], ["1200", "CLP"])
+        self.assertEqual(Decimal(alert["change"]), Decimal(200))
+
+        rule.refresh_from_db()
+        self.assertIsNotNone(rule.last_triggered)
+        # recording the alert doesn't reload the rules
+        self.assertFalse(self.engine.refresh())
+
+    def test_webhook_checked_when_sent(self):
+        """
+        Validate alerts aren't posted to webhooks that resolve to private
+        addresses by the time they fire, nor through redirects
+        """
+        self.create_rule(webhook_url="https://alerts.example.com/alerts")
+        self.create_rule(
+            webhook_url=self.webhook_url.replace("/alerts", "/redirect")
+        )
+        self.engine.refresh()
+
+        with patch(
+            "api.alerts.socket.getaddrinfo",
+            return_value=[
+                (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.1", 443))
+            ],
+        ), self.assertLogs("api.alerts", "ERROR"):
+            futures = self.engine.process([self.spread(1200)])
+            self.assertEqual(
+                [future.result() for future in futures], [False, False]
+            )
+        self.assertEqual(self.receiver.alerts, [])
+        self.assertFalse(
+            AlertRule.objects.filter(last_triggered__isnull=False).exists()
+        )
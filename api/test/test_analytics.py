@@ -0,0 +1,154 @@
+from .test_setup import TestSetUp
+from django.urls import reverse
+from math import isnan
+from rest_framework import status
+from unittest.mock import patch
+from ..analytics import MarketsSnapshot
+from ..models import Market
+
+
+class TestAnalytics(TestSetUp):
+    """
+    Tests for the analytics of all markets at once.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # market ID, best bid and best ask
+        self.quotes = [
+            ("BTC-CLP", 1000.0, 1010.0),
+            ("ETH-CLP", 100.0, 101.0),
+            ("ETH-BTC", 0.12, 0.125),
+        ]
+        self.markets = [
+            Market.create(
+                "",
+                {
+                    **self.valid_market_data,
+                    "id": market_id,
+                    "base_currency": market_id.split("-")[0],
+                    "quote_currency": market_id.split("-")[1],
+                    "taker_fee": "1",
+                    "taker_discount_percentage": "0",
+                },
+            )
+            for market_id, _, _ in self.quotes
+        ]
+        self.url = reverse("spread-analytics")
+
+    def fetch_data(self, endpoint: str) -> dict:
+        if endpoint == "/markets":
+            return {
+                "markets": [
+                    {
+                        **self.valid_market_data,
+                        "id": market.id,
+                        "base_currency": market.base_currency,
+                        "quote_currency": market.quote_currency,
+                    }
+                    for market in self.markets
+                ]
+            }
+        return {
+            "tickers": [
+                {
+                    **self.valid_ticker_data,
+                    "market_id": market_id,
+                    "max_bid": [str(bid), market_id.split("-")[1]],
+                    "min_ask": [str(ask), market_id.split("-")[1]],
+                }
+                for market_id, bid, ask in self.quotes
+            ]
+        }
+
+    def test_spreads(self):
+        """
+        Validate spreads are calculated in basis points of the mid price
+        """
+        spreads = MarketsSnapshot(self.quotes, self.markets).spreads()
+        self.assertAlmostEqual(spreads["spread"][0], 10)
+        self.assertAlmostEqual(spreads["spread_bps"][0], 10 / 1005 * 10000)
+        self.assertAlmostEqual(spreads["fee_rate"][0], 0.01)
+        self.assertAlmostEqual(
+            spreads["spread_with_fees"][0],
+            1010 * 1.01 - 1000 * 0.99,
+        )
+
+    def test_rates(self):
+        """
+        Validate bids sell the base currency and asks buy it
+        """
+        snapshot = MarketsSnapshot(self.quotes)
+        self.assertEqual(snapshot.currencies, ["BTC", "CLP", "ETH"])
+        rates = snapshot.rates(fees=False)
+        self.assertAlmostEqual(rates[0, 1], 1000)
+        self.assertAlmostEqual(rates[1, 0], 1 / 1010)
+        self.assertAlmostEqual(rates[2, 0], 0.12)
+        self.assertAlmostEqual(rates[0, 2], 1 / 0.125)
+
+    def test_cross_rates(self):
+        """
+        Validate the best rate through a third currency is found
+        """
+        snapshot = MarketsSnapshot(self.quotes)
+        cross_rates = {
+            (rate["from"], rate["to"]): rate
+            for rate in snapshot.cross_rates(fees=False)
+        }
+        # selling ETH for BTC, and then BTC for CLP
+        eth_clp = cross_rates[("ETH", "CLP")]
+        self.assertEqual(eth_clp["via"], "BTC")
+        self.assertAlmostEqual(eth_clp["rate"], 0.12 * 1000)
+        self.assertAlmostEqual(eth_clp["direct_rate"], 100)
+
+    def test_triangles(self):
+        """
+        Validate every round trip is found once, with its edge
+        """
+        # ETH is cheaper on ETH-BTC than on ETH-CLP
+        self.quotes[2] = ("ETH-BTC", 0.09, 0.095)
+        triangles = MarketsSnapshot(self.quotes).triangles(fees=False)
+        self.assertEqual(len(triangles), 2)
+        best = triangles[0]
+        # buy ETH with BTC, sell it for CLP, and buy BTC back
+        self.assertEqual(best["path"], ["BTC", "ETH", "CLP", "BTC"])
+        self.assertAlmostEqual(
+            best["edge_bps"],
+            (1 / 0.095 * 100 / 1010 - 1) * 10000,
+        )
+        self.assertLess(triangles[1]["edge_bps"], 0)
+        self.assertEqual(
+            MarketsSnapshot(self.quotes).triangles(fees=False, limit=1),
+            triangles[:1],
+        )
+
+    def test_missing_prices(self):
+        """
+        Validate markets without bids get no spread nor rates
+        """
+        self.quotes[0] = ("BTC-CLP", 0.0, 1010.0)
+        snapshot = MarketsSnapshot(self.quotes)
+        self.assertTrue(isnan(snapshot.spreads()["spread"][0]))
+        rates = snapshot.rates()
+        self.assertEqual(rates[0, 1], 0)
+
+    def test_analytics(self):
+        """
+        Validate the analytics of all markets are returned
+        """
+        with patch("api.models.fetch_data", side_effect=self.fetch_data):
+            response = self.client.get(self.url, {"limit": 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [market["market_id"] for market in response.data["markets"]],
+            ["BTC-CLP", "ETH-CLP", "ETH-BTC"],
+        )
+        self.assertEqual(len(response.data["triangles"]), 1)
+        self.assertIn("from", response.data["cross_rates"][0])
+
+    def test_analytics_invalid_query(self):
+        """
+        Validate the query parameters are validated
+        """
+        response = self.client.get(self.url, {"limit": 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,156 @@
+import numpy as np
+import tempfile
+from .test_setup import TestSetUp
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from django.core.management import call_command
+from io import StringIO
+from ..archive import SpreadArchive
+from ..models import Spread, SpreadRollupState
+
+
+class TestArchive(TestSetUp):
+    """
+    Tests for the columnar archive of the spreads history.
+    """
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.archive = SpreadArchive(directory.name)
+        self.day = date(2024, 2, 14)
+        self.start = datetime(2024, 2, 14, tzinfo=timezone.utc)
+
+    def rows(self, count: int, start: datetime = None) -> list:
+        start = start or self.start
+        return [
+            (
+                start + timedelta(minutes=i),
+                Decimal(f"{1000 + i}.5"),
+                "CLP",
+            )
+            for i in range(count)
+        ]
+
+    def save_spreads(self, market_id: str, rows: list):
+        for fetch_date, value, currency in rows:
+            spread = Spread.objects.create(
+                market_id=market_id,
+                value=value,
+                currency=currency,
+            )
+            Spread.objects.filter(pk=spread.pk).update(fetch_date=fetch_date)
+
+    def test_write_and_read(self):
+        """
+        Validate spreads are read back exactly, memory-mapped
+        """
+        rows = self.rows(10)
+        self.archive.write("btc-clp", self.day, rows)
+        self.assertEqual(self.archive.markets(), ["BTC-CLP"])
+        self.assertEqual(self.archive.days("BTC-CLP"), [self.day])
+
+        spreads = self.archive.read(
+            "BTC-CLP",
+            self.start + timedelta(minutes=2),
+            self.start + timedelta(minutes=5),
+        )
+        self.assertEqual(len(spreads), 3)
+        self.assertEqual(spreads.scale, 1)
+        self.assertEqual(spreads.currency, "CLP")
+        self.assertEqual(spreads.decimals(), [row[1] for row in rows[2:5]])
+        self.assertEqual(spreads.value.tolist(), [1002.5, 1003.5, 1004.5])
+        self.assertIsInstance(spreads.scaled.base, np.memmap)
+        self.assertEqual(
+            spreads.fetch_date[0],
+            np.datetime64("2024-02-14T00:02:00", "us"),
+        )
+
+    def test_merge(self):
+        """
+        Validate a partition written again keeps its spreads only once
+        """
+        rows = self.rows(10)
+        self.archive.write("BTC-CLP", self.day, rows[:6])
+        rows.append((self.start, Decimal("0.125"), "CLP"))
+        self.assertEqual(self.archive.write("BTC-CLP", self.day, rows), 11)
+
+        spreads = self.archive.read(
+            "BTC-CLP",
+            self.start,
+            self.start + timedelta(days=1),
+        )
+        self.assertEqual(spreads.scale, 3)
+        self.assertEqual(
+            sorted(spreads.decimals()),
+            sorted(row[1] for row in rows),
+        )
+
+    def test_read_several_days(self):
+        """
+        Validate ranges across days, compressed or not, are concatenated
+        """
+        self.archive.write("BTC-CLP", self.day, self.rows(3))
+        next_day = self.start + timedelta(days=1)
+        self.archive.write(
+            "BTC-CLP",
+            self.day + timedelta(days=1),
+            [(next_day, Decimal(7), "CLP")],
+            compress=True,
+        )
+
+        spreads = self.archive.read(
+            "BTC-CLP",
+            self.start + timedelta(minutes=1),
+            self.start + timedelta(days=2),
+        )
+        self.assertEqual(
+            spreads.decimals(),
+            [Decimal("1001.5"), Decimal("1002.5"), Decimal(7)],
+        )
+        self.assertEqual(
+            len(self.archive.read("ETH-CLP", self.start, next_day)),
+            0,
+        )
+
+    def test_command(self):
+        """
+        Validate complete days are archived, and pruned from database once
+        they're rolled up
+        """
+        self.save_spreads("BTC-CLP", self.rows(5))
+        SpreadRollupState.objects.create(
+            pk=1, rolled_id=Spread.objects.latest("id").pk
+        )
+        self.save_spreads("ETH-CLP", self.rows(2))
+        self.save_spreads("BTC-CLP", self.rows(2, datetime.now(timezone.utc)))
+
+        stdout = StringIO()
+        call_command(
+            "archive_spreads",
+            "--directory",
+            str(self.archive.root),
+            "--chunk-size",
+            "2",
+            "--prune",
+            stdout=stdout,
+        )
+        self.assertIn("Archived 7 spreads in 2 partitions", stdout.getvalue())
+        self.assertIn("5 deleted from database", stdout.getvalue())
+        self.assertEqual(self.archive.markets(), ["BTC-CLP", "ETH-CLP"])
+        self.assertEqual(
+            self.archive.read(
+                "BTC-CLP",
+                self.start,
+                self.start + timedelta(days=1),
+            ).decimals(),
+            [row[1] for row in self.rows(5)],
+        )
+        # today's spreads, and the ones not rolled up yet, are kept
+        self.assertEqual(Spread.objects.count(), 4)
+        self.assertFalse(
+            Spread.objects.filter(
+                market_id="BTC-CLP", fetch_date__lt=self.start.replace(day=15)
+            ).exists()
+        )
@@ -0,0 +1,159 @@
+import socket
+from .test_setup import TestSetUp
+from buda.aio import close_async_client
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from requests import Response
+from requests.exceptions import HTTPError
+from unittest.mock import patch
+from ..models import Spread
+
+
+class TestAsyncViews(TestSetUp):
+    """
+    Tests for `/async/spreads/*` endpoints.
+    """
+
+    async def fake_afetch_data(self, endpoint: str) -> dict:
+        if endpoint == "/markets":
+            return {"markets": [self.valid_market_data]}
+        if endpoint == "/tickers":
+            ticker = {**self.valid_ticker_data, "market_id": "USDC-CLP"}
+            return {"tickers": [ticker]}
+        if self.invalid_market_id in endpoint:
+            response = Response()
+            response.status_code = status.HTTP_404_NOT_FOUND
+            raise HTTPError("404 Client Error", response=response)
+        market_id = endpoint.split("/")[2].upper()
+        return {"ticker": {**self.valid_ticker_data, "market_id": market_id}}
+
+    def setUp(self):
+        super().setUp()
+        for target in ("api.models.afetch_data", "buda.aio.afetch_data"):
+            patcher = patch(target, self.fake_afetch_data)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_get_each_markets_spread(self):
+        """
+        Validate correct spreads list retrieving.
+        """
+        response = await self.async_client.get(reverse("async-spread-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["content-type"], "application/json")
+        self.assertEqual(response.json()[0]["market_id"], "USDC-CLP")
+
+    async def test_get_market_spread(self):
+        """
+        Validate correct spread retrieving, with the same output as the
+        synchronous endpoint.
+        """
+        url = reverse(
+            "async-spread-detail",
+            kwargs={"market_id": self.valid_market_id},
+        )
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            {
+                "market_id": "BTC-CLP",
+                "value": "481795.0000000000",
+                "currency": "CLP",
+            },
+        )
+
+    async def test_get_invalid_market_spread(self):
+        """
+        Validate upstream errors are forwarded to the client.
+        """
+        url = reverse(
+            "async-spread-detail",
+            kwargs={"market_id": self.invalid_market_id},
+        )
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_save_spread_and_polling(self):
+        """
+        Validate a spread is saved on database and then compared.
+        """
+        kwargs = {"market_id": self.valid_market_id}
+        response = await self.async_client.get(
+            reverse("async-spread-polling", kwargs=kwargs)
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = await self.async_client.get(
+            reverse("async-spread-save", kwargs=kwargs)
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(await Spread.objects.acount(), 1)
+
+        response = await self.async_client.get(
+            reverse("async-spread-polling", kwargs=kwargs)
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["difference"], "0.0000000000")
+
+
+@override_settings(
+    BUDA_CACHE_TTL={"markets": 0, "ticker": 0, "default": 0},
+    BUDA_RATE_LIMIT=0,
+    BUDA_RETRIES=0,
+    BUDA_BREAKER_FAILURES=100,
+    BUDA_READ_TIMEOUT=0.2,
+)
+class TestAsyncUpstreamErrors(TestSetUp):
+    """
+    Tests for `/async/spreads/*` endpoints when Buda.com API can't be
+    reached, through the actual HTTP client.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # accepts connections but never answers
+        self.silent = socket.create_server(("127.0.0.1", 0))
+        self.addCleanup(self.silent.close)
+        # refuses connections
+        with socket.create_server(("127.0.0.1", 0)) as closed:
+            self.closed_port = closed.getsockname()[1]
+
+    async def get(self, name: str, port: int):
+        url = reverse(name, kwargs={"market_id": self.valid_market_id})
+        with patch("buda.utils.BASE_URL", f"http://127.0.0.1:{port}"):
+            try:
+                return await self.async_client.get(url)
+            finally:
+                await close_async_client()
+
+    async def test_connect_error(self):
+        """
+        Validate unreachable Buda.com API responds with a bad gateway
+        """
+        for name in ("async-spread-detail", "async-spread-save"):
+            response = await self.get(name, self.closed_port)
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_502_BAD_GATEWAY,
+                name,
+            )
+
+    async def test_timeout(self):
+        """
+        Validate a Buda.com API that doesn't answer responds with a gateway
+        timeout
+        """
+        port = self.silent.getsockname()[1]
+        response = await self.get("async-spread-detail", port)
+        self.assertEqual(response.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
+        self.assertEqual(await Spread.objects.acount(), 0)
+
+        await Spread.objects.acreate(
+            market_id=self.valid_market_id,
+            value=1,
+            currency=self.valid_quote_currency,
+        )
+        response = await self.get("async-spread-polling", port)
+        self.assertEqual(response.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
@@ -0,0 +1,147 @@
+import gzip
+import json
+import tempfile
+from .test_setup import TestSetUp
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from django.core.management import call_command
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+from ..backfill import copy_spreads, date_pattern, parse_line
+from ..models import BackfillCheckpoint, Spread
+
+
+class TestBackfill(TestSetUp):
+    """
+    Tests for the backfill of the spreads history from recorded tickers.
+    """
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "tickers.jsonl"
+        self.start = datetime(2024, 2, 14, tzinfo=timezone.utc)
+        self.dates = date_pattern("timestamp")
+
+    def ticker(self, i: int) -> dict:
+        return {
+            **self.valid_ticker_data,
+            "market_id": "btc-clp",
+            "timestamp": (self.start + timedelta(seconds=i)).isoformat(),
+        }
+
+    def write_tickers(self, count: int, path: Path = None):
+        path = path or self.path
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "wt") as file:
+            for i in range(count):
+                file.write(json.dumps(self.ticker(i)) + "\n")
+            # not a ticker
+            file.write('{"message": "Not found"}\n')
+
+    def backfill(self, *args) -> str:
+        stdout = StringIO()
+        call_command(
+            "backfill_spreads",
+            str(self.path),
+            *args,
+            stdout=stdout,
+        )
+        return stdout.getvalue()
+
+    def test_parse_line(self):
+        """
+        Validate the spread is calculated from the fields of a line
+        """
+        expected = (
+            "BTC-CLP",
+            Decimal("481795.0"),
+            "CLP",
+            self.start,
+        )
+        line = json.dumps(self.ticker(0)).encode()
+        self.assertEqual(parse_line(line, self.dates, "timestamp"), expected)
+
+        # nested, with escaped characters and the date as a number
+        ticker = {**self.ticker(0), "timestamp": self.start.timestamp()}
+        ticker["max_bid"] = ["40319190.0", "CLP"]
+        line = json.dumps({"ticker": ticker}, ensure_ascii=True)
+        line = line.replace('"CLP"', '"\\u0043LP"').encode()
+        self.assertEqual(parse_line(line, self.dates, "timestamp"), expected)
+
+        for line in (b"{}", b"not json", b'{"market_id": "BTC-CLP"}'):
+            self.assertIsNone(parse_line(line, self.dates, "timestamp"))
+
+        # fields that don't fit on their columns
+        for ticker in (
+            {**self.ticker(0), "market_id": "BTC-" + "CLP" * 10},
+            {**self.ticker(0), "max_bid": ["1.0", "CLP" * 10]},
+            {**self.ticker(0), "min_ask": ["2e12", "CLP"]},
+            {**self.ticker(0), "min_ask": ["NaN", "CLP"]},
+        ):
+            line = json.dumps(ticker).encode()
+            self.assertIsNone(parse_line(line, self.dates, "timestamp"))
+
+    def test_copy_spreads(self):
+        """
+        Validate spreads are written with their dates
+        """
+        copy_spreads(
+            [
+                ("BTC-CLP", Decimal("10.5"), "CLP", self.start),
+                ("ETH-CLP", Decimal(3), "CLP", self.start),
+            ]
+        )
+        spread = Spread.objects.get(market_id="BTC-CLP")
+        self.assertEqual(spread.value, Decimal("10.5"))
+        self.assertEqual(spread.fetch_date, self.start)
+        self.assertEqual(Spread.objects.count(), 2)
+
+    def test_backfill(self):
+        """
+        Validate all tickers are written, skipping invalid lines
+        """
+        self.path = self.path.with_suffix(".gz")
+        self.write_tickers(25)
+        output = self.backfill("--batch-size", "10")
+        self.assertIn("Backfilled 25 spreads", output)
+        self.assertIn("1 lines skipped", output)
+        self.assertEqual(Spread.objects.count(), 25)
+        self.assertEqual(
+            Spread.objects.latest("fetch_date").fetch_date,
+            self.start + timedelta(seconds=24),
+        )
+
+    def test_resume(self):
+        """
+        Validate an interrupted backfill resumes after the last batch saved
+        """
+        self.write_tickers(25)
+        calls = []
+
+        def fail_second_batch(rows):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            copy_spreads(rows)
+
+        with patch(
+            "api.management.commands.backfill_spreads.copy_spreads",
+            side_effect=fail_second_batch,
+        ):
+            with self.assertRaises(KeyboardInterrupt):
+                self.backfill("--batch-size", "10")
+        self.assertEqual(Spread.objects.count(), 10)
+        self.assertEqual(BackfillCheckpoint.objects.get().rows, 10)
+
+        output = self.backfill("--batch-size", "10")
+        self.assertIn("Resuming after 10 spreads", output)
+        self.assertEqual(Spread.objects.count(), 25)
+        self.assertEqual(Spread.objects.distinct("fetch_date").count(), 25)
+
+        # nothing is left to read
+        self.assertIn("Backfilled 0 spreads", self.backfill())
+        self.assertIn("Backfilled 25 spreads", self.backfill("--restart"))
+        self.assertEqual(Spread.objects.count(), 50)
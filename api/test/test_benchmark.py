@@ -0,0 +1,92 @@
+from .test_setup import TestSetUp
+from django.test import Client, override_settings
+from django.urls import reverse
+from unittest.mock import patch
+from time import monotonic
+from ..benchmark import BudaStandIn, compare, percentile, run_load
+from ..models import Spread
+from ..rendered import rendered_cache
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+        "spreads": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "test-benchmark",
+        },
+    },
+    BUDA_CACHE_TTL={"markets": 0, "ticker": 0, "default": 0},
+    BUDA_RATE_LIMIT=0,
+    BUDA_RETRIES=0,
+)
+class TestBenchmark(TestSetUp):
+    """
+    Tests for the local stand-in of Buda.com API and the load benchmark.
+    """
+
+    def start(self, **kwargs) -> BudaStandIn:
+        stand_in = BudaStandIn(**kwargs).start()
+        self.addCleanup(stand_in.stop)
+        patcher = patch("buda.utils.BASE_URL", stand_in.base_url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        rendered_cache.clear()
+        return stand_in
+
+    def test_stand_in(self):
+        """
+        Validate the spreads of the stand-in markets are calculated, after
+        its latency
+        """
+        stand_in = self.start(markets=5, latency=0.05, bulk_tickers=False)
+
+        started = monotonic()
+        spreads = Spread.get_each_markets_spread()
+        self.assertGreaterEqual(monotonic() - started, 0.05)
+
+        self.assertEqual(
+            [spread.market_id for spread in spreads],
+            stand_in.market_ids,
+        )
+        self.assertEqual(spreads[1].value, 101)
+        # the bulk endpoint failed, then the markets and each ticker
+        self.assertEqual(stand_in.calls, {"ticker": 6, "markets": 1})
+
+    def test_error_rate(self):
+        """
+        Validate the stand-in fails the given share of requests
+        """
+        stand_in = BudaStandIn(error_rate=0.25, seed=1)
+        answers = [stand_in.answer("/tickers")[0] for _ in range(400)]
+        stand_in.server_close()
+
+        self.assertAlmostEqual(answers.count(503) / 400, 0.25, delta=0.05)
+        self.assertEqual(stand_in.answer("/markets/X-CLP")[0], 404)
+
+    def test_run_load(self):
+        """
+        Validate the load summary, and that it's compared with a baseline
+        """
+        stand_in = self.start(markets=3)
+
+        result = run_load(Client, [reverse("spread-list")], 4, 20)
+        self.assertEqual(result["requests"], 20)
+        self.assertEqual(result["statuses"], {"200": 20})
+        self.assertLessEqual(result["p50"], result["p95"])
+        self.assertLessEqual(result["p95"], result["p99"])
+        self.assertGreaterEqual(stand_in.calls["ticker"], 1)
+
+        result["upstream_per_request"] = 0.1
+        self.assertEqual(compare(result, result, 0.25), [])
+        slower = {**result, "p95": result["p95"] * 2 + 1, "rps": 0}
+        self.assertEqual(len(compare(slower, result, 0.25)), 2)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertEqual(percentile([], 95), 0)
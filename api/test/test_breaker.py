@@ -0,0 +1,213 @@
+import asyncio
+import httpx
+from .test_setup import TestSetUp
+from buda.breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpen,
+    get_breaker,
+)
+from buda.ratelimit import RateLimited
+from buda.utils import fetch_data
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from requests import Response
+from requests.exceptions import ConnectionError, HTTPError
+from decimal import Decimal
+from unittest.mock import patch
+from ..models import Spread
+from ..rendered import rendered_cache
+from ..store import spread_store
+
+
+def http_error(status_code: int) -> HTTPError:
+    response = Response()
+    response.status_code = status_code
+    return HTTPError(f"{status_code} Error", response=response)
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+        "spreads": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "test-breaker",
+        },
+    },
+    BUDA_CACHE_TTL={"markets": 0, "ticker": 0, "default": 0},
+    BUDA_RATE_LIMIT=0,
+    BUDA_RETRIES=0,
+    BUDA_BREAKER_FAILURES=3,
+    BUDA_BREAKER_RESET=30,
+    BUDA_BREAKER_SLOW_CALL=5,
+    SPREAD_STORE_MAX_AGE=30,
+)
+class TestBreaker(TestSetUp):
+    """
+    Tests for the circuit breakers of Buda.com API and the stale responses
+    served while they are open.
+    """
+
+    def setUp(self):
+        super().setUp()
+        spread_store.cache.clear()
+        rendered_cache.clear()
+
+    def test_open_after_failures(self):
+        """
+        Validate consecutive failures open the breaker, and requests fail
+        fast until a probe is let through
+        """
+        breaker = CircuitBreaker("ticker", reset_timeout=0.05)
+        for _ in range(3):
+            breaker.before()
+            breaker.record(http_error(502))
+        self.assertEqual(breaker.state, OPEN)
+
+        with self.assertRaises(CircuitOpen) as error:
+            breaker.before()
+        self.assertEqual(error.exception.response.status_code, 503)
+        self.assertIn("Retry-After", error.exception.response.headers)
+
+        with patch("buda.breaker.monotonic", return_value=10**9):
+            # a single probe at a time
+            breaker.before()
+            self.assertEqual(breaker.state, HALF_OPEN)
+            with self.assertRaises(CircuitOpen):
+                breaker.before()
+
+            # a failed probe opens the breaker again
+            breaker.record(ConnectionError())
+            self.assertEqual(breaker.state, OPEN)
+
+        with patch("buda.breaker.monotonic", return_value=2 * 10**9):
+            breaker.before()
+            breaker.record(elapsed=0.1)
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual(breaker.consecutive_failures, 0)
+
+    def test_failures(self):
+        """
+        Validate only errors of Buda.com API and slow calls are failures
+        """
+        breaker = CircuitBreaker("ticker", failures=1)
+        for error in (http_error(404), RateLimited(1)):
+            breaker.before()
+            breaker.record(error)
+        breaker.before()
+        breaker.record(elapsed=1)
+        self.assertEqual(breaker.state, CLOSED)
+
+        breaker.before()
+        breaker.record(elapsed=6)
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_async_failures(self):
+        """
+        Validate httpx transport errors are failures, and cancelled
+        requests are neither failures nor successes
+        """
+        breaker = CircuitBreaker("ticker", failures=2, reset_timeout=0)
+        breaker.before()
+        breaker.record(httpx.ConnectError("refused"))
+        breaker.before()
+        breaker.record(asyncio.CancelledError())
+        self.assertEqual(breaker.consecutive_failures, 1)
+        breaker.before()
+        breaker.record(httpx.ReadTimeout("timed out"))
+        self.assertEqual(breaker.state, OPEN)
+
+        # a cancelled probe lets another one through
+        breaker.before()
+        breaker.record(KeyboardInterrupt())
+        self.assertEqual(breaker.state, HALF_OPEN)
+        breaker.before()
+
+        # a limit of zero seconds is kept instead of the default one
+        breaker = CircuitBreaker("ticker", failures=1, slow_call=0)
+        breaker.before()
+        breaker.record(elapsed=0.1)
+        self.assertEqual(breaker.state, OPEN)
+
+    @patch("buda.utils.get_session")
+    def test_fail_fast(self, get_session):
+        """
+        Validate no request is sent while the breaker is open
+        """
+        get_session.return_value.get.side_effect = ConnectionError()
+        for _ in range(3):
+            with self.assertRaises(ConnectionError):
+                fetch_data("/markets/btc-clp/ticker")
+
+        with self.assertRaises(CircuitOpen):
+            fetch_data("/markets/eth-clp/ticker")
+        self.assertEqual(get_session.return_value.get.call_count, 3)
+
+        # other endpoint classes are still requested
+        with self.assertRaises(ConnectionError):
+            fetch_data("/markets")
+        self.assertEqual(get_breaker("markets").state, CLOSED)
+
+    @patch(
+        "api.models.Spread.get_each_markets_spread",
+        side_effect=http_error(503),
+    )
+    def test_stale_spreads(self, _):
+        """
+        Validate stored spreads of any age are served while Buda.com API
+        is failing, marked as stale
+        """
+        spreads = [
+            Spread(market_id="BTC-CLP", value=Decimal(100), currency="CLP"),
+        ]
+        spread_store.set_many(spreads, fetched_at=0)
+
+        response = self.client.get(reverse("spread-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]["market_id"], "BTC-CLP")
+        self.assertEqual(response["Warning"], '110 - "Response is Stale"')
+        self.assertGreater(int(response["Age"]), 30)
+
+    @patch("api.models.Spread.create")
+    def test_stale_spread(self, create):
+        """
+        Validate the last spread served is served again while Buda.com API
+        is failing, but errors for unknown markets are returned as usual
+        """
+        url = reverse(
+            "spread-detail",
+            kwargs={"market_id": self.valid_market_id},
+        )
+        create.side_effect = lambda market_id: Spread(
+            market_id=market_id.upper(),
+            value=Decimal(100),
+            currency="CLP",
+        )
+        fresh = self.client.get(url)
+        self.assertNotIn("Warning", fresh)
+
+        create.side_effect = CircuitOpen("ticker", 30)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, fresh.content)
+        self.assertEqual(response["Warning"], '110 - "Response is Stale"')
+
+        create.side_effect = http_error(404)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # without a previous response the error is returned
+        create.side_effect = CircuitOpen("ticker", 30)
+        response = self.client.get(
+            reverse("spread-detail", kwargs={"market_id": "ETH-CLP"})
+        )
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+        self.assertEqual(response["Retry-After"], "30")
@@ -0,0 +1,122 @@
+from .test_setup import TestSetUp
+from django.test import override_settings
+from django.urls import reverse
+from requests.exceptions import HTTPError
+from rest_framework import status
+from unittest.mock import AsyncMock, patch
+from ..broadcast import SpreadBroadcaster
+from ..models import Spread
+
+
+class TestBroadcast(TestSetUp):
+    """
+    Tests for live spread updates fan-out.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.patch_upstream()
+        self.spread = Spread.from_ticker_data(self.valid_ticker_data)
+        self.other_spread = Spread.from_ticker_data(
+            {**self.valid_ticker_data, "market_id": "USDC-CLP"}
+        )
+        patcher = patch.object(
+            Spread,
+            "aget_spreads_in_bulk",
+            AsyncMock(return_value=[self.spread, self.other_spread]),
+        )
+        self.fetch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_fan_out(self):
+        """
+        A single upstream refresh is pushed to every subscriber
+        """
+        broadcaster = SpreadBroadcaster(interval=60)
+        subscriptions = [
+            broadcaster.subscribe([self.valid_market_id.lower()])
+            for _ in range(50)
+        ]
+        for subscription in subscriptions:
+            await subscription.__aenter__()
+
+        received = [
+            await subscription.get(1) for subscription in subscriptions
+        ]
+
+        # all markets are refreshed at once, and filtered per subscriber
+        self.assertEqual(self.fetch.await_count, 1)
+        self.assertTrue(all(spread is self.spread for spread in received))
+        self.assertTrue(
+            all(subscription.queue.empty() for subscription in subscriptions)
+        )
+
+        for subscription in subscriptions:
+            await subscription.__aexit__(None, None, None)
+        self.assertIsNone(broadcaster._task)
+
+    async def test_unchanged_spreads_are_not_pushed(self):
+        """
+        Subscribers only receive spreads that changed
+        """
+        broadcaster = SpreadBroadcaster(interval=0.01)
+        async with broadcaster.subscribe() as subscription:
+            first = await subscription.get(1)
+            second = await subscription.get(1)
+            third = await subscription.get(0.1)
+
+        self.assertIs(first, self.spread)
+        self.assertIs(second, self.other_spread)
+        self.assertIsNone(third)
+        self.assertGreater(self.fetch.await_count, 1)
+
+    async def test_spread_stream(self):
+        """
+        Spreads are streamed as Server-Sent Events
+        """
+        response = await self.async_client.get(
+            reverse("spread-stream"),
+            {"market_ids": self.valid_market_id},
+        )
+        self.assertEqual(response["content-type"], "text/event-stream")
+
+        events = aiter(response.streaming_content)
+        event = await anext(events)
+        await events.aclose()
+
+        self.assertTrue(event.startswith(b"event: spread\ndata: "))
+        self.assertIn(b'"market_id":"BTC-CLP"', event)
+
+    async def test_without_bulk_tickers(self):
+        """
+        Only the markets wanted are refreshed one by one when the bulk
+        tickers endpoint isn't available
+        """
+        self.fetch.side_effect = HTTPError()
+        broadcaster = SpreadBroadcaster(interval=60)
+        with patch.object(
+            Spread,
+            "afetch_each_markets_spread",
+            AsyncMock(return_value=([self.spread], {})),
+        ) as fetch_each:
+            async with broadcaster.subscribe(["btc-clp"]) as subscription:
+                spread = await subscription.get(1)
+
+        fetch_each.assert_awaited_once_with([self.valid_market_id])
+        self.assertIs(spread, self.spread)
+
+    @override_settings(SPREAD_STREAM_MAX_MARKETS=2)
+    async def test_spread_stream_markets(self):
+        """
+        Only a few markets of the catalogue can be streamed at once
+        """
+        url = reverse("spread-stream")
+        response = await self.async_client.get(
+            url, {"market_ids": "btc-clp,abc-def"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = await self.async_client.get(
+            url, {"market_ids": "btc-clp,usdc-clp,eth-clp"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
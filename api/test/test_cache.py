@@ -0,0 +1,102 @@
+from .test_setup import TestSetUp
+from buda.cache import TTLCache
+from buda.utils import get_endpoint_class
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+
+
+class TestCache(TestSetUp):
+    """
+    Tests for the Buda.com API responses cache.
+    """
+
+    def setUp(self):
+        self.cache = TTLCache(maxsize=2)
+        self.calls = 0
+        return super().setUp()
+
+    def load(self):
+        self.calls += 1
+        sleep(0.1)
+        return {"calls": self.calls}
+
+    def test_cache_hit(self):
+        """
+        A fresh value is served without calling the loader again
+        """
+        first = self.cache.get_or_load("/markets", 60, self.load)
+        second = self.cache.get_or_load("/markets", 60, self.load)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_cache_expiration(self):
+        """
+        An expired value is loaded again
+        """
+        key = f"/markets/{self.valid_market_id}/ticker"
+        self.cache.get_or_load(key, 0.05, self.load)
+        sleep(0.1)
+        value = self.cache.get_or_load(key, 0.05, self.load)
+
+        self.assertEqual(value, {"calls": 2})
+
+    def test_cache_eviction(self):
+        """
+        The least recently used value is evicted when the cache is full
+        """
+        for key in ("a", "b", "a", "c"):
+            self.cache.get_or_load(key, 60, self.load)
+
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+        self.cache.get_or_load("a", 60, self.load)
+        self.assertEqual(self.calls, 3)
+        self.cache.get_or_load("b", 60, self.load)
+        self.assertEqual(self.calls, 4)
+
+    def test_cache_coalescing(self):
+        """
+        Simultaneous requests for the same key share a single load
+        """
+        key = f"/markets/{self.valid_market_id}/ticker"
+        with ThreadPoolExecutor(max_workers=200) as executor:
+            futures = [
+                executor.submit(self.cache.get_or_load, key, 1, self.load)
+                for _ in range(200)
+            ]
+            values = [future.result() for future in futures]
+
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(all(value == {"calls": 1} for value in values))
+
+    def test_cache_loader_error(self):
+        """
+        Errors are raised to the caller and never cached
+        """
+
+        def fail():
+            raise ValueError("upstream error")
+
+        with self.assertRaises(ValueError):
+            self.cache.get_or_load("/markets", 60, fail)
+        value = self.cache.get_or_load("/markets", 60, self.load)
+
+        self.assertEqual(value, {"calls": 1})
+
+    def test_endpoint_class(self):
+        """
+        Endpoints are classified by how often their data changes
+        """
+        self.assertEqual(get_endpoint_class("/markets"), "markets")
+        self.assertEqual(get_endpoint_class("/markets/btc-clp"), "markets")
+        self.assertEqual(get_endpoint_class("/tickers"), "ticker")
+        self.assertEqual(
+            get_endpoint_class("/markets/btc-clp/ticker"),
+            "ticker",
+        )
+        self.assertEqual(
+            get_endpoint_class("/markets/btc-clp/order_book"),
+            "default",
+        )
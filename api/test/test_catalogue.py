@@ -0,0 +1,161 @@
+from .test_setup import TestSetUp
+from django.db import DatabaseError
+from django.urls import reverse
+from rest_framework import status
+from requests import Response
+from requests.exceptions import HTTPError
+from decimal import Decimal
+from unittest.mock import patch
+from ..catalogue import MarketCatalogue, market_catalogue
+from ..models import Market, MarketCatalogueVersion, Spread
+
+
+class TestCatalogue(TestSetUp):
+    """
+    Tests for the market catalogue kept on database.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.markets = {
+            market_id: {
+                **self.valid_market_data,
+                "id": market_id,
+                "name": market_id.lower(),
+            }
+            for market_id in ("BTC-CLP", "ETH-CLP", "USDC-CLP")
+        }
+        self.requests = []
+        for target in ("api.models.fetch_data", "buda.utils.fetch_data"):
+            patcher = patch(target, side_effect=self.fetch_data)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fetch_data(self, endpoint: str) -> dict:
+        self.requests.append(endpoint)
+        if endpoint == "/markets":
+            return {"markets": list(self.markets.values())}
+        if endpoint == "/tickers":
+            response = Response()
+            response.status_code = 404
+            raise HTTPError("404 Client Error", response=response)
+        market_id = endpoint.split("/")[2].upper()
+        return {"ticker": {**self.valid_ticker_data, "market_id": market_id}}
+
+    def test_refresh(self):
+        """
+        Validate only the differences are stored, as a new version
+        """
+        changes = market_catalogue.refresh()
+        self.assertEqual(len(changes["added"]), 3)
+        self.assertEqual(Market.objects.count(), 3)
+        first = market_catalogue.version
+
+        # nothing changed, so there's no new version
+        changes = market_catalogue.refresh()
+        self.assertEqual(changes, {"added": [], "removed": [], "changed": []})
+        self.assertEqual(MarketCatalogueVersion.objects.count(), 1)
+
+        self.markets["BTC-CLP"]["taker_fee"] = "0.5"
+        del self.markets["ETH-CLP"]
+        self.markets["LTC-CLP"] = {**self.valid_market_data, "id": "LTC-CLP"}
+        changes = market_catalogue.refresh()
+        self.assertEqual(
+            changes,
+            {
+                "added": ["LTC-CLP"],
+                "removed": ["ETH-CLP"],
+                "changed": ["BTC-CLP"],
+            },
+        )
+        self.assertGreater(market_catalogue.version, first)
+        self.assertEqual(
+            market_catalogue.get("btc-clp").taker_fee,
+            Decimal("0.5"),
+        )
+        self.assertIsNone(market_catalogue.get("ETH-CLP"))
+        self.assertEqual(Market.objects.get(id="USDC-CLP").version, first)
+        self.assertEqual(
+            Market.objects.get(id="BTC-CLP").version,
+            market_catalogue.version,
+        )
+
+    def test_no_upstream_requests(self):
+        """
+        Validate markets are only retrieved from Buda.com API once
+        """
+        for _ in range(3):
+            markets = market_catalogue.markets()
+        self.assertEqual([market.id for market in markets], list(self.markets))
+        self.assertEqual(self.requests.count("/markets"), 1)
+
+        Spread.get_each_markets_spread()
+        self.assertEqual(self.requests.count("/markets"), 1)
+
+    def test_reload(self):
+        """
+        Validate other processes reload the catalogue when it changes
+        """
+        other = MarketCatalogue(check_interval=0)
+        market_catalogue.refresh()
+        self.assertTrue(other.is_known("btc-clp"))
+        self.assertFalse(other.is_known("LTC-CLP"))
+
+        self.markets["LTC-CLP"] = {**self.valid_market_data, "id": "LTC-CLP"}
+        market_catalogue.refresh()
+        self.assertTrue(other.is_known("LTC-CLP"))
+
+    def test_fill_empty(self):
+        """
+        Validate an empty catalogue is filled before checking a market, and
+        any market is assumed to exist if it can't be
+        """
+        self.assertFalse(market_catalogue.is_known("LTC-CLP"))
+        self.assertTrue(market_catalogue.is_known("btc-clp"))
+        self.assertEqual(self.requests.count("/markets"), 1)
+
+        market_catalogue.clear()
+        Market.objects.all().delete()
+        MarketCatalogueVersion.objects.all().delete()
+        response = Response()
+        response.status_code = 503
+        with patch(
+            "api.models.fetch_data",
+            side_effect=HTTPError("503 Server Error", response=response),
+        ):
+            self.assertTrue(market_catalogue.is_known("LTC-CLP"))
+
+        # nor if it can't be loaded from database
+        other = MarketCatalogue()
+        with patch.object(other, "load", side_effect=DatabaseError):
+            self.assertTrue(other.is_known("LTC-CLP"))
+
+    def test_preload(self):
+        """
+        Validate the catalogue is loaded when a process starts, without
+        failing if it can't be
+        """
+        market_catalogue.preload()
+        self.assertEqual(self.requests, ["/markets"])
+        self.assertIsNotNone(market_catalogue.get("BTC-CLP"))
+
+        other = MarketCatalogue()
+        with patch.object(other, "load", side_effect=DatabaseError):
+            with self.assertLogs("api.catalogue", "ERROR"):
+                other.preload()
+
+    def test_unknown_market(self):
+        """
+        Validate unknown markets are rejected without asking Buda.com API
+        """
+        market_catalogue.refresh()
+        self.requests.clear()
+
+        url = reverse("spread-detail", kwargs={"market_id": "LTC-CLP"})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.requests, [])
+
+        url = reverse("spread-detail", kwargs={"market_id": "eth-clp"})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,113 @@
+from .test_setup import TestSetUp
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from ..compact import CompactSpread, parse_scaled, render_spreads
+from ..models import Spread
+from ..serializer import SpreadSerializer
+from ..store import spread_store
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+        "spreads": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "test-compact",
+        },
+    },
+)
+class TestCompact(TestSetUp):
+    """
+    Tests for spreads calculated and rendered without models.
+    """
+
+    # pairs of best bid and ask, with different precisions
+    prices = [
+        ("40319190.0", "40800985.0"),
+        ("40319190", "40800985.5"),
+        ("0.00001234", "0.0000125"),
+        ("1.000000000049", "1.0000000001"),
+        ("1.00000000005", "1.0000000001"),
+        ("1.00000000015", "1.0000000003"),
+        ("2.5", "1.25"),
+        ("3", "3.000"),
+        ("1.5e-3", "2E2"),
+    ]
+
+    def setUp(self):
+        super().setUp()
+        spread_store.cache.clear()
+
+    def tickers(self) -> list:
+        return [
+            {
+                **self.valid_ticker_data,
+                "market_id": f"M{i}-CLP",
+                "max_bid": [bid, "CLP"],
+                "min_ask": [ask, "CLP"],
+            }
+            for i, (bid, ask) in enumerate(self.prices)
+        ]
+
+    def test_parse_scaled(self):
+        self.assertEqual(parse_scaled("40319190.0"), (403191900, 1))
+        self.assertEqual(parse_scaled("-0.05"), (-5, 2))
+        self.assertEqual(parse_scaled("2E2"), (200, 0))
+        self.assertEqual(parse_scaled("1.5e-3"), (15, 4))
+
+    def test_same_output_as_serializer(self):
+        """
+        Validate rendered spreads match the serializer byte for byte
+        """
+        tickers = self.tickers()
+        spreads = [Spread.from_ticker_data(data) for data in tickers]
+        compact = [CompactSpread.from_ticker_data(data) for data in tickers]
+
+        self.assertEqual(
+            render_spreads(compact),
+            JSONRenderer().render(SpreadSerializer(spreads, many=True).data),
+        )
+        for spread, fast in zip(spreads, compact):
+            self.assertEqual(fast.to_spread().value, spread.value)
+
+    def test_stored_spreads(self):
+        """
+        Validate stored spreads are read back exactly
+        """
+        spreads = [Spread.from_ticker_data(data) for data in self.tickers()]
+        spread_store.set_many(spreads)
+
+        compact, _ = spread_store.get_all(build=CompactSpread.from_dict)
+        self.assertEqual(
+            render_spreads(compact),
+            JSONRenderer().render(SpreadSerializer(spreads, many=True).data),
+        )
+
+    def test_list_view(self):
+        """
+        Validate the spreads list response isn't changed
+        """
+        self.patch_upstream()
+        url = reverse("spread-list")
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["content-type"], "application/json")
+        self.assertEqual(
+            response.content,
+            JSONRenderer().render(
+                SpreadSerializer(
+                    Spread.get_each_markets_spread(),
+                    many=True,
+                ).data
+            ),
+        )
+
+        # other formats are still rendered through the serializer
+        response = self.client.get(url, HTTP_ACCEPT="text/html")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("text/html", response["content-type"])
@@ -0,0 +1,151 @@
+from .test_setup import TestSetUp
+from django.urls import reverse
+from rest_framework import status
+from requests import Response
+from requests.exceptions import HTTPError
+from decimal import Decimal
+from unittest.mock import patch
+from ..catalogue import market_catalogue
+from ..depth import BASE, BookSide, OrderBook, taker_fee_rate
+from ..models import Market
+
+
+class TestDepth(TestSetUp):
+    """
+    Tests for the effective spreads from the order book.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.asks = [["100", "1"], ["110", "2"], ["150", "1"]]
+        self.bids = [["90", "1"], ["80", "3"]]
+        self.url = reverse(
+            "spread-depth",
+            kwargs={"market_id": self.valid_market_id},
+        )
+        patcher = patch("api.depth.fetch_data", side_effect=self.fetch_data)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fetch_data(self, endpoint: str) -> dict:
+        if self.invalid_market_id in endpoint:
+            response = Response()
+            response.status_code = 404
+            raise HTTPError("404 Client Error", response=response)
+        return {"order_book": {"asks": self.asks, "bids": self.bids}}
+
+    def test_average_prices(self):
+        """
+        Validate sizes are filled walking the levels, in either unit
+        """
+        asks = BookSide(self.asks)
+        self.assertEqual(
+            asks.average_prices(
+                [Decimal("0.5"), Decimal(1), Decimal(2), Decimal(5)],
+                BASE,
+            ),
+            [Decimal(100), Decimal(100), Decimal(105), None],
+        )
+        # 100 for the first level, and 220 for two units of the second
+        self.assertEqual(
+            asks.average_prices([Decimal(50), Decimal(320)]),
+            [Decimal(100), Decimal(320) / 3],
+        )
+        # exactly the whole side
+        self.assertEqual(
+            asks.average_prices([Decimal(470)]),
+            [Decimal(470) / 4],
+        )
+        self.assertEqual(BookSide([]).average_prices([Decimal(1)]), [None])
+
+    def test_effective_spreads(self):
+        """
+        Validate each size gets its spread, in the order requested
+        """
+        book = OrderBook("BTC-CLP", self.asks, self.bids)
+        spreads = book.effective_spreads(
+            [Decimal(2), Decimal(1), Decimal(10)],
+            BASE,
+            Decimal("0.01"),
+        )
+        self.assertEqual(
+            [spread.size for spread in spreads],
+            [Decimal(2), Decimal(1), Decimal(10)],
+        )
+        self.assertEqual(spreads[0].ask, Decimal(105))
+        self.assertEqual(spreads[0].bid, Decimal(85))
+        self.assertEqual(spreads[0].value, Decimal(20))
+        self.assertEqual(
+            spreads[0].value_with_fees,
+            Decimal(105) * Decimal("1.01") - Decimal(85) * Decimal("0.99"),
+        )
+        self.assertEqual(spreads[1].value, Decimal(10))
+        self.assertIsNone(spreads[2].value)
+        self.assertIsNone(spreads[2].value_with_fees)
+
+    def test_taker_fee_rate(self):
+        """
+        Validate the percentages of Buda.com API become a fraction
+        """
+        market = Market.create("", self.valid_market_data)
+        self.assertEqual(taker_fee_rate(market), Decimal("0.007984"))
+
+    def test_depth(self):
+        """
+        Validate the effective spreads of a market are returned
+        """
+        response = self.client.get(self.url, {"sizes": "2,1", "unit": BASE})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["market_id"], "BTC-CLP")
+        self.assertEqual(response.data["currency"], "CLP")
+        self.assertIsNone(response.data["fee_rate"])
+        self.assertEqual(
+            [spread["value"] for spread in response.data["spreads"]],
+            ["20.0000000000", "10.0000000000"],
+        )
+        self.assertIsNone(response.data["spreads"][0]["value_with_fees"])
+
+    def test_depth_with_fees(self):
+        """
+        Validate the taker fee of the market is taken from the catalogue
+        """
+        Market.create("", {**self.valid_market_data, "id": "BTC-CLP"}).save()
+        market_catalogue.load(force=True)
+
+        response = self.client.get(self.url, {"sizes": "200", "fees": "true"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["fee_rate"], Decimal("0.007984"))
+        self.assertIsNotNone(response.data["spreads"][0]["value_with_fees"])
+
+    def test_depth_invalid_sizes(self):
+        """
+        Validate sizes must be a list of positive numbers
+        """
+        for sizes in (
+            "",
+            "abc",
+            "1,-1",
+            "0",
+            "nan",
+            # beyond the digits of the response
+            "1000000000000",
+            "0.00000000001",
+            ",".join(["1"] * 51),
+        ):
+            response = self.client.get(self.url, {"sizes": sizes})
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_400_BAD_REQUEST,
+                sizes,
+            )
+
+    def test_depth_invalid_market(self):
+        """
+        Validate errors of Buda.com API are forwarded
+        """
+        url = reverse(
+            "spread-depth",
+            kwargs={"market_id": self.invalid_market_id},
+        )
+        response = self.client.get(url, {"sizes": "1"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
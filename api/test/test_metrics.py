@@ -0,0 +1,126 @@
+from .test_setup import TestSetUp
+from buda import metrics
+from buda.metrics import Counter, Histogram
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from unittest.mock import patch
+from ..benchmark import BudaStandIn
+from ..rendered import rendered_cache
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+        "spreads": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "test-metrics",
+        },
+    },
+    BUDA_CACHE_TTL={"markets": 0, "ticker": 0, "default": 0},
+    BUDA_RATE_LIMIT=0,
+    BUDA_RETRIES=0,
+    METRICS_ENABLED=True,
+    METRICS_MAX_SERIES=1000,
+)
+class TestMetrics(TestSetUp):
+    """
+    Tests for the timing metrics of requests and their Prometheus export.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for metric in metrics.REGISTRY:
+            metric.clear()
+        rendered_cache.clear()
+
+        self.stand_in = BudaStandIn(markets=3).start()
+        self.addCleanup(self.stand_in.stop)
+        patcher = patch("buda.utils.BASE_URL", self.stand_in.base_url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_server_timing(self):
+        """
+        Validate the duration of each stage is sent to the client
+        """
+        response = self.client.get(
+            reverse("spread-detail", kwargs={"market_id": "c001-clp"})
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        stages = [
+            timing.split(";")[0]
+            for timing in response["Server-Timing"].split(", ")
+        ]
+        self.assertEqual(stages, ["upstream", "parse", "serialize", "total"])
+
+    def test_export(self):
+        """
+        Validate stages, upstream responses and requests are exported
+        """
+        self.client.get(
+            reverse("spread-detail", kwargs={"market_id": "C001-CLP"})
+        )
+        self.client.get(
+            reverse("spread-detail", kwargs={"market_id": "X-CLP"})
+        )
+
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        content = response.content.decode()
+
+        self.assertIn(
+            'spread_api_stage_seconds_count{stage="upstream",'
+            'market="C001-CLP"} 1',
+            content,
+        )
+        self.assertIn(
+            'spread_api_upstream_responses_total{endpoint="ticker",'
+            'status="200"} 1',
+            content,
+        )
+        self.assertIn(
+            'spread_api_request_seconds_count{view="spread-detail",'
+            'method="GET",status="200"} 1',
+            content,
+        )
+
+    def test_histogram(self):
+        histogram = Histogram("test_seconds", "Test.", ("stage",), (0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value, stage="db")
+
+        self.assertEqual(
+            histogram.samples(),
+            [
+                'test_seconds_bucket{stage="db",le="0.1"} 2',
+                'test_seconds_bucket{stage="db",le="1.0"} 3',
+                'test_seconds_bucket{stage="db",le="+Inf"} 4',
+                'test_seconds_sum{stage="db"} 3.65',
+                'test_seconds_count{stage="db"} 4',
+            ],
+        )
+
+    @override_settings(METRICS_MAX_SERIES=2)
+    def test_bounded_series(self):
+        """
+        Validate the series of a metric don't grow without limit
+        """
+        counter = Counter("test_total", "Test.", ("market",))
+        for market in ("A", "B", "C", "D"):
+            counter.inc(market=market)
+
+        self.assertEqual(counter.value(market="B"), 1)
+        self.assertEqual(counter.value(market="other"), 2)
+        self.assertEqual(len(counter.samples()), 3)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        response = self.client.get(reverse("spread-list"))
+        self.assertNotIn("Server-Timing", response)
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
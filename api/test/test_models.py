@@ -2,6 +2,9 @@ from .test_setup import TestSetUp
 from ..models import Market, Ticker, Spread, Polling
 from decimal import Decimal
 from random import choice
+from requests import Response
+from requests.exceptions import HTTPError
+from unittest.mock import patch
 
 
 class TestModels(TestSetUp):
@@ -48,6 +51,56 @@ class TestModels(TestSetUp):
         self.assertTrue(isinstance(spreads, list))
         self.assertTrue(isinstance(choice(spreads), Spread))
 
+    def test_get_each_markets_spread_in_bulk(self):
+        """
+        All spreads are calculated from a single `/tickers` request
+        """
+        tickers = {"tickers": [self.valid_ticker_data]}
+        with patch("api.models.fetch_data", return_value=tickers) as fetch:
+            spreads = Spread.get_each_markets_spread()
+
+        fetch.assert_called_once_with("/tickers")
+        self.assertEqual(spreads[0].market_id, self.valid_market_id)
+        self.assertEqual(spreads[0].value, Decimal("481795"))
+        self.assertEqual(spreads[0].currency, self.valid_quote_currency)
+
+    def test_get_each_markets_spread_without_bulk(self):
+        """
+        Spreads are calculated market by market if `/tickers` fails
+        """
+        response = Response()
+        response.status_code = 404
+
+        def fetch_data(endpoint):
+            if endpoint == "/tickers":
+                raise HTTPError("404 Client Error", response=response)
+            if endpoint == "/markets":
+                return {"markets": [self.valid_market_data]}
+            return {"ticker": self.valid_ticker_data}
+
+        with patch("api.models.fetch_data", side_effect=fetch_data), patch(
+            "buda.utils.fetch_data", side_effect=fetch_data
+        ):
+            spreads = Spread.get_each_markets_spread()
+
+        self.assertEqual(len(spreads), 1)
+        self.assertEqual(spreads[0].value, Decimal("481795"))
+
+    def test_spread_market_id_normalization(self):
+        """
+        Market IDs are stored and looked up in upper case
+        """
+        spread = Spread.from_ticker_data(
+            {**self.valid_ticker_data, "market_id": "btc-clp"},
+        )
+        spread.save()
+
+        self.assertEqual(spread.market_id, self.valid_market_id)
+        self.assertEqual(
+            Spread.objects.filter(market_id="Btc-Clp").latest("fetch_date"),
+            spread,
+        )
+
     def test_create_valid_polling(self):
         spread = Spread.create(self.valid_market_id)
         polling = Polling.create(spread)
@@ -0,0 +1,135 @@
+import multiprocessing
+import os
+import tempfile
+from .test_setup import TestSetUp
+from buda import ratelimit
+from buda.ratelimit import (
+    BACKGROUND,
+    INTERACTIVE,
+    RateLimited,
+    TokenBucket,
+    get_priority,
+    priority,
+)
+from buda.utils import fetch_concurrently
+from django.test import override_settings
+from requests import Response
+from unittest.mock import patch
+from time import monotonic
+
+
+def take_tokens(path: str, count: int, taken):
+    """Take tokens from a bucket shared with other processes"""
+    bucket = TokenBucket(path, rate=0.001, capacity=10)
+    for _ in range(count):
+        if not bucket.try_acquire():
+            with taken.get_lock():
+                taken.value += 1
+
+
+class TestRateLimit(TestSetUp):
+    """
+    Tests for the rate limit of requests to Buda.com API.
+    """
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "bucket")
+
+        settings = override_settings(
+            BUDA_RATE_LIMIT=50,
+            BUDA_RATE_BURST=2,
+            BUDA_RATE_RESERVE=1,
+            BUDA_RATE_LIMIT_FILE=self.path,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_token_bucket(self):
+        """
+        Tokens are taken until the bucket is empty, and refilled over time
+        """
+        bucket = TokenBucket(self.path, rate=10, capacity=3)
+        waits = [bucket.try_acquire() for _ in range(4)]
+
+        self.assertEqual(waits[:3], [0, 0, 0])
+        self.assertAlmostEqual(waits[3], 0.1, delta=0.01)
+
+    def test_background_reserve(self):
+        """
+        Background requests leave tokens for interactive ones
+        """
+        bucket = TokenBucket(self.path, rate=0.001, capacity=5, reserve=2)
+        background = [bucket.try_acquire(BACKGROUND) for _ in range(4)]
+        interactive = [bucket.try_acquire(INTERACTIVE) for _ in range(3)]
+
+        self.assertEqual([wait == 0 for wait in background], [1, 1, 1, 0])
+        self.assertEqual([wait == 0 for wait in interactive], [1, 1, 0])
+
+    def test_shared_between_processes(self):
+        """
+        All processes take their tokens from the same bucket
+        """
+        taken = multiprocessing.Value("i", 0)
+        processes = [
+            multiprocessing.Process(
+                target=take_tokens,
+                args=(self.path, 5, taken),
+            )
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        self.assertEqual(taken.value, 10)
+
+    def test_queue_until_deadline(self):
+        """
+        Requests wait for a token, failing only if it comes too late
+        """
+        started = monotonic()
+        for _ in range(4):
+            ratelimit.acquire()
+        # the burst is free, then a token every 20 milliseconds
+        self.assertGreaterEqual(monotonic() - started, 0.035)
+
+        with override_settings(
+            BUDA_RATE_WAIT={"interactive": 0, "background": 0},
+        ):
+            with self.assertRaises(RateLimited) as error:
+                ratelimit.acquire()
+        self.assertEqual(error.exception.response.status_code, 429)
+
+    def test_penalize(self):
+        """
+        A rate limited response empties the bucket
+        """
+        response = Response()
+        response.status_code = 429
+        response.headers["Retry-After"] = "1"
+
+        ratelimit.penalize(response)
+        # a second without tokens, at 50 per second
+        self.assertAlmostEqual(
+            ratelimit.get_bucket().tokens(),
+            -50,
+            delta=1,
+        )
+
+    @patch("buda.utils.fetch_data", side_effect=lambda _: get_priority())
+    def test_priority_of_concurrent_requests(self, fetch_data):
+        """
+        Requests sent from a thread pool keep the priority of the caller
+        """
+        with priority(BACKGROUND):
+            results = fetch_concurrently(["/tickers", "/markets"])
+
+        self.assertEqual(
+            {result.data for result in results.values()},
+            {BACKGROUND},
+        )
+        self.assertEqual(get_priority(), INTERACTIVE)
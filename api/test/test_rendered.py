@@ -0,0 +1,224 @@
+import gzip
+from .test_setup import TestSetUp
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from decimal import Decimal
+from unittest import skipIf
+from unittest.mock import patch
+from ..compact import render_spreads
+from ..models import Spread
+from ..rendered import RenderedCache, brotli, rendered_cache
+from ..serializer import SpreadSerializer
+from ..store import spread_store
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+        "spreads": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "test-rendered",
+        },
+    },
+    SPREAD_STORE_MAX_AGE=30,
+    RENDERED_COMPRESS_MIN_SIZE=512,
+)
+class TestRendered(TestSetUp):
+    """
+    Tests for pre-rendered responses and conditional requests.
+    """
+
+    def setUp(self):
+        super().setUp()
+        spread_store.cache.clear()
+        rendered_cache.clear()
+        self.url = reverse("spread-list")
+        self.spreads = [
+            Spread(
+                market_id=f"M{i}-CLP",
+                value=Decimal(1000 + i),
+                currency="CLP",
+            )
+            for i in range(20)
+        ]
+
+    def test_rendered_cache(self):
+        """
+        Validate the same content keeps its ETag and modification date
+        """
+        cache = RenderedCache(maxsize=2)
+        first = cache.put("spreads", b"[]", "v1", fetched_at=100)
+        same = cache.put("spreads", b"[]", "v2", fetched_at=200)
+        other = cache.put("spreads", b"[1]", "v3", fetched_at=300)
+
+        self.assertIsNone(cache.get("spreads", "v1"))
+        self.assertIs(cache.get("spreads", "v3"), other)
+        self.assertEqual(same.etag(), first.etag())
+        self.assertEqual(same.last_modified, 100)
+        self.assertEqual(same.fetched_at, 200)
+        self.assertNotEqual(other.etag(), first.etag())
+        self.assertEqual(other.last_modified, 300)
+
+    def test_not_modified(self):
+        """
+        Validate unchanged spreads return `304 Not Modified`
+        """
+        spread_store.set_many(self.spreads)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.content,
+            JSONRenderer().render(
+                SpreadSerializer(self.spreads, many=True).data
+            ),
+        )
+        self.assertIn("Last-Modified", response)
+        self.assertIn("Age", response)
+        etag = response["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+        # storing the same spreads again doesn't change the response
+        spread_store.set_many(self.spreads)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.spreads[0].value += 1
+        spread_store.update(self.spreads[:1])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_rendered_once_per_version(self):
+        """
+        Validate stored spreads are only rendered again when they change
+        """
+        spread_store.set_many(self.spreads)
+
+        with patch(
+            "api.views.render_spreads",
+            side_effect=render_spreads,
+        ) as render:
+            for _ in range(3):
+                self.client.get(self.url)
+            self.assertEqual(render.call_count, 1)
+
+            spread_store.set_many(self.spreads)
+            self.client.get(self.url)
+            self.assertEqual(render.call_count, 2)
+
+    def test_gzip(self):
+        """
+        Validate compressed bodies are served to clients accepting them
+        """
+        spread_store.set_many(self.spreads)
+        identity = self.client.get(self.url)
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertNotEqual(response["ETag"], identity["ETag"])
+        self.assertEqual(gzip.decompress(response.content), identity.content)
+
+        response = self.client.get(
+            self.url,
+            HTTP_ACCEPT_ENCODING="gzip;q=0, identity",
+        )
+        self.assertNotIn("Content-Encoding", response)
+
+    @skipIf(brotli is None, "brotli is not installed")
+    def test_brotli(self):
+        """
+        Validate brotli is preferred when available
+        """
+        spread_store.set_many(self.spreads)
+        identity = self.client.get(self.url)
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(response.content), identity.content)
+
+    def test_retrieve_not_modified(self):
+        """
+        Validate an unchanged spread returns `304 Not Modified`
+        """
+        self.patch_upstream()
+        url = reverse(
+            "spread-detail",
+            kwargs={"market_id": self.valid_market_id},
+        )
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["value"], "481795.0000000000")
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_retrieve_rendered_once(self):
+        """
+        Validate a spread is only rendered again when the stored one
+        changes, or when the cached ticker of a live one expires
+        """
+        self.patch_upstream()
+        url = reverse(
+            "spread-detail",
+            kwargs={"market_id": self.valid_market_id},
+        )
+        spread = Spread(
+            market_id=self.valid_market_id,
+            value=Decimal(10),
+            currency=self.valid_quote_currency,
+        )
+
+        with patch(
+            "api.views.SpreadViewSet.render_spread",
+            autospec=True,
+            side_effect=lambda view, spread: b"{}",
+        ) as render:
+            spread_store.set_many([spread])
+            for _ in range(3):
+                self.client.get(url)
+            self.assertEqual(render.call_count, 1)
+            spread_store.set_many([spread])
+            self.client.get(url)
+            self.assertEqual(render.call_count, 2)
+
+            spread_store.cache.clear()
+            with override_settings(
+                BUDA_CACHE_TTL={"markets": 0, "ticker": 60, "default": 0},
+            ):
+                for _ in range(3):
+                    self.client.get(url)
+                self.assertEqual(render.call_count, 3)
+            with override_settings(
+                BUDA_CACHE_TTL={"markets": 0, "ticker": 0, "default": 0},
+            ):
+                self.client.get(url)
+                self.assertEqual(render.call_count, 4)
+
+    @override_settings(
+        BUDA_CACHE_TTL={"markets": 0, "ticker": 60, "default": 0},
+    )
+    def test_live_list_rendered_once(self):
+        """
+        Validate live spreads are rendered once while the tickers they come
+        from are cached
+        """
+        self.patch_upstream()
+        with patch(
+            "api.views.render_spreads",
+            side_effect=render_spreads,
+        ) as render:
+            for _ in range(3):
+                response = self.client.get(self.url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(render.call_count, 1)
@@ -0,0 +1,211 @@
+from .test_setup import TestSetUp
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from django.core.management import call_command
+from django.test import override_settings
+from io import StringIO
+from ..models import Spread, SpreadRollup, rollup_resolution
+from ..retention import prune_rollups, prune_spreads, roll_up
+
+
+class TestRetention(TestSetUp):
+    """
+    Tests for the rollups and retention of the spreads history.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.start = datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+    def save_spreads(self, spreads: list):
+        """
+        :param list spreads: value and minutes after `start` of each spread.
+        """
+        for value, minutes in spreads:
+            spread = Spread.objects.create(
+                market_id=self.valid_market_id,
+                value=value,
+                currency=self.valid_quote_currency,
+            )
+            Spread.objects.filter(pk=spread.pk).update(
+                fetch_date=self.start + timedelta(minutes=minutes)
+            )
+
+    def roll_up(self) -> int:
+        # spreads are rolled up on the run after they're seen
+        return roll_up() + roll_up()
+
+    def history(self, bucket: str, start: datetime = None, **kwargs) -> list:
+        history = Spread.get_history(
+            self.valid_market_id,
+            start or self.start,
+            self.start + timedelta(days=2),
+            bucket=bucket,
+            **kwargs,
+        )
+        # as rendered by the serializer
+        return [
+            {**row, "avg": row["avg"].quantize(Decimal("1e-10"))}
+            for row in history
+        ]
+
+    def test_roll_up(self):
+        """
+        Validate spreads are aggregated by minute, hour and day
+        """
+        self.save_spreads([(1, 5), (3, 5.5), (2, 45), (7, 90)])
+        self.assertEqual(roll_up(), 0)
+        self.assertEqual(roll_up(), 4)
+        self.assertEqual(roll_up(), 0)
+
+        day = SpreadRollup.objects.get(resolution="day")
+        self.assertEqual(day.bucket, self.start)
+        self.assertEqual(day.count, 4)
+        self.assertEqual(day.total, 13)
+        self.assertEqual((day.min_value, day.max_value), (1, 7))
+        self.assertEqual(day.last_value, 7)
+        self.assertEqual(
+            SpreadRollup.objects.filter(resolution="hour").count(),
+            2,
+        )
+        minute = SpreadRollup.objects.get(
+            resolution="minute",
+            bucket=self.start + timedelta(minutes=5),
+        )
+        self.assertEqual((minute.count, minute.last_value), (2, 3))
+
+    def test_roll_up_incrementally(self):
+        """
+        Validate new spreads are merged into the existing rollups
+        """
+        self.save_spreads([(1, 5), (3, 6)])
+        self.roll_up()
+        # a late spread, older than the last one rolled up
+        self.save_spreads([(10, 4), (2, 7)])
+        self.assertEqual(self.roll_up(), 2)
+
+        day = SpreadRollup.objects.get(resolution="day")
+        self.assertEqual(day.count, 4)
+        self.assertEqual(day.total, 16)
+        self.assertEqual(day.max_value, 10)
+        self.assertEqual(day.last_value, 2)
+        self.assertEqual(
+            day.last_fetch_date,
+            self.start + timedelta(minutes=7),
+        )
+
+    def test_prune_spreads(self):
+        """
+        Validate only old spreads already rolled up are deleted
+        """
+        self.save_spreads([(1, 5), (3, 6), (2, 7)])
+        self.roll_up()
+        self.save_spreads([(4, 8)])
+        Spread.objects.create(
+            market_id=self.valid_market_id,
+            value=5,
+            currency=self.valid_quote_currency,
+        )
+
+        self.assertEqual(prune_spreads(batch=2, pause=0), 3)
+        self.assertEqual(Spread.objects.count(), 2)
+
+    def test_prune_rollups(self):
+        """
+        Validate rollups are kept the days set for their resolution
+        """
+        self.save_spreads([(1, 5)])
+        self.roll_up()
+        with override_settings(
+            SPREAD_ROLLUP_RETENTION={"minute": 1, "hour": None, "day": None}
+        ):
+            self.assertEqual(prune_rollups(pause=0), {"minute": 1})
+        self.assertEqual(SpreadRollup.objects.count(), 2)
+
+    def test_history_from_rollups(self):
+        """
+        Validate the history is the same once the spreads are rolled up and
+        deleted, also with spreads not rolled up yet
+        """
+        self.save_spreads([(1, 5), (3, 15), (2, 45), (7, 90), (4, 1500)])
+        self.save_spreads([(9, 91)])
+        expected = {
+            bucket: self.history(bucket)
+            for bucket in ("minute", "hour", "day", "month")
+        }
+
+        # the last spread is stored after the others are rolled up
+        Spread.objects.latest("id").delete()
+        self.roll_up()
+        prune_spreads(pause=0)
+        self.assertEqual(Spread.objects.count(), 0)
+        self.save_spreads([(9, 91)])
+
+        for bucket, history in expected.items():
+            self.assertEqual(self.history(bucket), history, bucket)
+        # read from the minute rollups
+        self.assertEqual(
+            self.history("hour", start=self.start + timedelta(seconds=30)),
+            expected["hour"],
+        )
+
+        page = self.history("hour", after=self.start, limit=1)
+        self.assertEqual(page[0]["bucket"], self.start + timedelta(hours=1))
+        self.assertEqual(page[0]["count"], 2)
+
+    def test_history_unaligned_range(self):
+        """
+        Validate rollups across the bounds of a range are clipped with the
+        spreads still stored, so the history doesn't change once rolled up
+        """
+        self.start = datetime.now(timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        ) - timedelta(days=1)
+        self.save_spreads([(1, 5), (3, 5.5), (2, 45), (7, 90), (4, 150)])
+        start = self.start + timedelta(minutes=5, seconds=15)
+        end = self.start + timedelta(minutes=100)
+
+        def history(bucket: str) -> list:
+            return Spread.get_history(
+                self.valid_market_id, start, end, bucket=bucket
+            )
+
+        expected = {bucket: history(bucket) for bucket in ("hour", "day")}
+        self.assertEqual(expected["day"][0]["count"], 3)
+        self.roll_up()
+        for bucket, rows in expected.items():
+            self.assertEqual(history(bucket), rows, bucket)
+
+    def test_rollup_resolution(self):
+        """
+        Validate the coarsest rollups that fit the range are used
+        """
+        day = self.start
+        hour = day + timedelta(hours=1)
+        minute = day + timedelta(minutes=1)
+        end = day + timedelta(days=2)
+        self.assertEqual(rollup_resolution("week", day, end), "day")
+        self.assertEqual(rollup_resolution("day", hour, end), "hour")
+        self.assertEqual(rollup_resolution("hour", day, end), "hour")
+        self.assertEqual(rollup_resolution("minute", day, end), "minute")
+        self.assertEqual(rollup_resolution("day", minute, end), "minute")
+
+        # minute rollups of unaligned ranges are gone after their retention
+        second = day + timedelta(seconds=1)
+        with override_settings(
+            SPREAD_ROLLUP_RETENTION={"minute": 1, "hour": None, "day": None}
+        ):
+            self.assertEqual(rollup_resolution("day", second, end), "hour")
+
+    def test_command(self):
+        """
+        Validate the command rolls up and deletes in a single run
+        """
+        self.save_spreads([(1, 5)])
+        roll_up()
+        stdout = StringIO()
+        call_command("roll_up_spreads", "--once", stdout=stdout)
+        self.assertIn(
+            "Rolled up 1 spreads, deleted 1 spreads",
+            stdout.getvalue(),
+        )
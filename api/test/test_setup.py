@@ -1,6 +1,26 @@
+from buda.breaker import reset_breakers
+from ..catalogue import market_catalogue
+from ..rendered import rendered_cache
+from ..store import spread_store
+from django.test import override_settings
 from rest_framework.test import APITestCase
+from requests import Response
+from requests.exceptions import HTTPError
+from unittest.mock import patch
 
 
+# the spreads store must not be shared with a running ingestion worker
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+        "spreads": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "test-setup",
+        },
+    },
+)
 class TestSetUp(APITestCase):
 
     def setUp(self):
@@ -20,10 +40,56 @@ class TestSetUp(APITestCase):
             "maker_discount_percentage": "0.1",
             "taker_discount_percentage": "0.2",
         }
+        self.valid_ticker_data = {
+            "market_id": "BTC-CLP",
+            "price_variation_24h": "0.012",
+            "price_variation_7d": "-0.034",
+            "last_price": ["40500000.0", "CLP"],
+            "max_bid": ["40319190.0", "CLP"],
+            "min_ask": ["40800985.0", "CLP"],
+            "volume": ["12.34567891", "BTC"],
+        }
 
         # invalid data set
         self.invalid_market_id = "loren_ipsum"
+
+        # failures of previous tests mustn't leave a circuit open, nor
+        # markets of their database in the catalogue, nor spreads stored or
+        # rendered
+        reset_breakers()
+        market_catalogue.clear()
+        spread_store.cache.clear()
+        rendered_cache.clear()
         return super().setUp()
 
+    def fake_fetch_data(self, endpoint: str) -> dict:
+        """
+        Stand-in for `fetch_data` that answers from the valid data set, and
+        fails for the invalid market ID and the bulk `/tickers` endpoint.
+        """
+        if endpoint == "/markets":
+            market = {
+                **self.valid_market_data,
+                "id": self.valid_market_id,
+                "name": self.valid_market_id.lower(),
+                "base_currency": self.valid_base_currency,
+            }
+            return {"markets": [self.valid_market_data, market]}
+        if self.invalid_market_id in endpoint or endpoint == "/tickers":
+            response = Response()
+            response.status_code = 404
+            raise HTTPError("404 Client Error", response=response)
+        market_id = endpoint.split("/")[2].upper()
+        return {"ticker": {**self.valid_ticker_data, "market_id": market_id}}
+
+    def patch_upstream(self):
+        """
+        Answer all Buda.com API requests with :meth:`fake_fetch_data`.
+        """
+        for target in ("api.models.fetch_data", "buda.utils.fetch_data"):
+            patcher = patch(target, side_effect=self.fake_fetch_data)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
     def tearDown(self):
         return super().tearDown()
@@ -0,0 +1,118 @@
+from .test_setup import TestSetUp
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from decimal import Decimal
+from io import StringIO
+from time import time
+from unittest.mock import patch
+from ..models import Spread
+from ..store import spread_store
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+        "spreads": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "test-spreads",
+        },
+    },
+    SPREAD_STORE_MAX_AGE=30,
+)
+class TestStore(TestSetUp):
+    """
+    Tests for the latest spreads store and its ingestion worker.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.spread = Spread.from_ticker_data(self.valid_ticker_data)
+        spread_store.cache.clear()
+
+    def test_store_and_get_spread(self):
+        """
+        A stored spread is retrieved with its age
+        """
+        spread_store.set_many([self.spread], fetched_at=time() - 5)
+
+        spread, age = spread_store.get(self.valid_market_id.lower())
+        self.assertEqual(spread.market_id, self.valid_market_id)
+        self.assertEqual(spread.value, Decimal("481795"))
+        self.assertGreaterEqual(age, 5)
+
+        spreads, age = spread_store.get_all()
+        self.assertEqual(len(spreads), 1)
+        self.assertIsNone(spread_store.get(self.invalid_market_id))
+
+    def test_update_spreads(self):
+        """
+        Updated spreads are listed along with the other ones, reading a
+        single key
+        """
+        other = Spread(market_id="ETH-CLP", value=Decimal(1), currency="CLP")
+        spread_store.set_many([self.spread, other], fetched_at=time() - 5)
+        other.value = Decimal(2)
+        spread_store.update([other])
+
+        with patch.object(
+            spread_store.cache,
+            "get",
+            wraps=spread_store.cache.get,
+        ) as get:
+            spreads, age = spread_store.get_all()
+        get.assert_called_once()
+        self.assertEqual(
+            [(spread.market_id, spread.value) for spread in spreads],
+            [(self.valid_market_id, Decimal(481795)), ("ETH-CLP", 2)],
+        )
+        self.assertGreaterEqual(age, 5)
+
+    def test_get_stored_spreads(self):
+        """
+        Recent stored spreads are served with their age
+        """
+        spread_store.set_many([self.spread], fetched_at=time() - 5)
+
+        with patch.object(Spread, "get_each_markets_spread") as live:
+            response = self.client.get(reverse("spread-list"))
+
+        live.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Age"], "5")
+        self.assertEqual(response.json()[0]["value"], "481795.0000000000")
+
+    def test_get_stale_stored_spread(self):
+        """
+        Stored spreads too old are calculated again
+        """
+        spread_store.set_many([self.spread], fetched_at=time() - 60)
+        url = reverse(
+            "spread-detail",
+            kwargs={"market_id": self.valid_market_id},
+        )
+
+        with patch.object(Spread, "create", return_value=self.spread) as live:
+            response = self.client.get(url)
+
+        live.assert_called_once_with(self.valid_market_id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header("Age"))
+
+    def test_ingest_spreads(self):
+        """
+        The ingestion worker stores the spread of all markets
+        """
+        with patch.object(
+            Spread,
+            "get_each_markets_spread",
+            return_value=[self.spread],
+        ):
+            call_command("ingest_spreads", "--once", stdout=StringIO())
+
+        spread, age = spread_store.get(self.valid_market_id)
+        self.assertEqual(spread.value, self.spread.value)
+        self.assertLess(age, 5)
@@ -0,0 +1,160 @@
+from .test_setup import TestSetUp
+from decimal import Decimal
+from django.test import override_settings
+from pathlib import Path
+from time import time
+from unittest.mock import patch
+import threading
+import websockets
+from ..management.commands.stream_spreads import Command
+from ..models import Spread
+from ..store import spread_store
+from ..streaming import BookFeed, BookTop
+
+FEED_PATH = Path(__file__).parent / "fixtures" / "book_feed.jsonl"
+
+
+class TestStreaming(TestSetUp):
+    """
+    Tests for order book streaming from Buda.com websocket feed.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.messages = FEED_PATH.read_text().splitlines()
+
+    async def replay(self, websocket):
+        """Local stand-in of the feed, replaying the recorded messages"""
+        for message in self.messages:
+            await websocket.send(message)
+
+    def test_book_top(self):
+        """
+        The best bid and ask follow each update of the order book
+        """
+        top = BookTop(self.valid_market_id)
+        top.apply({"type": "book-sync", "bids": [["10", "1"]], "asks": []})
+        self.assertIsNone(top.spread())
+
+        self.assertTrue(top.apply(
+            {"type": "book-changed", "change": ["asks", "12", "2"]}
+        ))
+        self.assertEqual(top.spread().value, Decimal("2"))
+        self.assertEqual(top.spread().currency, self.valid_quote_currency)
+
+        # a level away from the top doesn't change the spread
+        self.assertFalse(top.apply(
+            {"type": "book-changed", "change": ["bids", "9", "3"]}
+        ))
+        self.assertTrue(top.apply(
+            {"type": "book-changed", "change": ["bids", "10", "0"]}
+        ))
+        self.assertEqual(top.spread().value, Decimal("3"))
+
+    async def test_replay_recorded_feed(self):
+        """
+        Spreads are calculated as the recorded feed is received
+        """
+        spreads = []
+        async with websockets.serve(self.replay, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            feed = BookFeed(
+                [self.valid_market_id],
+                on_spread=spreads.append,
+                url=f"ws://127.0.0.1:{port}/sub",
+                reconnect=False,
+            )
+            await feed.run()
+
+        self.assertEqual(
+            [spread.value for spread in spreads],
+            [
+                Decimal("481795.0"),
+                Decimal("400985.0"),
+                Decimal("450000.0"),
+                Decimal("530810.0"),
+                Decimal("380810.0"),
+            ],
+        )
+        # the book is forgotten once the feed is disconnected
+        self.assertEqual(feed.spreads(), [])
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            },
+            "spreads": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "test-streaming",
+            },
+        },
+    )
+    def test_updated_spreads(self):
+        """
+        Only the spreads of books updated since a time are stored, dated
+        when their books were updated
+        """
+        feed = BookFeed(["BTC-CLP", "ETH-CLP"], on_spread=lambda _: None)
+        for market_id in feed.tops:
+            feed.handle(
+                market_id,
+                '{"type": "book-sync", "bids": [["10", "1"]], '
+                '"asks": [["12", "1"]]}',
+            )
+        feed.tops["ETH-CLP"].updated_at = time() - 60
+        since = time() - 30
+
+        spreads = feed.spreads(since=since)
+        self.assertEqual(
+            [spread.market_id for spread in spreads],
+            ["BTC-CLP"],
+        )
+        self.assertEqual(len(feed.spreads()), 2)
+
+        spread_store.cache.clear()
+        spread_store.update(feed.spreads())
+        _, age = spread_store.get("ETH-CLP")
+        self.assertGreaterEqual(age, 60)
+        _, age = spread_store.get("BTC-CLP")
+        self.assertLess(age, 30)
+
+        feed.tops["BTC-CLP"].clear()
+        self.assertEqual(
+            [spread.market_id for spread in feed.spreads()],
+            ["ETH-CLP"],
+        )
+
+    async def test_store_in_batches(self):
+        """
+        Changed spreads are stored off the event loop, in batches with the
+        latest spread of each market
+        """
+        batches = []
+        command = Command()
+        command.pending = {}
+        command.writer = None
+        with patch.object(
+            command,
+            "save",
+            side_effect=lambda spreads: batches.append(
+                (spreads, threading.get_ident())
+            ),
+        ):
+            for market_id, value in (
+                ("BTC-CLP", 1),
+                ("ETH-CLP", 2),
+                ("BTC-CLP", 3),
+            ):
+                command.store(
+                    Spread(market_id=market_id, value=value, currency="CLP")
+                )
+            await command.writer
+
+        self.assertEqual(len(batches), 1)
+        spreads, thread = batches[0]
+        self.assertEqual(
+            [(spread.market_id, spread.value) for spread in spreads],
+            [("BTC-CLP", 3), ("ETH-CLP", 2)],
+        )
+        self.assertNotEqual(thread, threading.get_ident())
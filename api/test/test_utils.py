@@ -0,0 +1,170 @@
+import os
+import tempfile
+from .test_setup import TestSetUp
+from buda import ratelimit
+from buda.client import connection_stats, reset_session
+from buda.ratelimit import RateLimited
+from buda.utils import fetch_concurrently, fetch_data
+from django.test import override_settings
+from requests.exceptions import HTTPError
+from unittest.mock import patch
+from time import monotonic, sleep
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+import json
+
+
+def slow_fetch(endpoint: str) -> dict:
+    """Fake `fetch_data` that takes a while and fails for unknown markets"""
+    sleep(0.2)
+    if "loren_ipsum" in endpoint:
+        raise HTTPError("404 Client Error")
+    return {"endpoint": endpoint}
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """Local HTTP/1.1 server that echoes the requested path"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FlakyHandler(KeepAliveHandler):
+    """Local server that answers with the statuses queued on it first"""
+
+    def do_GET(self):
+        if not self.server.statuses:
+            return super().do_GET()
+        self.send_response(self.server.statuses.pop(0))
+        self.send_header("Retry-After", "3600")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class TestUtils(TestSetUp):
+    """
+    Tests for Buda.com API consumption utilities.
+    """
+
+    @patch("buda.utils.fetch_data", side_effect=slow_fetch)
+    def test_fetch_concurrently(self, fetch_data):
+        """
+        Endpoints are retrieved in parallel
+        """
+        endpoints = [f"/markets/market-{n}/ticker" for n in range(10)]
+
+        started = monotonic()
+        results = fetch_concurrently(endpoints, max_workers=10)
+        elapsed = monotonic() - started
+
+        self.assertEqual(fetch_data.call_count, 10)
+        self.assertLess(elapsed, 1)
+        self.assertTrue(all(result.ok for result in results.values()))
+
+    @patch("buda.utils.fetch_data", side_effect=slow_fetch)
+    def test_fetch_concurrently_partial_failure(self, fetch_data):
+        """
+        A failing endpoint doesn't discard the successful ones
+        """
+        valid = f"/markets/{self.valid_market_id}/ticker"
+        invalid = f"/markets/{self.invalid_market_id}/ticker"
+
+        results = fetch_concurrently([valid, invalid])
+
+        self.assertTrue(results[valid].ok)
+        self.assertEqual(results[valid].data, {"endpoint": valid})
+        self.assertTrue(isinstance(results[invalid].error, HTTPError))
+
+    @patch("buda.utils.fetch_data", side_effect=slow_fetch)
+    def test_fetch_concurrently_deadline(self, fetch_data):
+        """
+        Endpoints still pending after the deadline are reported as timeouts
+        """
+        endpoints = [f"/markets/market-{n}/ticker" for n in range(4)]
+
+        results = fetch_concurrently(endpoints, max_workers=2, deadline=0.3)
+
+        errors = [result.error for result in results.values()]
+        self.assertEqual(len(results), 4)
+        self.assertTrue(any(isinstance(e, TimeoutError) for e in errors))
+        self.assertTrue(any(result.ok for result in results.values()))
+
+    def test_fetch_data_reuses_connections(self):
+        """
+        Consecutive requests reuse the same pooled connection
+        """
+        server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.addCleanup(reset_session)
+
+        reset_session()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        with patch("buda.utils.BASE_URL", base_url):
+            for _ in range(5):
+                data = fetch_data("/currencies")
+
+        stats = connection_stats()
+        self.assertEqual(data, {"path": "/v2/currencies"})
+        self.assertEqual(stats["requests"], 5)
+        self.assertEqual(stats["connections"], 1)
+        self.assertEqual(stats["reused"], 4)
+
+    def serve(self, *statuses: int) -> str:
+        """
+        Start a local server that answers with some statuses first.
+
+        :returns: Its base URL.
+        """
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+        server.statuses = list(statuses)
+        Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.addCleanup(reset_session)
+        reset_session()
+        return f"http://127.0.0.1:{server.server_port}"
+
+    @override_settings(BUDA_RETRIES=2, BUDA_RETRY_BACKOFF=0)
+    def test_fetch_data_retries(self):
+        """
+        Server errors are retried, taking a token of the rate limit on
+        every attempt
+        """
+        base_url = self.serve(503, 502)
+        with patch("buda.utils.BASE_URL", base_url), patch(
+            "buda.utils.ratelimit.acquire", wraps=ratelimit.acquire
+        ) as acquire:
+            data = fetch_data("/currencies")
+
+        self.assertEqual(data, {"path": "/v2/currencies"})
+        self.assertEqual(acquire.call_count, 3)
+
+    @override_settings(BUDA_RETRIES=2, BUDA_RETRY_BACKOFF=0)
+    def test_fetch_data_retry_after(self):
+        """
+        A long `Retry-After` fails the request, instead of waiting for it
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        base_url = self.serve(429)
+
+        started = monotonic()
+        with override_settings(
+            BUDA_RATE_LIMIT=50,
+            BUDA_RATE_LIMIT_FILE=os.path.join(directory.name, "bucket"),
+        ), patch("buda.utils.BASE_URL", base_url):
+            with self.assertRaises(RateLimited):
+                fetch_data("/currencies")
+        self.assertLess(monotonic() - started, 5)
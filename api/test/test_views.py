@@ -1,7 +1,10 @@
 from .test_setup import TestSetUp
 from django.urls import reverse
 from rest_framework import status
+from datetime import datetime, timezone
 from decimal import Decimal
+from requests.exceptions import ConnectionError
+from unittest.mock import patch
 from ..models import Spread
 
 
@@ -77,3 +80,152 @@ class TestViews(TestSetUp):
 
         self.assertEqual(polling_response.status_code, status.HTTP_200_OK)
         self.assertEqual(polling_response["content-type"], "application/json")
+
+    def test_save_spreads_batch(self):
+        """
+        Validate the spreads of several markets are saved at once, and
+        failures are reported by market.
+        """
+        self.patch_upstream()
+        url = reverse("spread-save-batch")
+        market_ids = f"{self.valid_market_id},{self.invalid_market_id}"
+
+        response = self.client.get(url, {"market_ids": market_ids})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.json()["saved"]), 1)
+        self.assertEqual(
+            response.json()["failed"][0]["market_id"],
+            self.invalid_market_id,
+        )
+        self.assertTrue(
+            Spread.objects.filter(market_id=self.valid_market_id).exists()
+        )
+
+    def test_save_spreads_batch_all_markets(self):
+        """
+        Validate the spreads of all markets are saved by default.
+        """
+        self.patch_upstream()
+        response = self.client.get(reverse("spread-save-batch"))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()["failed"], [])
+        self.assertEqual(Spread.objects.count(), 2)
+
+    def test_get_spreads_history(self):
+        """
+        Validate stored spreads are aggregated by time buckets, and pages
+        are followed through the cursor.
+        """
+        for value, fetch_date in [
+            (1, datetime(2024, 2, 1, 10, 5, tzinfo=timezone.utc)),
+            (3, datetime(2024, 2, 1, 10, 15, tzinfo=timezone.utc)),
+            (2, datetime(2024, 2, 1, 10, 45, tzinfo=timezone.utc)),
+            (7, datetime(2024, 2, 1, 11, 30, tzinfo=timezone.utc)),
+        ]:
+            spread = Spread.objects.create(
+                market_id=self.valid_market_id,
+                value=value,
+                currency=self.valid_quote_currency,
+            )
+            Spread.objects.filter(pk=spread.pk).update(fetch_date=fetch_date)
+
+        url = reverse(
+            "spread-history",
+            kwargs={"market_id": self.valid_market_id},
+        )
+        params = {
+            "start": "2024-02-01T00:00:00Z",
+            "end": "2024-02-02T00:00:00Z",
+            "bucket": "hour",
+            "limit": 1,
+        }
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        first = response.json()["results"][0]
+        self.assertEqual(first["count"], 3)
+        self.assertEqual(Decimal(first["min"]), 1)
+        self.assertEqual(Decimal(first["max"]), 3)
+        self.assertEqual(Decimal(first["avg"]), 2)
+        self.assertEqual(Decimal(first["last"]), 2)
+
+        params["after"] = response.json()["next"]
+        response = self.client.get(url, params)
+        second = response.json()["results"][0]
+        self.assertEqual(second["count"], 1)
+        self.assertEqual(Decimal(second["last"]), 7)
+
+        params["after"] = response.json()["next"]
+        response = self.client.get(url, params)
+        self.assertEqual(response.json()["results"], [])
+        self.assertIsNone(response.json()["next"])
+
+    def test_get_spreads_history_invalid_params(self):
+        """
+        Validate invalid history parameters are rejected.
+        """
+        url = reverse(
+            "spread-history",
+            kwargs={"market_id": self.valid_market_id},
+        )
+        response = self.client.get(url, {"aggregations": "min,median"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_polling_batch(self):
+        """
+        Validate several markets are compared against their latest stored
+        spread at once.
+        """
+        self.patch_upstream()
+        for value in (100, 200):
+            Spread.objects.create(
+                market_id=self.valid_market_id,
+                value=value,
+                currency=self.valid_quote_currency,
+            )
+
+        market_ids = f"{self.valid_market_id},ETH-CLP"
+        response = self.client.get(
+            reverse("spread-polling-batch"),
+            {"market_ids": market_ids},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        polling = response.json()["pollings"][0]
+        self.assertEqual(polling["market_id"], self.valid_market_id)
+        self.assertEqual(polling["stored_spread"][0], 200)
+        self.assertTrue(polling["current_is_greater"])
+        self.assertEqual(response.json()["failed"][0]["market_id"], "ETH-CLP")
+
+    def test_upstream_errors(self):
+        """
+        Validate spreads that can't be retrieved from Buda.com API, e.g.
+        without connection, are answered with a bad gateway error.
+        """
+        Spread.objects.create(
+            market_id=self.valid_market_id,
+            value=100,
+            currency=self.valid_quote_currency,
+        )
+        urls = [
+            reverse("spread-save", kwargs={"market_id": self.valid_market_id}),
+            reverse(
+                "spread-polling",
+                kwargs={"market_id": self.valid_market_id},
+            ),
+            reverse("spread-save-batch"),
+            reverse("spread-polling-batch"),
+        ]
+        for target in ("api.models.fetch_data", "buda.utils.fetch_data"):
+            patcher = patch(target, side_effect=ConnectionError())
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        for url in urls:
+            response = self.client.get(url)
+            self.assertEqual(
+                response.status_code, status.HTTP_502_BAD_GATEWAY, url
+            )
+        self.assertEqual(Spread.objects.count(), 1)
@@ -1,6 +1,38 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import SpreadViewSet
+from .views import AlertRuleViewSet, SpreadViewSet
+from . import async_views
 
 router = DefaultRouter()
 router.register(r"spreads", SpreadViewSet, basename="spread")
+router.register(r"alerts", AlertRuleViewSet, basename="alert")
 urlpatterns = router.urls
+
+# asynchronous endpoints, to be served through ASGI
+urlpatterns += [
+    path(
+        "async/spreads/",
+        async_views.spread_list,
+        name="async-spread-list",
+    ),
+    path(
+        "async/spreads/<str:market_id>/",
+        async_views.spread_detail,
+        name="async-spread-detail",
+    ),
+    path(
+        "async/spreads/<str:market_id>/save/",
+        async_views.spread_save,
+        name="async-spread-save",
+    ),
+    path(
+        "async/spreads/<str:market_id>/polling/",
+        async_views.spread_polling,
+        name="async-spread-polling",
+    ),
+    path(
+        "stream/spreads/",
+        async_views.spread_stream,
+        name="spread-stream",
+    ),
+]
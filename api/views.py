@@ -1,12 +1,33 @@
-from rest_framework import viewsets, status
+import json
+from rest_framework import permissions, viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from requests.exceptions import HTTPError
-from django.db import DatabaseError
-from .models import Spread, Polling
+from rest_framework.renderers import JSONRenderer
+from requests.exceptions import RequestException
+from datetime import timedelta
+from time import time
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from buda.breaker import is_failure
+from buda.metrics import timed
+from .analytics import MarketsSnapshot, to_list
+from .catalogue import market_catalogue
+from .compact import CompactSpread, render_spreads
+from .depth import BASE, QUOTE, OrderBook, taker_fee_rate
+from .models import AlertRule, Market, Spread, Polling
+from .rendered import Rendered, rendered_cache, rendered_response
+from .store import SpreadStore, spread_store
 from .serializer import (
+    AlertRuleSerializer,
+    AnalyticsQuerySerializer,
+    AnalyticsSerializer,
+    DepthQuerySerializer,
+    EffectiveSpreadSerializer,
     SpreadSerializer,
     SpreadSerializerFull,
+    SpreadHistoryQuerySerializer,
+    SpreadHistorySerializer,
     PollingSerializer,
 )
 
@@ -14,6 +35,7 @@ from .serializer import (
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import (
     extend_schema,
+    extend_schema_view,
     OpenApiParameter,
     OpenApiExample,
 )
@@ -46,15 +68,95 @@ class SpreadViewSet(viewsets.ViewSet):
         """
         Calculate and return the current spread for all available markets.
         """
+        # serve the spreads kept by the ingestion worker, if recent enough,
+        # rendering them again only when the stored ones changed
+        version = spread_store.version()
+        rendered = rendered_cache.get("spreads:stored", version)
+        if rendered is None and version is not None:
+            stored = spread_store.get_all(build=CompactSpread.from_dict)
+            if stored is not None:
+                spreads, age = stored
+                with timed("serialize"):
+                    content = render_spreads(spreads)
+                rendered = rendered_cache.put(
+                    "spreads:stored",
+                    content,
+                    version,
+                    fetched_at=time() - age,
+                )
+        if rendered is not None:
+            age = max(time() - rendered.fetched_at, 0)
+            if age <= settings.SPREAD_STORE_MAX_AGE:
+                return self.rendered_response(
+                    rendered,
+                    {"Age": str(int(age))},
+                )
+
+        # the spreads can't change until the cached tickers expire
+        rendered = rendered_cache.latest("spreads")
+        if self.is_live(rendered):
+            return self.rendered_response(rendered)
+
         try:
-            spreads = Spread.get_each_markets_spread()
-            serializer = SpreadSerializer(spreads, many=True)
-        except HTTPError as e:
-            return Response(
-                {"message": "Can't retrieve the data to calculate the spread"},
-                e.response.status_code,
+            spreads = Spread.get_each_markets_spread(
+                build=CompactSpread.from_ticker_data,
+            )
+        except (RequestException, TimeoutError) as e:
+            return self.upstream_error(
+                e,
+                rendered_cache.latest("spreads", "spreads:stored"),
+            )
+        with timed("serialize"):
+            content = render_spreads(spreads)
+        rendered = rendered_cache.put("spreads", content)
+        return self.rendered_response(rendered)
+
+    def upstream_error(self, error: Exception, stale: Rendered = None):
+        """
+        Respond to a request whose data couldn't be retrieved from Buda.com
+        API. While Buda.com API is failing, the last body rendered for the
+        resource is served instead, marked as stale.
+
+        :param Exception error: error raised while retrieving the data.
+        :param Rendered stale: last body rendered for the resource, if any.
+        :rtype: HttpResponse
+        """
+        if stale is not None and is_failure(error):
+            age = max(time() - stale.fetched_at, 0)
+            return self.rendered_response(
+                stale,
+                {"Age": str(int(age)), "Warning": '110 - "Response is Stale"'},
             )
-        return Response(serializer.data)
+
+        response = getattr(error, "response", None)
+        if response is not None:
+            code = response.status_code
+        elif isinstance(error, TimeoutError):
+            code = status.HTTP_504_GATEWAY_TIMEOUT
+        else:
+            code = status.HTTP_502_BAD_GATEWAY
+        headers = None
+        if response is not None and "Retry-After" in response.headers:
+            headers = {"Retry-After": response.headers["Retry-After"]}
+        return Response(
+            {"message": "Can't retrieve the data to calculate the spread"},
+            code,
+            headers=headers,
+        )
+
+    def rendered_response(self, rendered: Rendered, headers: dict = None):
+        """
+        Respond with a body already rendered as JSON, supporting
+        conditional requests and compression, or with its data in any other
+        format negotiated, e.g. the browsable API.
+
+        :param Rendered rendered: rendered body.
+        :param dict headers: additional response headers.
+        :rtype: HttpResponse
+        """
+        if self.request.accepted_renderer.format == "json":
+            return rendered_response(self.request, rendered, headers)
+        return Response(json.loads(rendered.content), headers=headers)
 
     @extend_schema(
         summary="Get a spread",
@@ -91,15 +193,73 @@ class SpreadViewSet(viewsets.ViewSet):
         """
         Calculate and return the current spread for the specified market.
         """
+        if not market_catalogue.is_known(market_id):
+            return self.unknown_market()
+
+        # serve the spread kept by the ingestion worker, if recent enough,
+        # rendering it again only when the stored one changed
+        key = f"spread:{market_id.upper()}"
+        stored = spread_store.get(market_id, build=dict)
+        if stored is not None:
+            data, age = stored
+            version = str(data["fetched_at"])
+            rendered = rendered_cache.get(f"{key}:stored", version)
+            if rendered is None:
+                rendered = rendered_cache.put(
+                    f"{key}:stored",
+                    self.render_spread(SpreadStore.from_dict(data)),
+                    version,
+                    fetched_at=data["fetched_at"],
+                )
+            if age <= settings.SPREAD_STORE_MAX_AGE:
+                return self.rendered_response(
+                    rendered,
+                    {"Age": str(int(age))},
+                )
+
+        rendered = rendered_cache.latest(key)
+        if self.is_live(rendered):
+            return self.rendered_response(rendered)
+
         try:
             spread = Spread.create(market_id)
-            serializer = SpreadSerializer(spread)
-        except HTTPError as e:
-            return Response(
-                {"message": "Can't retrieve the data to calculate the spread"},
-                e.response.status_code,
+        except (RequestException, TimeoutError) as e:
+            # the stored spread is too old to be served while Buda.com API
+            # works, but not while it fails
+            return self.upstream_error(
+                e,
+                rendered_cache.latest(key, f"{key}:stored"),
             )
-        return Response(serializer.data)
+        rendered = rendered_cache.put(key, self.render_spread(spread))
+        return self.rendered_response(rendered)
+
+    def is_live(self, rendered: Rendered) -> bool:
+        """
+        Check if a body rendered from Buda.com API data is as recent as the
+        data it would be rendered from again, i.e. from the same cached
+        tickers.
+
+        :param Rendered rendered: rendered body, if any.
+        :rtype: bool
+        """
+        ttl = settings.BUDA_CACHE_TTL["ticker"]
+        return rendered is not None and time() - rendered.fetched_at < ttl
+
+    def unknown_market(self):
+        return Response(
+            {"message": "No market was found with this ID"},
+            status.HTTP_404_NOT_FOUND,
+        )
+
+    def render_spread(self, spread) -> bytes:
+        """
+        Render a spread as JSON.
+
+        :param Spread spread: spread to render.
+        :rtype: bytes
+        """
+        with timed("serialize", spread.market_id):
+            return JSONRenderer().render(SpreadSerializer(spread).data)
 
     @extend_schema(
         summary="Save a spread",
@@ -139,21 +299,113 @@ class SpreadViewSet(viewsets.ViewSet):
         """
         Save the current spread for the specified market.
         """
+        if not market_catalogue.is_known(market_id):
+            return self.unknown_market()
+
         try:
             spread = Spread.create(market_id)
-            spread.save()
-            serializer = SpreadSerializerFull(spread)
-        except HTTPError as e:
+            with timed("db", market_id):
+                spread.save()
+            with timed("serialize", market_id):
+                data = SpreadSerializerFull(spread).data
+        except (RequestException, TimeoutError) as e:
+            return self.upstream_error(e)
+        except DatabaseError:
             return Response(
-                {"message": "Can't retrieve the data to calculate the spread"},
-                e.response.status_code,
+                {"message": "Can't save the spread on database"},
+                status.HTTP_503_SERVICE_UNAVAILABLE,
             )
+        return Response(data, status.HTTP_201_CREATED)
+
+    @extend_schema(
+        summary="Save spreads of several markets",
+        responses={201: SpreadSerializerFull(many=True)},
+        parameters=[
+            OpenApiParameter(
+                location=OpenApiParameter.QUERY,
+                name="market_ids",
+                type=OpenApiTypes.STR,
+                required=False,
+                description=(
+                    "Comma separated IDs of the markets to save the spread "
+                    "from. Defaults to all available markets."
+                ),
+                examples=[
+                    OpenApiExample(
+                        "Example 1",
+                        summary="Valid market IDs",
+                        value="BTC-CLP,ETH-CLP",
+                    ),
+                ],
+            ),
+        ],
+        examples=[
+            OpenApiExample(
+                "Example 1",
+                summary="Spreads saved and markets that failed",
+                value={
+                    "saved": [
+                        {
+                            "id": 13,
+                            "market_id": "BTC-CLP",
+                            "value": 481795.0,
+                            "currency": "CLP",
+                            "fetch_date": "2019-08-24T14:15:22Z",
+                        },
+                    ],
+                    "failed": [
+                        {
+                            "market_id": "LOREN-IPSUM",
+                            "message": "Can't retrieve the data to "
+                            "calculate the spread",
+                        },
+                    ],
+                },
+            ),
+        ],
+    )
+    @action(detail=False, url_path="save", url_name="save-batch")
+    def save_batch(self, request):
+        """
+        Save the current spread for several markets at once.
+        """
+        market_ids = request.query_params.get("market_ids")
+        if market_ids is not None:
+            market_ids = [
+                market_id.strip()
+                for market_id in market_ids.split(",")
+                if market_id.strip()
+            ]
+
+        try:
+            spreads, errors = Spread.fetch_each_markets_spread(market_ids)
+        except (RequestException, TimeoutError) as e:
+            return self.upstream_error(e)
+
+        try:
+            # write all spreads in a single statement and transaction
+            with timed("db"), transaction.atomic():
+                Spread.objects.bulk_create(spreads)
         except DatabaseError:
             return Response(
                 {"message": "Can't save the spread on database"},
                 status.HTTP_503_SERVICE_UNAVAILABLE,
             )
-        return Response(serializer.data, status.HTTP_201_CREATED)
+
+        data = {
+            "saved": SpreadSerializerFull(spreads, many=True).data,
+            "failed": [
+                {
+                    "market_id": market_id,
+                    "message": "Can't retrieve the data to calculate "
+                    "the spread",
+                }
+                for market_id in errors
+            ],
+        }
+        if errors and not spreads:
+            return Response(data, status.HTTP_502_BAD_GATEWAY)
+        return Response(data, status.HTTP_201_CREATED)
 
     @extend_schema(
         summary="Compare spreads",
@@ -197,12 +449,475 @@ class SpreadViewSet(viewsets.ViewSet):
         the latest stored one for the specified market.
         """
         try:
-            stored_spreads = Spread.objects.filter(market_id__iexact=market_id)
-            polling = Polling.create(stored_spreads.latest("fetch_date"))
-            serializer = PollingSerializer(polling)
+            with timed("db", market_id):
+                stored = Spread.objects.filter(market_id=market_id).latest(
+                    "fetch_date"
+                )
+            polling = Polling.create(stored)
+            with timed("serialize", market_id):
+                data = PollingSerializer(polling).data
         except Spread.DoesNotExist:
             return Response(
                 {"message": "No stored spread was found for this market"},
                 status.HTTP_404_NOT_FOUND,
             )
-        return Response(serializer.data)
+        except (RequestException, TimeoutError) as e:
+            return self.upstream_error(e)
+        return Response(data)
+
+    @extend_schema(
+        summary="Get effective spreads by trade size",
+        description=(
+            "Walk the order book of the market to find the average prices "
+            "to buy and sell each size, and the spread between them. Sizes "
+            "too large for the order book get null prices."
+        ),
+        responses={200: EffectiveSpreadSerializer(many=True)},
+        parameters=[
+            OpenApiParameter(
+                location=OpenApiParameter.PATH,
+                name="market_id",
+                type=OpenApiTypes.STR,
+                required=True,
+                description="ID of the market to get the spreads from",
+                examples=[
+                    OpenApiExample(
+                        "Example 1",
+                        summary="Valid market ID",
+                        value="BTC-CLP",
+                    ),
+                ],
+            ),
+            OpenApiParameter(
+                location=OpenApiParameter.QUERY,
+                name="sizes",
+                type=OpenApiTypes.STR,
+                required=True,
+                description=(
+                    "Comma separated sizes of the trades, in the unit "
+                    "given by `unit`."
+                ),
+                examples=[
+                    OpenApiExample(
+                        "Example 1",
+                        summary="Sizes in the quote currency",
+                        value="100000,1000000,10000000",
+                    ),
+                ],
+            ),
+            OpenApiParameter(
+                location=OpenApiParameter.QUERY,
+                name="unit",
+                type=OpenApiTypes.STR,
+                enum=[QUOTE, BASE],
+                default=QUOTE,
+                description=(
+                    "Whether sizes are values in the quote currency of the "
+                    "market (e.g. CLP), or amounts of its base currency "
+                    "(e.g. BTC)."
+                ),
+            ),
+            OpenApiParameter(
+                location=OpenApiParameter.QUERY,
+                name="fees",
+                type=OpenApiTypes.BOOL,
+                default=False,
+                description=(
+                    "Include the taker fee of the market, with its "
+                    "discount, in `value_with_fees`."
+                ),
+            ),
+        ],
+        examples=[
+            OpenApiExample(
+                "Example 1",
+                summary="Effective spreads of two sizes",
+                value={
+                    "market_id": "BTC-CLP",
+                    "currency": "CLP",
+                    "unit": "quote",
+                    "fee_rate": 0.0064,
+                    "spreads": [
+                        {
+                            "size": 100000.0,
+                            "ask": 61020000.0,
+                            "bid": 60990000.0,
+                            "value": 30000.0,
+                            "value_with_fees": 810864.0,
+                        },
+                        {
+                            "size": 1000000000.0,
+                            "ask": None,
+                            "bid": 60210455.1,
+                            "value": None,
+                            "value_with_fees": None,
+                        },
+                    ],
+                },
+            ),
+        ],
+    )
+    @action(detail=True)
+    def depth(self, request, market_id=None):
+        """
+        Calculate and return the effective spreads of the specified market
+        for several trade sizes, from its order book.
+        """
+        query = DepthQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        if not market_catalogue.is_known(market_id):
+            return self.unknown_market()
+
+        try:
+            market = market_catalogue.get(market_id)
+            if market is None and params["fees"]:
+                market = Market.create(market_id)
+            book = OrderBook.fetch(market_id)
+        except (RequestException, TimeoutError) as e:
+            return self.upstream_error(e)
+
+        fee_rate = taker_fee_rate(market) if params["fees"] else None
+        with timed("depth", market_id):
+            spreads = book.effective_spreads(
+                params["sizes"],
+                params["unit"],
+                fee_rate,
+            )
+        with timed("serialize", market_id):
+            data = EffectiveSpreadSerializer(spreads, many=True).data
+        return Response(
+            {
+                "market_id": book.market_id,
+                "currency": (
+                    market.quote_currency
+                    if market is not None
+                    else book.market_id.split("-")[-1]
+                ),
+                "unit": params["unit"],
+                "fee_rate": fee_rate,
+                "spreads": data,
+            }
+        )
+
+    @extend_schema(
+        summary="Get spreads history",
+        description=(
+            "Stored spreads of the market aggregated by `bucket`, from "
+            "`start` (included) to `end` (excluded). Spreads older than "
+            "`SPREAD_RETENTION_DAYS` are only kept as rollups by minute, "
+            "hour and day, so for those a `start` or `end` that isn't a "
+            "whole minute is rounded out to the rollups around it."
+        ),
+        responses={200: SpreadHistorySerializer(many=True)},
+        parameters=[
+            OpenApiParameter(
+                location=OpenApiParameter.PATH,
+                name="market_id",
+                type=OpenApiTypes.STR,
+                required=True,
+                description="ID of the market to get the spreads history from",
+                examples=[
+                    OpenApiExample(
+                        "Example 1",
+                        summary="Valid market ID",
+                        value="BTC-CLP",
+                    ),
+                ],
+            ),
+            SpreadHistoryQuerySerializer,
+        ],
+        examples=[
+            OpenApiExample(
+                "Example 1",
+                summary="Spreads aggregated by hour",
+                value={
+                    "market_id": "BTC-CLP",
+                    "bucket": "hour",
+                    "results": [
+                        {
+                            "bucket": "2019-08-24T14:00:00Z",
+                            "count": 60,
+                            "min": 106715.0,
+                            "max": 481795.0,
+                            "avg": 303395.0,
+                            "last": 410110.0,
+                        },
+                    ],
+                    "next": "2019-08-24T14:00:00Z",
+                },
+            ),
+        ],
+    )
+    @action(detail=True)
+    def history(self, request, market_id=None):
+        """
+        Return the stored spreads of the specified market, aggregated by
+        time buckets. Pass the `next` value received as `after` to get the
+        following page.
+        """
+        query = SpreadHistoryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        # defaults to the latest day
+        end = params.get("end", timezone.now())
+        start = params.get("start", end - timedelta(days=1))
+
+        history = Spread.get_history(
+            market_id,
+            start,
+            end,
+            bucket=params["bucket"],
+            aggregations=params["aggregations"],
+            after=params.get("after"),
+            limit=params["limit"],
+        )
+        results = SpreadHistorySerializer(history, many=True).data
+
+        # there may be more buckets only if the page is full
+        next_cursor = None
+        if len(results) == params["limit"]:
+            next_cursor = results[-1]["bucket"]
+
+        return Response(
+            {
+                "market_id": market_id.upper(),
+                "bucket": params["bucket"],
+                "results": results,
+                "next": next_cursor,
+            }
+        )
+
+    @extend_schema(
+        summary="Get analytics of all markets",
+        description=(
+            "Relative and fee-adjusted spreads of every market, implied "
+            "rates between currencies through a third one, and round trips "
+            "across three currencies, from the most profitable."
+        ),
+        parameters=[AnalyticsQuerySerializer],
+        responses={200: AnalyticsSerializer},
+        examples=[
+            OpenApiExample(
+                "Example 1",
+                summary="Analytics of two markets",
+                value={
+                    "markets": [
+                        {
+                            "market_id": "BTC-CLP",
+                            "bid": 60990000.0,
+                            "ask": 61020000.0,
+                            "mid": 61005000.0,
+                            "fee_rate": 0.007984,
+                            "spread": 30000.0,
+                            "spread_bps": 4.92,
+                            "spread_with_fees": 1003942.08,
+                            "spread_with_fees_bps": 164.57,
+                        },
+                    ],
+                    "cross_rates": [
+                        {
+                            "from": "BTC",
+                            "to": "USDC",
+                            "via": "CLP",
+                            "rate": 64012.33,
+                            "direct_rate": 64391.6,
+                        },
+                    ],
+                    "triangles": [
+                        {
+                            "path": ["BTC", "CLP", "USDC", "BTC"],
+                            "edge_bps": -164.2,
+                        },
+                    ],
+                },
+            ),
+        ],
+    )
+    @action(detail=False)
+    def analytics(self, request):
+        """
+        Calculate and return the analytics of all markets at once.
+        """
+        query = AnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        try:
+            markets = market_catalogue.markets()
+            snapshot = MarketsSnapshot.fetch(markets)
+        except (RequestException, TimeoutError) as e:
+            return self.upstream_error(e)
+
+        with timed("analytics"):
+            spreads = {
+                name: to_list(values)
+                for name, values in snapshot.spreads().items()
+            }
+            cross_rates = snapshot.cross_rates(params["fees"])
+            triangles = snapshot.triangles(params["fees"], params["limit"])
+        with timed("serialize"):
+            data = AnalyticsSerializer(
+                {
+                    "markets": [
+                        dict(zip(["market_id", *spreads], values))
+                        for values in zip(
+                            snapshot.market_ids,
+                            *spreads.values(),
+                        )
+                    ],
+                    "cross_rates": cross_rates,
+                    "triangles": triangles,
+                }
+            ).data
+        return Response(data)
+
+    @extend_schema(
+        summary="Compare spreads of several markets",
+        responses={200: PollingSerializer(many=True)},
+        parameters=[
+            OpenApiParameter(
+                location=OpenApiParameter.QUERY,
+                name="market_ids",
+                type=OpenApiTypes.STR,
+                required=False,
+                description=(
+                    "Comma separated IDs of the markets to compare the "
+                    "spread data from. Defaults to all markets with a "
+                    "stored spread."
+                ),
+                examples=[
+                    OpenApiExample(
+                        "Example 1",
+                        summary="Valid market IDs",
+                        value="BTC-CLP,ETH-CLP",
+                    ),
+                ],
+            ),
+        ],
+        examples=[
+            OpenApiExample(
+                "Example 1",
+                summary="Polling objects and markets that failed",
+                value={
+                    "pollings": [
+                        {
+                            "market_id": "BTC-CLP",
+                            "current_is_greater": True,
+                            "stored_is_greater": False,
+                            "difference": 303395.0,
+                            "current_spread": [410110.0, "CLP"],
+                            "stored_spread": [106715.0, "CLP"],
+                            "stored_spread_date": "2019-08-24T14:15:22Z",
+                        },
+                    ],
+                    "failed": [
+                        {
+                            "market_id": "ETH-CLP",
+                            "message": "No stored spread was found for this "
+                            "market",
+                        },
+                    ],
+                },
+            ),
+        ],
+    )
+    @action(detail=False, url_path="polling", url_name="polling-batch")
+    def polling_batch(self, request):
+        """
+        Return a comparison between the current spread vs. the latest
+        stored one for several markets at once.
+        """
+        market_ids = request.query_params.get("market_ids")
+        if market_ids is not None:
+            market_ids = [
+                market_id.strip().upper()
+                for market_id in market_ids.split(",")
+                if market_id.strip()
+            ]
+
+        with timed("db"):
+            stored = Spread.get_latest_stored(market_ids)
+        failed = [
+            {
+                "market_id": market_id,
+                "message": "No stored spread was found for this market",
+            }
+            for market_id in market_ids or []
+            if market_id not in stored
+        ]
+        if not stored:
+            return Response({"pollings": [], "failed": failed})
+
+        try:
+            # all markets are retrieved at once when none is selected
+            current, _ = Spread.fetch_each_markets_spread(
+                None if market_ids is None else list(stored)
+            )
+        except (RequestException, TimeoutError) as e:
+            return self.upstream_error(e)
+
+        current = {spread.market_id: spread for spread in current}
+        pollings = []
+        for market_id, spread in stored.items():
+            if market_id in current:
+                pollings.append(Polling.create(spread, current[market_id]))
+            else:
+                failed.append(
+                    {
+                        "market_id": market_id,
+                        "message": "Can't retrieve the data to calculate "
+                        "the spread",
+                    }
+                )
+
+        return Response(
+            {
+                "pollings": PollingSerializer(pollings, many=True).data,
+                "failed": failed,
+            }
+        )
+
+
+class ModelPermissions(permissions.DjangoModelPermissions):
+    """
+    Model permissions that also require the view permission to read.
+    """
+
+    perms_map = {
+        **permissions.DjangoModelPermissions.perms_map,
+        "GET": ["%(app_label)s.view_%(model_name)s"],
+        "HEAD": ["%(app_label)s.view_%(model_name)s"],
+    }
+
+
+@extend_schema_view(
+    list=extend_schema(summary="Get all alert rules"),
+    retrieve=extend_schema(summary="Get an alert rule"),
+    create=extend_schema(
+        summary="Create an alert rule",
+        description=(
+            "Post an alert to `webhook_url` when the spread of the market "
+            "changes beyond `threshold` versus `baseline`, as an absolute "
+            "amount or a percentage. If `baseline` isn't provided, the "
+            "latest stored spread of the market is used."
+        ),
+    ),
+    update=extend_schema(summary="Replace an alert rule"),
+    partial_update=extend_schema(summary="Update an alert rule"),
+    destroy=extend_schema(summary="Delete an alert rule"),
+)
+class AlertRuleViewSet(viewsets.ModelViewSet):
+    """
+    Thresholds on the change of market spreads, checked by the spreads
+    ingestion workers as new spreads arrive.
+    """
+
+    queryset = AlertRule.objects.order_by("id")
+    serializer_class = AlertRuleSerializer
+
+    # rules make the server post to their webhooks, only users allowed to
+    # manage them can see or change them
+    permission_classes = [ModelPermissions]
@@ -0,0 +1,210 @@
+"""Asynchronous counterparts of the Buda.com API consumption utilities."""
+
+import asyncio
+import httpx
+from django.conf import settings
+from requests import Response
+from requests.exceptions import HTTPError
+from time import monotonic
+from weakref import WeakKeyDictionary
+from . import metrics, ratelimit, utils
+from .breaker import get_breaker
+from .client import RETRY_STATUSES
+from .utils import FetchResult, get_cache, get_endpoint_class
+
+# Clients and in-flight requests can't be shared between event loops.
+_clients = WeakKeyDictionary()
+_inflight = WeakKeyDictionary()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Get the HTTP client shared by the running event loop.
+
+    :rtype: httpx.AsyncClient
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.BUDA_POOL_SIZE,
+                max_keepalive_connections=settings.BUDA_POOL_SIZE,
+            ),
+            timeout=httpx.Timeout(
+                settings.BUDA_READ_TIMEOUT,
+                connect=settings.BUDA_CONNECT_TIMEOUT,
+            ),
+            headers={"Connection": "keep-alive"},
+        )
+    return client
+
+
+async def close_async_client():
+    """
+    Close the HTTP client of the running event loop, if any.
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _raise_for_status(response: httpx.Response):
+    """
+    Throw the same `HTTPError` as the synchronous client would.
+
+    :param httpx.Response response: response to check.
+    """
+    if response.is_success:
+        return
+
+    # only the attributes used by the callers are carried over
+    error_response = Response()
+    error_response.status_code = response.status_code
+    error_response.reason = response.reason_phrase
+    error_response.url = str(response.url)
+    raise HTTPError(
+        f"{response.status_code} Error: {response.reason_phrase} "
+        f"for url: {response.url}",
+        response=error_response,
+    )
+
+
+async def _arequest(endpoint: str) -> dict:
+    """
+    Get data from Buda API, skipping the cache.
+
+    Rate limited and server errors are retried with exponential backoff,
+    and every attempt waits for the rate limit of Buda API. The request
+    fails right away if the circuit breaker of its endpoint class is open.
+
+    :param str endpoint: valid endpoint to retrieve data from.
+    :returns: A dictionary with the response data.
+    :rtype: dict
+    """
+    url = utils.BASE_URL + utils.VERSION + endpoint
+    client = get_async_client()
+    endpoint_class = get_endpoint_class(endpoint)
+    breaker = get_breaker(endpoint_class)
+    breaker.before()
+
+    # only the time spent on requests counts towards a slow call
+    elapsed = 0
+    try:
+        for attempt in range(settings.BUDA_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(
+                    settings.BUDA_RETRY_BACKOFF * 2 ** (attempt - 1)
+                )
+            await ratelimit.aacquire()
+            started = monotonic()
+            with metrics.timed("upstream", utils.get_market_id(endpoint)):
+                response = await client.get(url)
+            elapsed += monotonic() - started
+            metrics.record_upstream(endpoint_class, response.status_code)
+            ratelimit.penalize(response)
+            if response.status_code not in RETRY_STATUSES:
+                break
+
+        # throw an HTTPError if the request wasn't succesful
+        _raise_for_status(response)
+    except BaseException as e:
+        if isinstance(e, httpx.HTTPError):
+            # no response was received, e.g. a timeout
+            metrics.record_upstream(endpoint_class, type(e).__name__)
+        breaker.record(e)
+        raise
+    breaker.record(elapsed=elapsed)
+
+    return response.json()
+
+
+async def afetch_data(endpoint: str) -> dict:
+    """
+    Get data from Buda API without blocking the event loop.
+
+    Shares the cache of :func:`buda.utils.fetch_data`, and simultaneous
+    requests for the same endpoint share a single upstream call. The
+    returned dictionary may be shared with other callers, so it must not
+    be modified.
+
+    :param str endpoint: valid endpoint to retrieve data from.
+    :returns: A dictionary with the response data.
+    :rtype: dict
+    """
+    cache = get_cache()
+    data = cache.get(endpoint)
+    if data is not None:
+        return data
+
+    inflight = _inflight.setdefault(asyncio.get_running_loop(), {})
+    task = inflight.get(endpoint)
+    if task is None:
+        task = inflight[endpoint] = asyncio.ensure_future(_aload(endpoint))
+        task.add_done_callback(lambda _: inflight.pop(endpoint, None))
+
+    # shield the shared request from the cancellation of a single caller
+    return await asyncio.shield(task)
+
+
+async def _aload(endpoint: str) -> dict:
+    """
+    Get data from Buda API and cache it for its endpoint class.
+
+    :param str endpoint: valid endpoint to retrieve data from.
+    :rtype: dict
+    """
+    data = await _arequest(endpoint)
+    ttl = settings.BUDA_CACHE_TTL[get_endpoint_class(endpoint)]
+    get_cache().set(endpoint, data, ttl)
+    return data
+
+
+async def afetch_concurrently(
+    endpoints: list,
+    max_workers: int = None,
+    deadline: float = None,
+) -> dict:
+    """
+    Get data from several Buda API endpoints in parallel.
+
+    Works like :func:`buda.utils.fetch_concurrently`, running the requests
+    as tasks of the current event loop instead of a thread pool.
+
+    :param list endpoints: valid endpoints to retrieve data from.
+    :param int max_workers: maximum number of simultaneous requests.
+    :param float deadline: seconds allowed for the whole batch.
+    :returns: A dictionary mapping each endpoint to its result.
+    :rtype: dict[str, FetchResult]
+    """
+    max_workers = max_workers or utils.MAX_WORKERS
+    deadline = utils.BATCH_DEADLINE if deadline is None else deadline
+    results = {}
+    if not endpoints:
+        return results
+
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def fetch(endpoint: str) -> dict:
+        async with semaphore:
+            return await afetch_data(endpoint)
+
+    tasks = {
+        asyncio.ensure_future(fetch(endpoint)): endpoint
+        for endpoint in endpoints
+    }
+    await asyncio.wait(tasks, timeout=deadline)
+
+    for task, endpoint in tasks.items():
+        if not task.done():
+            task.cancel()
+            results[endpoint] = FetchResult(
+                endpoint,
+                error=TimeoutError(f"Deadline exceeded for {endpoint}"),
+            )
+        elif task.exception() is not None:
+            results[endpoint] = FetchResult(endpoint, error=task.exception())
+        else:
+            results[endpoint] = FetchResult(endpoint, data=task.result())
+
+    return results
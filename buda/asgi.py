@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'buda.settings')
 
 application = get_asgi_application()
+
+# validate market IDs from the first request on
+from api.catalogue import market_catalogue  # noqa: E402
+
+market_catalogue.preload()
@@ -0,0 +1,186 @@
+"""
+Circuit breakers for Buda.com API consumption.
+
+Each endpoint class (see :func:`buda.utils.get_endpoint_class`) has its own
+breaker. After several consecutive failures, or requests slower than
+allowed, the breaker opens and requests of that class fail immediately,
+instead of holding a worker while Buda.com API is down. Once a while has
+passed, a single probe request is let through (half-open): if it
+succeeds the breaker closes again, otherwise it stays open for another
+while.
+"""
+
+import httpx
+import math
+import threading
+from django.conf import settings
+from requests import Response
+from requests.exceptions import HTTPError, RequestException
+from time import monotonic
+from .ratelimit import RateLimited
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpen(HTTPError):
+    """
+    Raised instead of sending a request while the breaker of its endpoint
+    class is open, carrying a `503 Service Unavailable` response.
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        response = Response()
+        response.status_code = 503
+        response.reason = "Service Unavailable"
+        response.headers["Retry-After"] = str(math.ceil(retry_after))
+        super().__init__(
+            f"503 Server Error: circuit open for {name} endpoints "
+            f"of Buda.com API",
+            response=response,
+        )
+
+
+def is_failure(error: BaseException) -> bool:
+    """
+    Check if an error means Buda.com API is failing, rather than the
+    request being wrong, e.g. for a market that doesn't exist.
+
+    :param BaseException error: error raised while requesting data.
+    :rtype: bool
+    """
+    if isinstance(error, HTTPError):
+        response = error.response
+        return response is None or (
+            response.status_code >= 500 or response.status_code == 429
+        )
+    return isinstance(
+        error,
+        (RequestException, httpx.TransportError, TimeoutError, OSError),
+    )
+
+
+class CircuitBreaker:
+    """
+    Tracks the health of a class of endpoints of Buda.com API.
+
+    USAGE
+    >>> breaker = CircuitBreaker(name: str)
+    >>> breaker.before()
+    >>> breaker.record(error: Exception, elapsed: float)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failures: int = None,
+        reset_timeout: float = None,
+        slow_call: float = None,
+    ):
+        """
+        :param str name: endpoint class guarded by the breaker.
+        :param int failures: consecutive failures that open the breaker.
+        :param float reset_timeout: seconds to stay open before probing.
+        :param float slow_call: seconds after which a successful request
+        counts as a failure.
+        """
+        self.name = name
+        self.failures = failures or settings.BUDA_BREAKER_FAILURES
+        self.reset_timeout = (
+            settings.BUDA_BREAKER_RESET
+            if reset_timeout is None
+            else reset_timeout
+        )
+        self.slow_call = (
+            settings.BUDA_BREAKER_SLOW_CALL if slow_call is None else slow_call
+        )
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def before(self):
+        """
+        Check if a request can be sent.
+
+        :raises CircuitOpen: if the breaker is open, or half-open with a
+        probe request already in flight.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            remaining = self.reset_timeout - (monotonic() - self.opened_at)
+            if self.state == OPEN and remaining <= 0:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self.probing:
+                # this request is the probe
+                self.probing = True
+                return
+        raise CircuitOpen(self.name, max(remaining, 0))
+
+    def record(self, error: BaseException = None, elapsed: float = 0):
+        """
+        Record the outcome of a request allowed by :meth:`before`.
+
+        :param BaseException error: error raised by the request, if any.
+        :param float elapsed: seconds a successful request took.
+        """
+        failed = (
+            is_failure(error) if error is not None
+            else elapsed > self.slow_call
+        )
+        with self._lock:
+            self.probing = False
+            if isinstance(error, RateLimited) or not (
+                error is None or isinstance(error, Exception)
+            ):
+                # it was never sent, or it was cancelled before finishing,
+                # so it says nothing about Buda.com API
+                return
+            if not failed:
+                self.state = CLOSED
+                self.consecutive_failures = 0
+                return
+
+            self.consecutive_failures += 1
+            if (
+                self.state == HALF_OPEN
+                or self.consecutive_failures >= self.failures
+            ):
+                self.state = OPEN
+                self.opened_at = monotonic()
+
+    def reset(self):
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.probing = False
+
+
+_breakers = {}
+_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """
+    Get the breaker of an endpoint class, shared by the current process.
+
+    :param str name: endpoint class, e.g. `ticker`.
+    :rtype: CircuitBreaker
+    """
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _lock:
+            breaker = _breakers.setdefault(name, CircuitBreaker(name))
+    return breaker
+
+
+def reset_breakers():
+    """
+    Close all breakers, e.g. between tests.
+    """
+    with _lock:
+        _breakers.clear()
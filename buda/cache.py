@@ -0,0 +1,135 @@
+"""In-memory cache for Buda.com API responses."""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from time import monotonic
+
+
+class TTLCache:
+    """
+    A thread-safe LRU cache whose entries expire after a given time.
+
+    Concurrent loads of the same key are coalesced: only the first caller
+    runs the loader, and the others wait for its result instead of
+    repeating the work.
+
+    USAGE
+    >>> cache = TTLCache(maxsize: int)
+    >>> value = cache.get_or_load(key: str, ttl: float, loader: callable)
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_or_load(self, key: str, ttl: float, loader):
+        """
+        Get the value cached for `key`, loading it if missing or expired.
+
+        :param str key: identifier of the cached value.
+        :param float ttl: seconds the loaded value stays fresh. If zero or
+        less, the value isn't stored but concurrent loads are still shared.
+        :param callable loader: function without arguments that returns
+        the value to cache. Its exceptions are raised to every waiting
+        caller and nothing is cached.
+        :returns: The cached or freshly loaded value.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            pending = self._inflight.get(key)
+            leader = pending is None
+            if leader:
+                self.misses += 1
+                pending = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            # another caller is already loading this key
+            return pending.result()
+
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            pending.set_exception(e)
+            raise
+
+        with self._lock:
+            if ttl > 0:
+                self._store(key, value, monotonic() + ttl)
+            del self._inflight[key]
+        pending.set_result(value)
+        return value
+
+    def get(self, key: str, default=None):
+        """
+        Get the value cached for `key` without loading it.
+
+        :param str key: identifier of the cached value.
+        :param default: value returned if missing or expired.
+        :returns: The cached value, or `default`.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return default
+
+    def set(self, key: str, value, ttl: float):
+        """
+        Cache a value loaded elsewhere.
+
+        :param str key: identifier of the cached value.
+        :param value: value to cache.
+        :param float ttl: seconds the value stays fresh.
+        """
+        if ttl > 0:
+            with self._lock:
+                self._store(key, value, monotonic() + ttl)
+
+    def _store(self, key: str, value, expires: float):
+        """Save an entry, evicting the least recently used ones if full."""
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Remove all cached entries, keeping the statistics."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Usage statistics of the cache.
+
+        :returns: Number of `hits`, `misses`, `coalesced` loads, `evictions`
+        and current `size`.
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+            }
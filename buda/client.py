@@ -0,0 +1,105 @@
+"""Shared HTTP client for Buda.com API consumption."""
+
+import os
+import threading
+from django.conf import settings
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+# Statuses worth retrying: rate limiting and transient server errors. They
+# are retried by the callers, not by the session, so every attempt waits
+# for the rate limit (see `buda.utils._request`).
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_pid = None
+_lock = threading.Lock()
+
+
+def _build_session() -> Session:
+    """
+    Create a session whose connections are kept alive and reused. It
+    doesn't retry any request by itself.
+
+    :rtype: Session
+    """
+    adapter = HTTPAdapter(
+        pool_connections=settings.BUDA_POOL_CONNECTIONS,
+        pool_maxsize=settings.BUDA_POOL_SIZE,
+        max_retries=0,
+    )
+    session = Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Connection"] = "keep-alive"
+    return session
+
+
+def get_session() -> Session:
+    """
+    Get the HTTP session shared by the current process.
+
+    The session is created on first use, and again after a fork, since
+    pooled sockets can't be shared between processes.
+
+    :rtype: Session
+    """
+    global _session, _session_pid
+
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _lock:
+            if _session is None or _session_pid != pid:
+                _session = _build_session()
+                _session_pid = pid
+    return _session
+
+
+def get_timeout() -> tuple:
+    """
+    Connect and read timeouts for requests to Buda.com API.
+
+    :rtype: tuple[float, float]
+    """
+    return (settings.BUDA_CONNECT_TIMEOUT, settings.BUDA_READ_TIMEOUT)
+
+
+def connection_stats() -> dict:
+    """
+    Count requests and connections opened by the shared session.
+
+    Every request that didn't need a new connection reused a pooled one,
+    skipping the TCP and TLS handshakes.
+
+    :returns: Number of `requests`, `connections` and `reused` connections.
+    :rtype: dict
+    """
+    stats = {"requests": 0, "connections": 0, "reused": 0}
+    if _session is None or _session_pid != os.getpid():
+        return stats
+
+    adapters = set(_session.adapters.values())
+    for adapter in adapters:
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats["requests"] += pool.num_requests
+            stats["connections"] += pool.num_connections
+
+    stats["reused"] = max(stats["requests"] - stats["connections"], 0)
+    return stats
+
+
+def reset_session():
+    """
+    Close the shared session, releasing all of its pooled connections.
+    """
+    global _session, _session_pid
+
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _session_pid = None
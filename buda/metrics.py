@@ -0,0 +1,350 @@
+"""
+Timing metrics of the stages of each request, exported in Prometheus text
+format.
+
+Each stage (the upstream requests to Buda.com API, parsing their data,
+database queries and rendering responses) is timed with :func:`timed`,
+which observes a histogram kept in memory by the current process, and adds
+its duration to the `Server-Timing` header of the request in course, if
+any. Observing a value only takes a lock and a few list operations, so
+the metrics can be left on in production.
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from time import perf_counter
+
+# upper bounds of the histogram buckets, in seconds
+BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+# labels replacing the ones of new series once a metric has too many
+OVERFLOW = "other"
+
+# names and durations of the stages of the request in course
+_timings = ContextVar("request_timings", default=None)
+
+
+def escape(value: str) -> str:
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .replace('"', '\\"')
+    )
+
+
+def format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    labels = [
+        f'{name}="{escape(value)}"' for name, value in zip(names, values)
+    ]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+class Metric(ABC):
+    """
+    Base of the metrics, keeping a series for each set of label values.
+
+    The number of series is bounded, so labels taken from requests, such
+    as market IDs, can't grow the memory used without limit: once it's
+    reached, new series are merged into one with all labels as `other`.
+    """
+
+    kind = None
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        """
+        :param str name: name of the metric.
+        :param str help: description of the metric.
+        :param tuple[str] labels: names of the labels of its series.
+        """
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def new_series(self):
+        """
+        Initial state of a new series of the metric.
+        """
+
+    def _get(self, labels: dict):
+        # must be called holding the lock
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        series = self._series.get(key)
+        if series is None:
+            if len(self._series) >= settings.METRICS_MAX_SERIES:
+                key = (OVERFLOW,) * len(self.labels)
+                series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = self.new_series()
+        return series
+
+    @abstractmethod
+    def samples(self) -> list:
+        """
+        Lines of the metric in Prometheus text format.
+
+        :rtype: list[str]
+        """
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.kind}",
+            *self.samples(),
+        ]
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter(Metric):
+    """
+    A value that only increases, e.g. responses of each status code.
+
+    USAGE
+    >>> counter = Counter(name: str, help: str, labels: tuple[str])
+    >>> counter.inc(**labels)
+    """
+
+    kind = "counter"
+
+    def new_series(self):
+        return [0]
+
+    def inc(self, amount: float = 1, **labels):
+        with self._lock:
+            self._get(labels)[0] += amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            return self._series.get(key, [0])[0]
+
+    def samples(self) -> list:
+        with self._lock:
+            series = [(key, value[0]) for key, value in self._series.items()]
+        return [
+            f"{self.name}{format_labels(self.labels, key)} {value}"
+            for key, value in sorted(series)
+        ]
+
+
+class Histogram(Metric):
+    """
+    Distribution of durations, counted in buckets.
+
+    USAGE
+    >>> histogram = Histogram(name: str, help: str, labels: tuple[str])
+    >>> histogram.observe(seconds: float, **labels)
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple = (),
+        buckets: tuple = BUCKETS,
+    ):
+        """
+        :param str name: name of the metric.
+        :param str help: description of the metric.
+        :param tuple[str] labels: names of the labels of its series.
+        :param tuple[float] buckets: upper bounds of the buckets.
+        """
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def new_series(self):
+        # observations of each bucket (and above the last one), and sum
+        return [[0] * (len(self.buckets) + 1), 0.0]
+
+    def observe(self, value: float, **labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._get(labels)
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, **labels) -> int:
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            return sum(series[0]) if series is not None else 0
+
+    def samples(self) -> list:
+        with self._lock:
+            series = [
+                (key, list(counts), total)
+                for key, (counts, total) in self._series.items()
+            ]
+
+        lines = []
+        for key, counts, total in sorted(series):
+            cumulative = 0
+            bounds = [*(repr(float(b)) for b in self.buckets), "+Inf"]
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = format_labels(self.labels, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+stage_seconds = Histogram(
+    "spread_api_stage_seconds",
+    "Time spent on each stage of the requests.",
+    ("stage", "market"),
+)
+upstream_responses = Counter(
+    "spread_api_upstream_responses_total",
+    "Responses from Buda.com API, by endpoint class and status.",
+    ("endpoint", "status"),
+)
+request_seconds = Histogram(
+    "spread_api_request_seconds",
+    "Time taken to respond to each request, by view and status code.",
+    ("view", "method", "status"),
+)
+
+REGISTRY = [stage_seconds, upstream_responses, request_seconds]
+
+
+def render() -> str:
+    """
+    All metrics of the current process in Prometheus text format.
+
+    :rtype: str
+    """
+    return "".join(metric.render() for metric in REGISTRY)
+
+
+def metrics_view(request):
+    """
+    Export the metrics of the current process to Prometheus.
+    """
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(
+        render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+def record(stage: str, seconds: float, market: str = ""):
+    """
+    Record the duration of a stage of the request in course.
+
+    :param str stage: name of the stage, e.g. `upstream`.
+    :param float seconds: time it took.
+    :param str market: market it was for, if any.
+    """
+    if not settings.METRICS_ENABLED:
+        return
+    stage_seconds.observe(seconds, stage=stage, market=market.upper())
+
+    timings = _timings.get()
+    if timings is not None:
+        # a single operation, safe for threads of the same request
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage: str, market: str = ""):
+    """
+    Time a stage of the request in course.
+
+    USAGE
+    >>> with timed("db"):
+    ...     spread.save()
+
+    :param str stage: name of the stage, e.g. `upstream`.
+    :param str market: market it's for, if any.
+    """
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, perf_counter() - started, market)
+
+
+def record_upstream(endpoint_class: str, status):
+    """
+    Count a response, or error, of Buda.com API.
+
+    :param str endpoint_class: class of the requested endpoint.
+    :param status: status code of the response, or a description of the
+    error if there was none, e.g. `timeout`.
+    """
+    if settings.METRICS_ENABLED:
+        upstream_responses.inc(endpoint=endpoint_class, status=status)
+
+
+@contextmanager
+def collect_timings():
+    """
+    Collect the durations of the stages recorded within the context.
+
+    USAGE
+    >>> with collect_timings() as timings:
+    ...     response = get_response(request)
+    >>> header = server_timing(timings)
+
+    :returns: A list to be filled with the stage names and durations.
+    """
+    timings = []
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def server_timing(timings: list, total: float = None) -> str:
+    """
+    Format the durations of the stages of a request as a `Server-Timing`
+    header, adding up the ones of the same stage.
+
+    :param list timings: stage names and durations, in seconds.
+    :param float total: duration of the whole request, in seconds.
+    :rtype: str
+    """
+    stages = {}
+    for stage, seconds in timings:
+        stages[stage] = stages.get(stage, 0) + seconds
+    if total is not None:
+        stages["total"] = total
+    return ", ".join(
+        f"{stage};dur={seconds * 1000:.2f}"
+        for stage, seconds in stages.items()
+    )
@@ -0,0 +1,60 @@
+"""Middleware of the Spread API project."""
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+from time import perf_counter
+from . import metrics
+
+
+def finish_timing(request, response, timings: list, total: float):
+    """
+    Record the duration of a request, and report the ones of its stages
+    to the client in the `Server-Timing` header.
+
+    :param request: request responded to.
+    :param response: its response.
+    :param list timings: stage names and durations of the request.
+    :param float total: duration of the whole request, in seconds.
+    """
+    match = request.resolver_match
+    metrics.request_seconds.observe(
+        total,
+        view=match.view_name if match is not None else "",
+        method=request.method,
+        status=response.status_code,
+    )
+    response["Server-Timing"] = metrics.server_timing(timings, total)
+    return response
+
+
+@sync_and_async_middleware
+def server_timing_middleware(get_response):
+    """
+    Time each request and its stages, see :mod:`buda.metrics`.
+    """
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            if not settings.METRICS_ENABLED:
+                return await get_response(request)
+            started = perf_counter()
+            with metrics.collect_timings() as timings:
+                response = await get_response(request)
+            return finish_timing(
+                request, response, timings, perf_counter() - started
+            )
+
+    else:
+
+        def middleware(request):
+            if not settings.METRICS_ENABLED:
+                return get_response(request)
+            started = perf_counter()
+            with metrics.collect_timings() as timings:
+                response = get_response(request)
+            return finish_timing(
+                request, response, timings, perf_counter() - started
+            )
+
+    return middleware
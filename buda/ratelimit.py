@@ -0,0 +1,257 @@
+"""
+Rate limiting of the requests sent to Buda.com API.
+
+All processes of the host share a token bucket kept on a small file, so
+together they stay within the request budget of the exchange. Requests
+that find the bucket empty wait in line for a token instead of failing,
+up to a deadline that depends on their priority: interactive requests,
+made while a client waits for the response, and background ones, made by
+the workers that refresh the spreads. Background requests also leave some
+tokens untouched, so interactive ones don't queue behind them.
+"""
+
+import asyncio
+import fcntl
+import math
+import os
+import struct
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from requests import Response
+from requests.exceptions import HTTPError
+from time import monotonic, sleep, time
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+_priority = ContextVar("buda_request_priority", default=INTERACTIVE)
+
+
+class RateLimited(HTTPError):
+    """
+    Raised when a request can't be sent within its deadline, carrying a
+    `429 Too Many Requests` response like Buda.com API would.
+    """
+
+    def __init__(self, retry_after: float):
+        response = Response()
+        response.status_code = 429
+        response.reason = "Too Many Requests"
+        response.headers["Retry-After"] = str(math.ceil(retry_after))
+        super().__init__(
+            "429 Client Error: request budget exhausted for Buda.com API",
+            response=response,
+        )
+
+
+@contextmanager
+def priority(level: str):
+    """
+    Set the priority of the requests sent within the context.
+
+    USAGE
+    >>> with priority(BACKGROUND):
+    ...     spreads = Spread.get_each_markets_spread()
+
+    :param str level: `INTERACTIVE` or `BACKGROUND`.
+    """
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def get_priority() -> str:
+    return _priority.get()
+
+
+class TokenBucket:
+    """
+    A token bucket stored on a file, shared by all processes that use it.
+
+    The file holds the number of tokens left and when it was last updated,
+    and it's locked while a token is taken, so the bucket is refilled and
+    consumed atomically.
+
+    USAGE
+    >>> bucket = TokenBucket(path: str, rate: float, capacity: float)
+    >>> wait = bucket.try_acquire(level: str)
+    """
+
+    STATE = struct.Struct("dd")
+
+    def __init__(
+        self,
+        path: str,
+        rate: float,
+        capacity: float,
+        reserve: float = 0,
+    ):
+        """
+        :param str path: file where the bucket is stored.
+        :param float rate: tokens added per second.
+        :param float capacity: maximum tokens kept, i.e. the largest burst.
+        :param float reserve: tokens that background requests can't take.
+        """
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity
+        self.reserve = min(reserve, capacity - 1)
+
+    @contextmanager
+    def _locked(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield fd
+        finally:
+            # closing the file releases the lock
+            os.close(fd)
+
+    def _read(self, fd: int, now: float) -> float:
+        data = os.pread(fd, self.STATE.size, 0)
+        if len(data) < self.STATE.size:
+            # a new bucket starts full
+            return self.capacity
+        tokens, updated = self.STATE.unpack(data)
+        elapsed = max(now - updated, 0)
+        return min(tokens + elapsed * self.rate, self.capacity)
+
+    def _write(self, fd: int, tokens: float, now: float):
+        os.pwrite(fd, self.STATE.pack(tokens, now), 0)
+
+    def try_acquire(self, level: str = INTERACTIVE) -> float:
+        """
+        Take a token, if there's one available for the priority.
+
+        :param str level: priority of the request.
+        :returns: Zero if a token was taken, otherwise the seconds until
+        there will be one.
+        :rtype: float
+        """
+        floor = self.reserve if level == BACKGROUND else 0
+        with self._locked() as fd:
+            now = time()
+            tokens = self._read(fd, now)
+            if tokens - 1 >= floor:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (floor + 1 - tokens) / self.rate
+            self._write(fd, tokens, now)
+        return wait
+
+    def drain(self, seconds: float = 0):
+        """
+        Empty the bucket, e.g. when Buda.com API rate limited a request
+        anyway, so no process sends requests for a while.
+
+        :param float seconds: time to wait until tokens are available.
+        """
+        with self._locked() as fd:
+            now = time()
+            tokens = min(self._read(fd, now), 0) - seconds * self.rate
+            self._write(fd, tokens, now)
+
+    def tokens(self) -> float:
+        """
+        Tokens currently available.
+
+        :rtype: float
+        """
+        with self._locked() as fd:
+            return self._read(fd, time())
+
+
+_bucket = None
+
+
+def get_bucket() -> TokenBucket:
+    """
+    Get the token bucket of the current settings.
+
+    :returns: The bucket, or `None` if rate limiting is disabled.
+    :rtype: TokenBucket | None
+    """
+    global _bucket
+
+    if settings.BUDA_RATE_LIMIT <= 0:
+        return None
+
+    config = (
+        settings.BUDA_RATE_LIMIT_FILE,
+        settings.BUDA_RATE_LIMIT,
+        settings.BUDA_RATE_BURST,
+        settings.BUDA_RATE_RESERVE,
+    )
+    if _bucket is None or _bucket[0] != config:
+        _bucket = (config, TokenBucket(*config))
+    return _bucket[1]
+
+
+def _deadline() -> float:
+    return monotonic() + settings.BUDA_RATE_WAIT[get_priority()]
+
+
+def acquire():
+    """
+    Wait for a token to send a request to Buda.com API.
+
+    :raises RateLimited: if no token is available before the deadline of
+    the current priority.
+    """
+    bucket = get_bucket()
+    if bucket is None:
+        return
+
+    level = get_priority()
+    deadline = _deadline()
+    while True:
+        wait = bucket.try_acquire(level)
+        if not wait:
+            return
+        # don't wait for a token that would arrive too late
+        if monotonic() + wait > deadline:
+            raise RateLimited(wait)
+        sleep(wait)
+
+
+async def aacquire():
+    """
+    Asynchronous version of :func:`acquire`.
+
+    :raises RateLimited: if no token is available before the deadline of
+    the current priority.
+    """
+    bucket = get_bucket()
+    if bucket is None:
+        return
+
+    level = get_priority()
+    deadline = _deadline()
+    while True:
+        wait = bucket.try_acquire(level)
+        if not wait:
+            return
+        if monotonic() + wait > deadline:
+            raise RateLimited(wait)
+        await asyncio.sleep(wait)
+
+
+def penalize(response):
+    """
+    Stop sending requests for a while if Buda.com API rate limited one.
+
+    :param response: response from Buda.com API, from `requests` or
+    `httpx`.
+    """
+    bucket = get_bucket()
+    if bucket is None or response.status_code != 429:
+        return
+    try:
+        retry_after = float(response.headers.get("Retry-After", 1))
+    except ValueError:
+        retry_after = 1
+    bucket.drain(retry_after)
@@ -46,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so it times all other middleware too
+    "buda.middleware.server_timing_middleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -87,6 +89,134 @@ SPECTACULAR_SETTINGS = {
 WSGI_APPLICATION = "buda.wsgi.application"
 
 
+# Buda.com API consumption
+
+# Maximum simultaneous requests when fetching several markets at once,
+# and seconds allowed for the whole batch to complete.
+BUDA_FETCH_MAX_WORKERS = int(environ.get("BUDA_FETCH_MAX_WORKERS", 8))
+BUDA_FETCH_DEADLINE = float(environ.get("BUDA_FETCH_DEADLINE", 10))
+
+# Connections kept alive per host, and number of hosts with a pool.
+BUDA_POOL_SIZE = int(environ.get("BUDA_POOL_SIZE", 16))
+BUDA_POOL_CONNECTIONS = int(environ.get("BUDA_POOL_CONNECTIONS", 4))
+
+# Seconds to wait for a connection to be established and for a response.
+BUDA_CONNECT_TIMEOUT = float(environ.get("BUDA_CONNECT_TIMEOUT", 3.05))
+BUDA_READ_TIMEOUT = float(environ.get("BUDA_READ_TIMEOUT", 10))
+
+# Retries on rate limiting and server errors, with exponential backoff.
+BUDA_RETRIES = int(environ.get("BUDA_RETRIES", 3))
+BUDA_RETRY_BACKOFF = float(environ.get("BUDA_RETRY_BACKOFF", 0.3))
+
+# Requests per second allowed by Buda API to all processes of this host
+# (zero disables the limit), largest burst, requests kept for interactive
+# ones, seconds each priority can wait for its turn, and file where the
+# shared request budget is kept.
+BUDA_RATE_LIMIT = float(environ.get("BUDA_RATE_LIMIT", 10))
+BUDA_RATE_BURST = float(environ.get("BUDA_RATE_BURST", 20))
+BUDA_RATE_RESERVE = float(environ.get("BUDA_RATE_RESERVE", 5))
+BUDA_RATE_WAIT = {
+    "interactive": float(environ.get("BUDA_RATE_WAIT_INTERACTIVE", 5)),
+    "background": float(environ.get("BUDA_RATE_WAIT_BACKGROUND", 30)),
+}
+BUDA_RATE_LIMIT_FILE = environ.get(
+    "BUDA_RATE_LIMIT_FILE",
+    "/tmp/buda_rate_limit",
+)
+
+# Consecutive failures of a class of endpoints that open its circuit
+# breaker, seconds it stays open before a probe request, and seconds after
+# which a successful request counts as a failure.
+BUDA_BREAKER_FAILURES = int(environ.get("BUDA_BREAKER_FAILURES", 5))
+BUDA_BREAKER_RESET = float(environ.get("BUDA_BREAKER_RESET", 30))
+BUDA_BREAKER_SLOW_CALL = float(environ.get("BUDA_BREAKER_SLOW_CALL", 5))
+
+# Seconds each class of response is cached (zero disables it), and maximum
+# number of responses kept.
+BUDA_CACHE_TTL = {
+    "markets": float(environ.get("BUDA_CACHE_TTL_MARKETS", 3600)),
+    "ticker": float(environ.get("BUDA_CACHE_TTL_TICKER", 0.5)),
+    "default": float(environ.get("BUDA_CACHE_TTL_DEFAULT", 0)),
+}
+BUDA_CACHE_SIZE = int(environ.get("BUDA_CACHE_SIZE", 1024))
+
+# Seconds between each refresh of the market catalogue from Buda API, and
+# seconds between checks for a new version of it on database.
+MARKET_CATALOGUE_REFRESH = float(
+    environ.get("MARKET_CATALOGUE_REFRESH", 3600)
+)
+MARKET_CATALOGUE_CHECK = float(environ.get("MARKET_CATALOGUE_CHECK", 60))
+
+
+# Spread ingestion
+
+# Seconds between each refresh of the stored spreads, and maximum age of
+# a stored spread to be served instead of calculating it again.
+SPREAD_INGEST_INTERVAL = float(environ.get("SPREAD_INGEST_INTERVAL", 5))
+SPREAD_STORE_MAX_AGE = float(environ.get("SPREAD_STORE_MAX_AGE", 30))
+
+# Directory of the spreads history archive, and spreads read from database
+# at a time while archiving them.
+SPREAD_ARCHIVE_DIR = Path(
+    environ.get("SPREAD_ARCHIVE_DIR", BASE_DIR / "archive")
+)
+SPREAD_ARCHIVE_CHUNK = int(environ.get("SPREAD_ARCHIVE_CHUNK", 10000))
+
+# Spreads written at a time when backfilling the history from a file.
+SPREAD_BACKFILL_BATCH = int(environ.get("SPREAD_BACKFILL_BATCH", 50000))
+
+# Days the spreads are kept once rolled up, and days the rollups of each
+# resolution are kept (forever if `None`).
+SPREAD_RETENTION_DAYS = float(environ.get("SPREAD_RETENTION_DAYS", 7))
+SPREAD_ROLLUP_RETENTION = {
+    "minute": float(environ.get("SPREAD_ROLLUP_RETENTION_MINUTE", 90)),
+    "hour": float(environ.get("SPREAD_ROLLUP_RETENTION_HOUR", 730)),
+    "day": None,
+}
+
+# Seconds between each run of the rollups, spreads rolled up by each
+# transaction, rows deleted by each statement, and seconds between deletes.
+SPREAD_ROLLUP_INTERVAL = float(environ.get("SPREAD_ROLLUP_INTERVAL", 60))
+SPREAD_ROLLUP_CHUNK = int(environ.get("SPREAD_ROLLUP_CHUNK", 100000))
+SPREAD_RETENTION_BATCH = int(environ.get("SPREAD_RETENTION_BATCH", 5000))
+SPREAD_RETENTION_PAUSE = float(environ.get("SPREAD_RETENTION_PAUSE", 0.1))
+
+# Seconds between each refresh of the streamed spreads, seconds between
+# keep-alive messages, updates queued for each slow subscriber, and markets
+# a subscriber can ask for.
+SPREAD_STREAM_INTERVAL = float(environ.get("SPREAD_STREAM_INTERVAL", 1))
+SPREAD_STREAM_HEARTBEAT = float(environ.get("SPREAD_STREAM_HEARTBEAT", 15))
+SPREAD_STREAM_QUEUE_SIZE = int(environ.get("SPREAD_STREAM_QUEUE_SIZE", 100))
+SPREAD_STREAM_MAX_MARKETS = int(environ.get("SPREAD_STREAM_MAX_MARKETS", 50))
+
+# Rendered responses kept for polling clients, and minimum size of a
+# response body to be compressed.
+RENDERED_CACHE_SIZE = int(environ.get("RENDERED_CACHE_SIZE", 256))
+RENDERED_COMPRESS_MIN_SIZE = int(
+    environ.get("RENDERED_COMPRESS_MIN_SIZE", 512)
+)
+
+# Buda.com websocket feed used to stream order book updates.
+BUDA_REALTIME_URL = environ.get(
+    "BUDA_REALTIME_URL",
+    "wss://realtime.buda.com/sub",
+)
+
+# Seconds between checks for changes on the alert rules, seconds to wait
+# for a webhook to answer, and webhooks sent at the same time.
+ALERT_RULES_REFRESH = float(environ.get("ALERT_RULES_REFRESH", 5))
+ALERT_WEBHOOK_TIMEOUT = float(environ.get("ALERT_WEBHOOK_TIMEOUT", 5))
+ALERT_WEBHOOK_WORKERS = int(environ.get("ALERT_WEBHOOK_WORKERS", 4))
+
+
+# Metrics
+
+# Whether to time each stage of the requests, exporting them on `/metrics`
+# and in `Server-Timing` headers, and maximum series kept by each metric.
+METRICS_ENABLED = environ.get("METRICS_ENABLED", "true").upper() == "TRUE"
+METRICS_MAX_SERIES = int(environ.get("METRICS_MAX_SERIES", 1000))
+
+
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
@@ -102,6 +232,27 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # latest spread of each market, shared by the ingestion worker and
+    # the API processes, so it must be reachable from all of them, e.g.
+    # Redis or Memcached in production
+    "spreads": {
+        "BACKEND": environ.get(
+            "SPREAD_STORE_BACKEND",
+            "django.core.cache.backends.filebased.FileBasedCache",
+        ),
+        "LOCATION": environ.get("SPREAD_STORE_LOCATION", "/tmp/buda_spreads"),
+        "TIMEOUT": None,
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -19,6 +19,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import RedirectView
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView
+from .metrics import metrics_view
 
 urlpatterns = [
     path("", RedirectView.as_view(url="api/docs/")),
@@ -34,4 +35,5 @@ urlpatterns = [
         SpectacularRedocView.as_view(url_name="schema"),
         name="docs",
     ),
+    path("metrics", metrics_view, name="metrics"),
 ]
@@ -1,23 +1,219 @@
 """Utility module for Buda.com API consumption."""
 
-import requests
+from . import metrics, ratelimit
+from .breaker import get_breaker
+from .cache import TTLCache
+from .client import RETRY_STATUSES, get_session, get_timeout
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextvars import copy_context
+from django.conf import settings
+from requests.exceptions import HTTPError, RequestException
+from time import monotonic, sleep
 
 BASE_URL = "https://www.buda.com/api"
 VERSION = "/v2"
 
+# Defaults for concurrent fetching, used when no value is given explicitly.
+MAX_WORKERS = 8
+BATCH_DEADLINE = 10.0
+
+
+_cache = None
+
+
+def get_cache() -> TTLCache:
+    """
+    Get the cache shared by all requests of the current process.
+
+    :rtype: TTLCache
+    """
+    global _cache
+
+    if _cache is None:
+        _cache = TTLCache(maxsize=settings.BUDA_CACHE_SIZE)
+    return _cache
+
+
+def get_endpoint_class(endpoint: str) -> str:
+    """
+    Classify an endpoint by how often its data changes.
+
+    :param str endpoint: valid endpoint to retrieve data from.
+    :returns: `ticker` for prices, `markets` for market metadata,
+    or `default` for anything else.
+    :rtype: str
+    """
+    path = endpoint.split("?")[0].rstrip("/")
+    if path.endswith("/ticker") or path == "/tickers":
+        return "ticker"
+    if path.startswith("/markets") and path.count("/") <= 2:
+        return "markets"
+    return "default"
+
+
+def get_market_id(endpoint: str) -> str:
+    """
+    Market an endpoint is about, to label its metrics.
+
+    :param str endpoint: valid endpoint to retrieve data from.
+    :returns: The market ID, e.g. `btc-clp`, or an empty string for
+    endpoints of all markets.
+    :rtype: str
+    """
+    parts = endpoint.split("?")[0].strip("/").split("/")
+    if len(parts) > 1 and parts[0] == "markets":
+        return parts[1]
+    return ""
+
 
 def fetch_data(endpoint: str) -> dict:
     """
     Get data from Buda API.
 
+    Responses are cached for a time that depends on the endpoint class
+    (see `BUDA_CACHE_TTL` setting), and simultaneous requests for the same
+    endpoint share a single upstream call. The returned dictionary may be
+    shared with other callers, so it must not be modified.
+
+    :param str endpoint: valid endpoint to retrieve data from.
+    :returns: A dictionary with the response data.
+    :rtype: dict
+    """
+    ttl = settings.BUDA_CACHE_TTL[get_endpoint_class(endpoint)]
+    return get_cache().get_or_load(
+        endpoint,
+        ttl,
+        lambda: _request(endpoint),
+    )
+
+
+def _request(endpoint: str) -> dict:
+    """
+    Get data from Buda API, skipping the cache.
+
+    The request fails right away if the circuit breaker of its endpoint
+    class is open. Rate limited and server errors are retried with
+    exponential backoff, and every attempt waits for the rate limit of Buda
+    API, which also holds the `Retry-After` of rate limited responses, up to
+    the deadline of the current priority.
+
     :param str endpoint: valid endpoint to retrieve data from.
     :returns: A dictionary with the response data.
     :rtype: dict
     """
     url = BASE_URL + VERSION + endpoint
-    response = requests.get(url)
+    endpoint_class = get_endpoint_class(endpoint)
+    breaker = get_breaker(endpoint_class)
+    breaker.before()
 
-    # throw an HTTPError if the request wasn't succesful
-    response.raise_for_status()
+    # only the time spent on requests counts towards a slow call
+    elapsed = 0
+    try:
+        for attempt in range(settings.BUDA_RETRIES + 1):
+            if attempt:
+                sleep(settings.BUDA_RETRY_BACKOFF * 2 ** (attempt - 1))
+            ratelimit.acquire()
+            started = monotonic()
+            # reuse pooled connections instead of opening a new one
+            with metrics.timed("upstream", get_market_id(endpoint)):
+                response = get_session().get(url, timeout=get_timeout())
+            elapsed += monotonic() - started
+            metrics.record_upstream(endpoint_class, response.status_code)
+            ratelimit.penalize(response)
+            if response.status_code not in RETRY_STATUSES:
+                break
+
+        # throw an HTTPError if the request wasn't succesful
+        response.raise_for_status()
+    except BaseException as e:
+        if isinstance(e, RequestException) and not isinstance(e, HTTPError):
+            # no response was received, e.g. a timeout
+            metrics.record_upstream(endpoint_class, type(e).__name__)
+        breaker.record(e)
+        raise
+    breaker.record(elapsed=elapsed)
 
     return response.json()
+
+
+class FetchResult:
+    """
+    Outcome of a single endpoint within a concurrent batch.
+
+    Exactly one of `data` or `error` is set: `data` holds the decoded
+    response, and `error` the exception raised while retrieving it.
+    """
+
+    __slots__ = ("endpoint", "data", "error")
+
+    def __init__(self, endpoint: str, data: dict = None, error=None):
+        self.endpoint = endpoint
+        self.data = data
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def fetch_concurrently(
+    endpoints: list,
+    max_workers: int = None,
+    deadline: float = None,
+) -> dict:
+    """
+    Get data from several Buda API endpoints in parallel.
+
+    Each endpoint is retrieved with :func:`fetch_data` on a thread pool, so
+    the whole batch takes roughly as long as the slowest request. Failures
+    are kept per endpoint instead of aborting the batch, and endpoints still
+    pending when the deadline expires are reported with a `TimeoutError`.
+
+    :param list endpoints: valid endpoints to retrieve data from.
+    :param int max_workers: maximum number of simultaneous requests.
+    :param float deadline: seconds allowed for the whole batch.
+    :returns: A dictionary mapping each endpoint to its result.
+    :rtype: dict[str, FetchResult]
+    """
+    max_workers = max_workers or MAX_WORKERS
+    deadline = BATCH_DEADLINE if deadline is None else deadline
+    results = {}
+    if not endpoints:
+        return results
+
+    started = monotonic()
+    executor = ThreadPoolExecutor(
+        max_workers=min(max_workers, len(endpoints)),
+        thread_name_prefix="buda-fetch",
+    )
+    try:
+        # requests keep the priority of the caller (see `ratelimit`)
+        futures = {
+            executor.submit(copy_context().run, fetch_data, endpoint): endpoint
+            for endpoint in endpoints
+        }
+        remaining = max(deadline - (monotonic() - started), 0)
+        wait(futures, timeout=remaining)
+
+        for future, endpoint in futures.items():
+            if not future.done():
+                future.cancel()
+                results[endpoint] = FetchResult(
+                    endpoint,
+                    error=TimeoutError(f"Deadline exceeded for {endpoint}"),
+                )
+            elif future.exception() is not None:
+                results[endpoint] = FetchResult(
+                    endpoint,
+                    error=future.exception(),
+                )
+            else:
+                results[endpoint] = FetchResult(
+                    endpoint,
+                    data=future.result(),
+                )
+    finally:
+        # don't block the caller on requests that outlived the deadline
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
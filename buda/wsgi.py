@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'buda.settings')
 
 application = get_wsgi_application()
+
+# validate market IDs from the first request on
+from api.catalogue import market_catalogue  # noqa: E402
+
+market_catalogue.preload()